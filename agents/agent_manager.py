@@ -1,5 +1,6 @@
 import sys
 import os
+import json
 
 # Get the absolute path of the finance_agents directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -7,10 +8,25 @@ sys.path.append(BASE_DIR)
 
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from langchain_core.messages import AIMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, SystemMessage
+from langgraph.utils.runnable import RunnableCallable
 import config
 from config import SYSTEM_PROMPTS, TOOL_REGISTRY
-from tools import *
+import tools
+from tools.lazy_tool import LazyTool
+from agents.history_manager import history_manager
+from agents.session_store import get_session_store
+from metrics import LLMMetricsCallback, REACT_ITERATIONS
+from logger import get_logger
+
+logger = get_logger("agent_manager")
+
+# Message types as roles, for history views of checkpointed session messages.
+SESSION_ROLES = {"human": "user", "ai": "assistant", "tool": "tool", "system": "system"}
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an assistant.
+Update the summary with the new messages. Keep tickers, figures, dates, user preferences and open questions;
+drop pleasantries. Reply with the updated summary only, in at most {max_tokens} tokens."""
 
 
 class AgentManager:
@@ -21,19 +37,21 @@ class AgentManager:
         self.agent_type = agent_type
         self.system_prompt = SYSTEM_PROMPTS.get(agent_type, "You are an AI assistant.")  # Default if not found
 
-        # Dynamically load relevant tools
+        # Dynamically load relevant tools; each backing tool is only built on first use
         self.tools = []
         for tool_name in TOOL_REGISTRY:
-            tool_class = globals().get(tool_name, None)  
+            tool_class = getattr(tools, tool_name, None)
             if tool_class:
-                self.tools.append(tool_class())
+                self.tools.append(LazyTool(tool_class))
 
-        print(f"🔧 Loaded Tools: {[tool.name for tool in self.tools]}")
+        logger.info("Loaded tools", extra={"agent_type": agent_type, "tools": [tool.name for tool in self.tools]})
 
         # Initialize LLM
         self.model = ChatOpenAI(
             model=config.OPENAI_MODEL,
-            api_key=config.OPENAI_API_KEY
+            api_key=config.OPENAI_API_KEY,
+            stream_usage=True,  # Token usage on streamed responses, for the LLM metrics
+            callbacks=[LLMMetricsCallback(config.OPENAI_MODEL)],
         )
         
         # Create ReAct agent
@@ -42,10 +60,38 @@ class AgentManager:
             tools=self.tools
         )
 
-    def process_query(self, query: str, history: list = None, image: dict = None):
-        """Processes a query using the correct system prompt and optional history."""
-        print(f"🔍 Processing Query: '{query}' with history length: {len(history) if history else 0}")
+        # Same agent with server-side sessions: history lives in the checkpointer (thread_id = session ID)
+        # and the prompt callable adds the system prompt and compacts it before each LLM call.
+        self.session_agent = create_react_agent(
+            model=self.model,
+            tools=self.tools,
+            checkpointer=get_session_store(),
+            prompt=RunnableCallable(self._session_prompt, self._asession_prompt, name="session_prompt"),
+        )
+
+    def _summary_messages(self, previous_summary: str, messages: list) -> list:
+        transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content', '')}" for m in messages)
+        return [
+            {"role": "system", "content": SUMMARY_PROMPT.format(max_tokens=config.HISTORY_SUMMARY_MAX_TOKENS)},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ]
 
+    def _summarize_history(self, previous_summary: str, messages: list) -> str:
+        """Folds `messages` into the rolling conversation summary."""
+        return self.model.invoke(self._summary_messages(previous_summary, messages), max_tokens=config.HISTORY_SUMMARY_MAX_TOKENS).content
+
+    async def _asummarize_history(self, previous_summary: str, messages: list) -> str:
+        return (await self.model.ainvoke(self._summary_messages(previous_summary, messages), max_tokens=config.HISTORY_SUMMARY_MAX_TOKENS)).content
+
+    def _compact_history(self, query: str, history: list, conversation_id: str = None) -> list:
+        """Trims history to the configured token budget, summarising older turns."""
+        return history_manager.compact(history or [], self._summarize_history, self.system_prompt, query, conversation_id)
+
+    async def _acompact_history(self, query: str, history: list, conversation_id: str = None) -> list:
+        return await history_manager.acompact(history or [], self._asummarize_history, self.system_prompt, query, conversation_id)
+
+    def _build_messages(self, query: str, history: list = None, image: dict = None) -> list:
+        """Builds the message list (system prompt, history, user turn) sent to the agent."""
         messages_for_agent = []
         # Add system prompt first
         messages_for_agent.append({"role": "system", "content": self.system_prompt})
@@ -53,7 +99,13 @@ class AgentManager:
         # Add existing history
         if history:
             messages_for_agent.extend(history)
-        
+
+        messages_for_agent.extend(self._user_messages(query, image))
+        logger.debug("Messages being sent to agent", extra={"message_count": len(messages_for_agent)})
+        return messages_for_agent
+
+    def _user_messages(self, query: str, image: dict = None) -> list:
+        """Returns the current user turn (text and optional image) as a one-element list, or [] if empty."""
         # Prepare content for the user's message
         user_message_content = []
         if query: # Add text part if query is not empty
@@ -69,67 +121,193 @@ class AgentManager:
         
         # Add current user query (with image if present)
         if user_message_content: # Only add if there's text or an image
-            messages_for_agent.append({"role": "user", "content": user_message_content})
+            return [{"role": "user", "content": user_message_content}]
         elif not query and not image: # Handle case where both query and image are empty, though frontend should prevent this
-            print("AgentManager: Warning - process_query called with empty query and no image.")
+            logger.warning("process_query called with empty query and no image")
             # Decide on behavior: maybe return an error or a default message
             # For now, let's allow it to proceed, agent might handle empty input.
             # Or, append an empty user message if required by the agent structure:
             # messages_for_agent.append({"role": "user", "content": ""})
             pass
+        return []
 
+    # --- Sessions ---
+    def _session_views(self, messages: list) -> list:
+        """Dict views of checkpointed messages for the history manager; "message" keeps the original."""
+        views = []
+        for message in messages:
+            content = message.content
+            if getattr(message, "tool_calls", None):
+                text = content if isinstance(content, str) else json.dumps(content, default=str)
+                content = f"{text}\n{json.dumps(message.tool_calls, default=str)}"
+            views.append({"role": SESSION_ROLES.get(message.type, message.type), "content": content, "message": message})
+        return views
 
-        
-        print(f"AgentManager: Total messages being sent to agent: {len(messages_for_agent)}")
-        # For debugging, you might want to print the full messages_for_agent if issues persist
-        # for i, msg in enumerate(messages_for_agent):
-        #     print(f"  Msg {i}: Role='{msg['role']}', Content='{msg['content'][:100]}...'")
+    def _session_messages(self, compacted: list) -> list:
+        # Views map back to the original messages; the folded-history summary becomes a system message.
+        return [SystemMessage(self.system_prompt)] + [view["message"] if "message" in view else SystemMessage(view["content"]) for view in compacted]
 
+    def _session_prompt(self, state: dict, config: dict) -> list:
+        """Builds the LLM input for a session turn: system prompt plus the compacted session history."""
+        compacted = history_manager.compact(
+            self._session_views(state["messages"]), self._summarize_history, self.system_prompt,
+            conversation_id=config["configurable"]["thread_id"],
+        )
+        return self._session_messages(compacted)
 
-        chunks = self.agent.stream({"messages": messages_for_agent})
-        
-        formatted_response = []
-        tool_outputs = [] # To store data from tool calls
-        import json # Ensure json is imported
+    async def _asession_prompt(self, state: dict, config: dict) -> list:
+        compacted = await history_manager.acompact(
+            self._session_views(state["messages"]), self._asummarize_history, self.system_prompt,
+            conversation_id=config["configurable"]["thread_id"],
+        )
+        return self._session_messages(compacted)
 
-        for chunk in chunks:
-            print(f"🛠️ Debug: {chunk}")
-            if "agent" in chunk and "messages" in chunk["agent"]:
-                last_message = chunk["agent"]["messages"][-1]
-                if isinstance(last_message, AIMessage):
-                    formatted_response.append(last_message.content)
-                # else: # No need for "No valid AI response" here as we only care about AIMessage content for final response
-                #     formatted_response.append("No valid AI response.")
-            elif "tools" in chunk and "messages" in chunk["tools"]:
-                for tool_message in chunk["tools"]["messages"]:
-                    if hasattr(tool_message, 'content') and hasattr(tool_message, 'name'):
-                        try:
-                            # Attempt to parse the JSON content of the tool message
-                            tool_data_content = json.loads(tool_message.content)
-                            tool_outputs.append({
-                                "tool_name": tool_message.name,
-                                "tool_call_id": tool_message.tool_call_id if hasattr(tool_message, 'tool_call_id') else None,
-                                "data": tool_data_content
-                            })
-                        except json.JSONDecodeError:
-                            # If content is not valid JSON, store it as a raw string
-                            tool_outputs.append({
-                                "tool_name": tool_message.name,
-                                "tool_call_id": tool_message.tool_call_id if hasattr(tool_message, 'tool_call_id') else None,
-                                "raw_content": tool_message.content,
-                                "error": "Content is not valid JSON"
-                            })
-                        except Exception as e:
-                            print(f"AgentManager: Error processing tool message content: {e}")
-                            tool_outputs.append({
-                                "tool_name": tool_message.name,
-                                "tool_call_id": tool_message.tool_call_id if hasattr(tool_message, 'tool_call_id') else None,
-                                "error": f"Error processing tool message: {str(e)}"
-                            })
+    def _prepare(self, query: str, history: list, image: dict, conversation_id: str, session_id: str):
+        """Returns (graph, input, run config) for a query, with or without a server-side session."""
+        if session_id:
+            # Only the new turn is sent; any client `history` seeds the session before it.
+            return self.session_agent, {"messages": list(history or []) + self._user_messages(query, image)}, {"configurable": {"thread_id": session_id}}
+        history = self._compact_history(query, history, conversation_id)
+        return self.agent, {"messages": self._build_messages(query, history, image)}, None
+
+    async def _aprepare(self, query: str, history: list, image: dict, conversation_id: str, session_id: str):
+        if session_id:
+            return self.session_agent, {"messages": list(history or []) + self._user_messages(query, image)}, {"configurable": {"thread_id": session_id}}
+        history = await self._acompact_history(query, history, conversation_id)
+        return self.agent, {"messages": self._build_messages(query, history, image)}, None
+
+    def _parse_tool_message(self, tool_message) -> dict:
+        """Converts a ToolMessage into a `tool_outputs` entry."""
+        tool_call_id = tool_message.tool_call_id if hasattr(tool_message, 'tool_call_id') else None
+        try:
+            # Attempt to parse the JSON content of the tool message
+            tool_data_content = json.loads(tool_message.content)
+            return {
+                "tool_name": tool_message.name,
+                "tool_call_id": tool_call_id,
+                "data": tool_data_content
+            }
+        except json.JSONDecodeError:
+            # If content is not valid JSON, store it as a raw string
+            return {
+                "tool_name": tool_message.name,
+                "tool_call_id": tool_call_id,
+                "raw_content": tool_message.content,
+                "error": "Content is not valid JSON"
+            }
+        except Exception as e:
+            logger.warning("Error processing tool message content", extra={"tool_name": tool_message.name, "error": str(e)})
+            return {
+                "tool_name": tool_message.name,
+                "tool_call_id": tool_call_id,
+                "error": f"Error processing tool message: {str(e)}"
+            }
+
+    def _handle_stream_item(self, mode: str, chunk, formatted_response: list, tool_outputs: list):
+        """Turns one (mode, chunk) item from the agent stream into zero or more events."""
+        if mode == "messages":
+            message_chunk, metadata = chunk
+            if (
+                isinstance(message_chunk, AIMessageChunk)
+                and metadata.get("langgraph_node") == "agent"
+                and isinstance(message_chunk.content, str)
+                and message_chunk.content
+            ):
+                yield {"event": "token", "data": {"content": message_chunk.content}}
+            return
 
+        if config.LOG_VERBOSE_CHUNKS:
+            logger.info("Agent stream chunk", extra={"chunk": chunk})
+        if "agent" in chunk and "messages" in chunk["agent"]:
+            last_message = chunk["agent"]["messages"][-1]
+            if isinstance(last_message, AIMessage):
+                formatted_response.append(last_message.content)
+                for tool_call in last_message.tool_calls or []:
+                    yield {
+                        "event": "tool_start",
+                        "data": {"tool_name": tool_call["name"], "tool_call_id": tool_call["id"], "args": tool_call["args"]},
+                    }
+        elif "tools" in chunk and "messages" in chunk["tools"]:
+            for tool_message in chunk["tools"]["messages"]:
+                if hasattr(tool_message, 'content') and hasattr(tool_message, 'name'):
+                    tool_output = self._parse_tool_message(tool_message)
+                    tool_outputs.append(tool_output)
+                    yield {
+                        "event": "tool_end",
+                        "data": {
+                            "tool_name": tool_output["tool_name"],
+                            "tool_call_id": tool_output["tool_call_id"],
+                            "status": "error" if "error" in tool_output else "success",
+                        },
+                    }
+                    yield {"event": "tool_output", "data": tool_output}
 
+    def _final_event(self, formatted_response: list, tool_outputs: list) -> dict:
+        # Every agent-node update is one LLM step of the ReAct loop.
+        REACT_ITERATIONS.labels(self.agent_type).observe(len(formatted_response))
         final_response_text = "\n".join(formatted_response).strip()
         if not final_response_text: # Ensure there's always some text response
             final_response_text = "Agent processed the request."
-            
-        return {"text_response": final_response_text, "tool_outputs": tool_outputs}
+        return {"event": "final", "data": {"text_response": final_response_text, "tool_outputs": tool_outputs}}
+
+    def stream_query(self, query: str, history: list = None, image: dict = None, conversation_id: str = None, session_id: str = None):
+        """
+        Streams a query as events: `token` (LLM text), `tool_start`, `tool_end`,
+        `tool_output` (parsed tool result) and a closing `final` event with the
+        same payload `process_query` returns.
+        """
+        logger.info("Streaming query", extra={"query": query, "history_length": len(history) if history else 0, "session_id": session_id})
+        graph, agent_input, run_config = self._prepare(query, history, image, conversation_id, session_id)
+
+        formatted_response = []
+        tool_outputs = [] # To store data from tool calls
+        for mode, chunk in graph.stream(agent_input, run_config, stream_mode=["messages", "updates"]):
+            yield from self._handle_stream_item(mode, chunk, formatted_response, tool_outputs)
+
+        yield self._final_event(formatted_response, tool_outputs)
+
+    async def astream_query(self, query: str, history: list = None, image: dict = None, conversation_id: str = None, session_id: str = None):
+        """Async variant of `stream_query` driven by `agent.astream`."""
+        logger.info("Streaming query (async)", extra={"query": query, "history_length": len(history) if history else 0, "session_id": session_id})
+        graph, agent_input, run_config = await self._aprepare(query, history, image, conversation_id, session_id)
+
+        formatted_response = []
+        tool_outputs = [] # To store data from tool calls
+        async for mode, chunk in graph.astream(agent_input, run_config, stream_mode=["messages", "updates"]):
+            for event in self._handle_stream_item(mode, chunk, formatted_response, tool_outputs):
+                yield event
+
+        yield self._final_event(formatted_response, tool_outputs)
+
+    def process_query(self, query: str, history: list = None, image: dict = None, conversation_id: str = None, session_id: str = None):
+        """
+        Processes a query using the correct system prompt and optional history.
+
+        With `session_id`, the conversation is kept server-side and only the new
+        turn needs to be sent; `history`, if given, is added to the session first.
+        """
+        logger.info("Processing query", extra={"query": query, "history_length": len(history) if history else 0, "session_id": session_id})
+        graph, agent_input, run_config = self._prepare(query, history, image, conversation_id, session_id)
+
+        chunks = graph.stream(agent_input, run_config)
+
+        formatted_response = []
+        tool_outputs = [] # To store data from tool calls
+        for chunk in chunks:
+            for _ in self._handle_stream_item("updates", chunk, formatted_response, tool_outputs):
+                pass
+
+        return self._final_event(formatted_response, tool_outputs)["data"]
+
+    async def aprocess_query(self, query: str, history: list = None, image: dict = None, conversation_id: str = None, session_id: str = None):
+        """Async variant of `process_query`; tools run through their non-blocking `_arun`."""
+        logger.info("Processing query (async)", extra={"query": query, "history_length": len(history) if history else 0, "session_id": session_id})
+        graph, agent_input, run_config = await self._aprepare(query, history, image, conversation_id, session_id)
+
+        formatted_response = []
+        tool_outputs = [] # To store data from tool calls
+        async for chunk in graph.astream(agent_input, run_config):
+            for _ in self._handle_stream_item("updates", chunk, formatted_response, tool_outputs):
+                pass
+
+        return self._final_event(formatted_response, tool_outputs)["data"]
@@ -0,0 +1,175 @@
+import os
+import sys
+import asyncio
+import hashlib
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import config
+from agents.agent_manager import AgentManager
+from logger import get_logger
+
+logger = get_logger("agent_pool")
+
+
+def config_fingerprint(agent_type: str) -> str:
+    """Hashes the config values an AgentManager is built from."""
+    parts = [
+        config.OPENAI_MODEL,
+        config.SYSTEM_PROMPTS.get(agent_type, ""),
+        ",".join(config.TOOL_REGISTRY),
+    ]
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class _PooledManager:
+    """A prebuilt AgentManager plus its lease count."""
+
+    def __init__(self, manager: AgentManager, generation: int):
+        self.manager = manager
+        self.generation = generation
+        self.leases = 0
+
+
+class AgentPool:
+    """
+    Process-wide pool of prebuilt AgentManagers keyed by agent type and tool set.
+
+    Compiled ReAct graphs are reentrant, so a manager may be leased to several
+    requests at once. A new manager is only built when every pooled manager is
+    busy and the pool is below `max_size`; otherwise the least loaded one is shared.
+    """
+
+    def __init__(self, min_size: int = None, max_size: int = None):
+        self.min_size = config.AGENT_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = max(1, config.AGENT_POOL_MAX_SIZE if max_size is None else max_size)
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._managers = {}
+        self._fingerprints = {}
+        self._generation = 0
+
+    def _key(self, agent_type: str):
+        return (agent_type, tuple(config.TOOL_REGISTRY))
+
+    def _build(self, agent_type: str) -> AgentManager:
+        return AgentManager(agent_type=agent_type)
+
+    def _check_fingerprint(self, key, agent_type: str):
+        """Drops pooled managers whose config changed since they were built. Caller holds the lock."""
+        fingerprint = config_fingerprint(agent_type)
+        if self._fingerprints.get(key) not in (None, fingerprint):
+            logger.info("Config changed, invalidating pooled managers", extra={"agent_type": agent_type})
+            self._managers.pop(key, None)
+        self._fingerprints[key] = fingerprint
+
+    def _pick(self, key):
+        """Leases an idle (or, at capacity, the least loaded) manager. Caller holds the lock."""
+        entries = self._managers.setdefault(key, [])
+        idle = [entry for entry in entries if entry.leases == 0]
+        if not idle and len(entries) < self.max_size:
+            return None
+        entry = idle[0] if idle else min(entries, key=lambda e: e.leases)
+        entry.leases += 1
+        return entry
+
+    def _try_lease(self, agent_type: str) -> _PooledManager:
+        """Leases a pooled manager without building one; returns None if a build is needed."""
+        key = self._key(agent_type)
+        with self._lock:
+            self._check_fingerprint(key, agent_type)
+            return self._pick(key)
+
+    def _lease(self, agent_type: str) -> _PooledManager:
+        entry = self._try_lease(agent_type)
+        if entry:
+            return entry
+        key = self._key(agent_type)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Build outside the pool lock so other agent types are not blocked.
+        with build_lock:
+            with self._lock:
+                entry = self._pick(key)
+                generation = self._generation
+            if entry:
+                return entry
+            entry = _PooledManager(self._build(agent_type), generation)
+            with self._lock:
+                entry.leases += 1
+                if entry.generation == self._generation:
+                    self._managers.setdefault(key, []).append(entry)
+            return entry
+
+    def _release(self, entry: _PooledManager):
+        with self._lock:
+            entry.leases -= 1
+
+    @contextmanager
+    def acquire(self, agent_type: str = "financial_assistant"):
+        """Leases a manager for `agent_type` for the duration of the block."""
+        entry = self._lease(agent_type)
+        try:
+            yield entry.manager
+        finally:
+            self._release(entry)
+
+    @asynccontextmanager
+    async def acquire_async(self, agent_type: str = "financial_assistant"):
+        """Async variant of `acquire`; a cold build runs in a worker thread instead of on the event loop."""
+        entry = self._try_lease(agent_type) or await asyncio.to_thread(self._lease, agent_type)
+        try:
+            yield entry.manager
+        finally:
+            self._release(entry)
+
+    def warm(self, agent_types=None):
+        """Prebuilds `min_size` managers for each agent type."""
+        agent_types = agent_types or list(config.SYSTEM_PROMPTS.keys())
+        for agent_type in agent_types:
+            key = self._key(agent_type)
+            with self._lock:
+                self._check_fingerprint(key, agent_type)
+                missing = self.min_size - len(self._managers.get(key, []))
+                generation = self._generation
+            for _ in range(max(0, min(missing, self.max_size))):
+                entry = _PooledManager(self._build(agent_type), generation)
+                with self._lock:
+                    if entry.generation == self._generation:
+                        self._managers.setdefault(key, []).append(entry)
+            logger.info("Warmed agent pool", extra={"agent_type": agent_type, "managers": len(self._managers.get(key, []))})
+
+    def invalidate(self, agent_type: str = None):
+        """Discards pooled managers (all, or those for `agent_type`). Leased managers finish their request first."""
+        with self._lock:
+            self._generation += 1
+            if agent_type is None:
+                self._managers.clear()
+                self._fingerprints.clear()
+                return
+            for key in [key for key in self._managers if key[0] == agent_type]:
+                self._managers.pop(key, None)
+                self._fingerprints.pop(key, None)
+
+    def stats(self) -> dict:
+        """Returns the number of pooled and leased managers per agent type."""
+        with self._lock:
+            return {
+                key[0]: {
+                    "managers": len(entries),
+                    "leases": sum(entry.leases for entry in entries),
+                }
+                for key, entries in self._managers.items()
+            }
+
+    def close(self):
+        """Drops every pooled manager. Called on application shutdown."""
+        self.invalidate()
+
+
+agent_pool = AgentPool()
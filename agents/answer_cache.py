@@ -0,0 +1,168 @@
+import os
+import sys
+import re
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from metrics import CACHE_REQUESTS
+
+# Words that may differ between two queries without changing what is asked.
+FILLER_WORDS = {
+    "a", "an", "the", "of", "for", "to", "in", "on", "at", "is", "are", "was", "what", "whats", "what's",
+    "how", "much", "me", "tell", "show", "give", "please", "can", "you", "could", "i", "get", "current",
+    "currently", "now", "right", "today", "latest", "price", "prices", "quote", "stock", "share", "shares",
+    "trading", "doing", "value", "worth", "about", "s",
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, drops punctuation (keeping ticker/pair characters) and collapses whitespace."""
+    query = re.sub(r"[^\w\s./$-]", " ", query.lower())
+    return re.sub(r"\s+", " ", query).strip(" .")
+
+
+def content_text(normalized: str) -> str:
+    """
+    The query without filler words, in order; near-duplicates must have exactly
+    this text, so amounts and direction ("usd to eur" / "eur to usd") must agree.
+    """
+    return " ".join(word for word in normalized.split() if word not in FILLER_WORDS)
+
+
+class _Entry:
+    __slots__ = ("key", "agent_type", "content", "response", "expires_at", "size_bytes")
+
+    def __init__(self, key, agent_type, content, response, expires_at, size_bytes):
+        self.key = key
+        self.agent_type = agent_type
+        self.content = content
+        self.response = response
+        self.expires_at = expires_at
+        self.size_bytes = size_bytes
+
+
+class AnswerCache:
+    """
+    Caches final chat answers keyed by normalised query and agent type.
+
+    Exact matches hit a dict; near-duplicates ("price of AAPL" / "what's the AAPL
+    price") are queries whose content words, in order, are identical once filler
+    words are dropped. Fuzzier matching is deliberately avoided: an unordered
+    similarity treats "100 usd to eur" and "100 eur to usd" as the same question.
+    Entry TTLs follow the most volatile tool behind the answer, and the cache is
+    an LRU bounded by approximate memory use.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or config.ANSWER_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_content = {}  # (agent_type, content text) -> key of the latest entry with it
+        self.size_bytes = 0
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def ttl_for(self, response: dict) -> float:
+        """Returns the TTL for an answer: the shortest TTL among the tools that produced it."""
+        tool_names = {output.get("tool_name") for output in response.get("tool_outputs") or []}
+        if not tool_names:
+            return config.ANSWER_CACHE_NO_TOOL_TTL
+        return min(config.ANSWER_CACHE_TOOL_TTLS.get(name, config.ANSWER_CACHE_DEFAULT_TOOL_TTL) for name in tool_names)
+
+    def _key(self, normalized: str, agent_type: str) -> str:
+        return f"{agent_type}\x00{normalized}"
+
+    def _remove(self, key: str):
+        """Drops an entry. Caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.size_bytes -= entry.size_bytes
+            if self._by_content.get((entry.agent_type, entry.content)) == key:
+                del self._by_content[(entry.agent_type, entry.content)]
+
+    def _near_match(self, agent_type: str, content: str, now: float):
+        """Finds a live entry for `agent_type` with the same content words in the same order. Caller holds the lock."""
+        entry = self._entries.get(self._by_content.get((agent_type, content)))
+        if entry and entry.expires_at > now:
+            return entry
+        return None
+
+    def get(self, query: str, agent_type: str):
+        """Returns a cached response dict for the query, or None."""
+        normalized = normalize_query(query)
+        key = self._key(normalized, agent_type)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.expires_at <= now:
+                self._remove(key)
+                entry = None
+            if entry:
+                self.hits += 1
+                CACHE_REQUESTS.labels("answer", "hit").inc()
+            elif content_text(normalized):
+                entry = self._near_match(agent_type, content_text(normalized), now)
+                if entry:
+                    self.near_hits += 1
+                    CACHE_REQUESTS.labels("answer", "near_hit").inc()
+            if not entry:
+                self.misses += 1
+                CACHE_REQUESTS.labels("answer", "miss").inc()
+                return None
+            self._entries.move_to_end(entry.key)
+            return copy.deepcopy(entry.response)
+
+    def put(self, query: str, agent_type: str, response: dict):
+        """Stores a response unless it came from an uncacheable or failing tool call."""
+        tool_outputs = response.get("tool_outputs") or []
+        if any("error" in output for output in tool_outputs):
+            return
+        ttl = self.ttl_for(response)
+        if ttl <= 0:
+            return
+
+        normalized = normalize_query(query)
+        key = self._key(normalized, agent_type)
+        content = content_text(normalized)
+        size_bytes = len(json.dumps(response, default=str)) + len(key) + len(content)
+        if size_bytes > self.max_bytes:
+            return
+
+        entry = _Entry(key, agent_type, content, copy.deepcopy(response), time.monotonic() + ttl, size_bytes)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            if content:
+                self._by_content[(agent_type, content)] = key
+            self.size_bytes += size_bytes
+            while self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_content.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+            }
+
+
+answer_cache = AnswerCache()
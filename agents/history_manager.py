@@ -0,0 +1,193 @@
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+
+logger = get_logger("history_manager")
+
+# Tokens the chat format adds around every message (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+# Flat estimate for an image part; images are billed separately from text.
+IMAGE_PART_TOKENS = 85
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def _message_digest(message: dict) -> str:
+    return hashlib.sha1(f"{message.get('role', '')}\x00{_message_text(message)}".encode("utf-8")).hexdigest()
+
+
+class HistoryManager:
+    """
+    Keeps the conversation history sent to the agent within a token budget.
+
+    The newest turns are kept verbatim; older turns are folded into a rolling
+    summary that is cached per conversation and extended incrementally, so the
+    LLM is only asked to summarise again once the kept window overflows.
+    """
+
+    def __init__(self, token_budget: int = None, target_ratio: float = None):
+        self.token_budget = token_budget or config.HISTORY_TOKEN_BUDGET
+        self.target_ratio = target_ratio or config.HISTORY_TARGET_RATIO
+        self._encoding = None
+        self._lock = threading.Lock()
+        self._token_counts = OrderedDict()
+        self._summaries = OrderedDict()
+
+    # --- Token counting ---
+    def _get_encoding(self):
+        if self._encoding is None:
+            import tiktoken
+            try:
+                self._encoding = tiktoken.encoding_for_model(config.OPENAI_MODEL)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+        return self._encoding
+
+    def count_text_tokens(self, text: str) -> int:
+        return len(self._get_encoding().encode(text, disallowed_special=()))
+
+    def count_tokens(self, message: dict) -> int:
+        """Counts a message's tokens, caching the result by message content."""
+        digest = _message_digest(message)
+        with self._lock:
+            if digest in self._token_counts:
+                self._token_counts.move_to_end(digest)
+                return self._token_counts[digest]
+
+        tokens = MESSAGE_OVERHEAD_TOKENS + self.count_text_tokens(_message_text(message))
+        content = message.get("content")
+        if isinstance(content, list):
+            tokens += IMAGE_PART_TOKENS * sum(1 for part in content if isinstance(part, dict) and part.get("type") == "image_url")
+
+        with self._lock:
+            self._token_counts[digest] = tokens
+            while len(self._token_counts) > config.HISTORY_TOKEN_CACHE_SIZE:
+                self._token_counts.popitem(last=False)
+        return tokens
+
+    # --- Planning ---
+    def conversation_id(self, history: list) -> str:
+        """Derives a stable conversation key from the first message when the client sends none."""
+        return _message_digest(history[0]) if history else ""
+
+    def _prefix_digest(self, history: list, count: int) -> str:
+        digest = hashlib.sha1()
+        for message in history[:count]:
+            digest.update(_message_digest(message).encode("ascii"))
+        return digest.hexdigest()
+
+    def _plan(self, history: list, reserved_tokens: int, cached_count: int):
+        """
+        Returns how many leading messages to fold into the summary (0 = none).
+
+        Reuses the cached fold boundary while the remaining window fits; otherwise
+        folds down to `target_ratio` of the budget so the next turns fit without
+        another summary call. Boundaries always fall on the start of a user turn.
+        """
+        budget = max(0, self.token_budget - reserved_tokens)
+        counts = [self.count_tokens(message) for message in history]
+        if sum(counts) <= budget:
+            return 0
+        if cached_count and sum(counts[cached_count:]) <= budget - config.HISTORY_SUMMARY_MAX_TOKENS:
+            return cached_count
+
+        target = int(budget * self.target_ratio) - config.HISTORY_SUMMARY_MAX_TOKENS
+        turn_starts = [i for i, message in enumerate(history) if message.get("role") == "user"]
+        kept_tokens = 0
+        boundary = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            kept_tokens += counts[index]
+            if kept_tokens > target:
+                break
+            if index in turn_starts:
+                boundary = index
+        # Always keep at least the latest turn (the user message and the AI/tool messages after it)
+        # verbatim, even over budget; if that turn is the first one, nothing is folded.
+        if boundary == len(history):
+            boundary = turn_starts[-1] if turn_starts else len(history)
+        return max(boundary, cached_count)
+
+    def _lookup(self, conversation_id: str, history: list):
+        """Returns the cached (count, summary) if it still matches this history's prefix."""
+        with self._lock:
+            cached = self._summaries.get(conversation_id)
+            if cached:
+                self._summaries.move_to_end(conversation_id)
+        if not cached:
+            return 0, None
+        count, digest, summary = cached
+        if count <= len(history) and self._prefix_digest(history, count) == digest:
+            return count, summary
+        return 0, None
+
+    def _store(self, conversation_id: str, history: list, count: int, summary: str):
+        with self._lock:
+            self._summaries[conversation_id] = (count, self._prefix_digest(history, count), summary)
+            self._summaries.move_to_end(conversation_id)
+            while len(self._summaries) > config.HISTORY_SUMMARY_CACHE_SIZE:
+                self._summaries.popitem(last=False)
+
+    def _compose(self, history: list, fold_count: int, summary: str) -> list:
+        if not fold_count:
+            return list(history)
+        return [{"role": "system", "content": SUMMARY_PREFIX + summary}] + list(history[fold_count:])
+
+    def _reserved_tokens(self, system_prompt: str, query: str) -> int:
+        return self.count_tokens({"role": "system", "content": system_prompt}) + self.count_tokens({"role": "user", "content": query or ""})
+
+    # --- Public API ---
+    def compact(self, history: list, summarize, system_prompt: str = "", query: str = "", conversation_id: str = None) -> list:
+        """
+        Returns `history` trimmed to the budget, with folded turns replaced by a summary message.
+
+        `summarize(previous_summary, messages)` returns the updated summary text.
+        """
+        if not history:
+            return []
+        conversation_id = conversation_id or self.conversation_id(history)
+        cached_count, cached_summary = self._lookup(conversation_id, history)
+        fold_count = self._plan(history, self._reserved_tokens(system_prompt, query), cached_count)
+        if fold_count == 0:
+            return list(history)
+        if fold_count == cached_count:
+            return self._compose(history, fold_count, cached_summary)
+
+        summary = summarize(cached_summary, history[cached_count:fold_count])
+        self._store(conversation_id, history, fold_count, summary)
+        logger.info("Folded messages into the summary", extra={"conversation_id": conversation_id[:8], "folded": fold_count})
+        return self._compose(history, fold_count, summary)
+
+    async def acompact(self, history: list, asummarize, system_prompt: str = "", query: str = "", conversation_id: str = None) -> list:
+        """Async variant of `compact`; `asummarize` is awaited."""
+        if not history:
+            return []
+        conversation_id = conversation_id or self.conversation_id(history)
+        cached_count, cached_summary = self._lookup(conversation_id, history)
+        fold_count = self._plan(history, self._reserved_tokens(system_prompt, query), cached_count)
+        if fold_count == 0:
+            return list(history)
+        if fold_count == cached_count:
+            return self._compose(history, fold_count, cached_summary)
+
+        summary = await asummarize(cached_summary, history[cached_count:fold_count])
+        self._store(conversation_id, history, fold_count, summary)
+        logger.info("Folded messages into the summary", extra={"conversation_id": conversation_id[:8], "folded": fold_count})
+        return self._compose(history, fold_count, summary)
+
+
+history_manager = HistoryManager()
@@ -0,0 +1,370 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterator, Optional, Sequence
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import msgpack
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS
+import config
+from tools.async_utils import run_blocking
+from logger import get_logger
+
+logger = get_logger("session_store")
+
+
+class _SessionRecord:
+    """Latest checkpoint of one session namespace, kept in serialised form."""
+
+    __slots__ = ("checkpoint_id", "parent_id", "checkpoint", "metadata", "writes", "parent_sends", "size_bytes")
+
+    def __init__(self, checkpoint_id, parent_id, checkpoint, metadata, writes=None, parent_sends=None):
+        self.checkpoint_id = checkpoint_id
+        self.parent_id = parent_id
+        self.checkpoint = checkpoint  # (type, bytes) from serde.dumps_typed
+        self.metadata = metadata
+        self.writes = writes or {}  # (task_id, idx) -> (task_id, channel, (type, bytes), task_path)
+        self.parent_sends = parent_sends or []  # TASKS writes of the parent checkpoint, sorted
+        self.size_bytes = (
+            len(self.checkpoint[1]) + len(self.metadata[1])
+            + sum(len(write[2][1]) for write in self.writes.values())
+            + sum(len(write[2][1]) for write in self.parent_sends)
+        )
+
+    def pack(self) -> bytes:
+        return msgpack.packb([
+            self.checkpoint_id, self.parent_id, list(self.checkpoint), list(self.metadata),
+            [[task_id, idx, write[1], list(write[2]), write[3]] for (task_id, idx), write in self.writes.items()],
+            [[write[0], write[1], list(write[2]), write[3]] for write in self.parent_sends],
+        ], use_bin_type=True)
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "_SessionRecord":
+        checkpoint_id, parent_id, checkpoint, metadata, writes, parent_sends = msgpack.unpackb(data, raw=False)
+        return cls(
+            checkpoint_id, parent_id, tuple(checkpoint), tuple(metadata),
+            {(task_id, idx): (task_id, channel, tuple(value), task_path) for task_id, idx, channel, value, task_path in writes},
+            [(task_id, channel, tuple(value), task_path) for task_id, channel, value, task_path in parent_sends],
+        )
+
+
+class SessionStore(BaseCheckpointSaver, ABC):
+    """
+    LangGraph checkpointer for server-side chat sessions (thread_id = session ID).
+
+    Unlike the stock savers it keeps only the latest checkpoint per session, which
+    is all a chat turn needs to resume, so memory grows with the number of live
+    sessions rather than with every step ever taken. Subclasses provide storage
+    and eviction.
+    """
+
+    @abstractmethod
+    def _load(self, thread_id: str, checkpoint_ns: str) -> Optional[_SessionRecord]:
+        """The session namespace's latest record, or None."""
+
+    @abstractmethod
+    def _save(self, thread_id: str, checkpoint_ns: str, record: _SessionRecord):
+        """Replaces the session namespace's record."""
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> bool:
+        """Drops a session; returns whether it existed."""
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Backend name, session count and stored size."""
+
+    def close(self):
+        pass
+
+    # --- Checkpointer API ---
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, record: _SessionRecord) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": record.checkpoint_id}},
+            checkpoint={
+                **self.serde.loads_typed(record.checkpoint),
+                "pending_sends": [self.serde.loads_typed(write[2]) for write in record.parent_sends],
+            },
+            metadata=self.serde.loads_typed(record.metadata),
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value)) for task_id, channel, value, _ in record.writes.values()],
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": record.parent_id}}
+                if record.parent_id else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        record = self._load(thread_id, checkpoint_ns)
+        if record is None:
+            return None
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id and checkpoint_id != record.checkpoint_id:
+            return None  # Older checkpoints are not retained
+        return self._to_tuple(thread_id, checkpoint_ns, record)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if not config or (limit is not None and limit <= 0):
+            return
+        checkpoint_tuple = self.get_tuple(config)
+        if checkpoint_tuple is None:
+            return
+        before_id = get_checkpoint_id(before) if before else None
+        if before_id and checkpoint_tuple.config["configurable"]["checkpoint_id"] >= before_id:
+            return
+        if filter and not all(checkpoint_tuple.metadata.get(key) == value for key, value in filter.items()):
+            return
+        yield checkpoint_tuple
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+
+        checkpoint = checkpoint.copy()
+        checkpoint.pop("pending_sends", None)
+        previous = self._load(thread_id, checkpoint_ns)
+        parent_sends = []
+        if previous is not None and previous.checkpoint_id == parent_id:
+            parent_sends = sorted(
+                (write for write in previous.writes.values() if write[1] == TASKS),
+                key=lambda write: (write[3], write[0]),
+            )
+        record = _SessionRecord(
+            checkpoint["id"],
+            parent_id,
+            self.serde.dumps_typed(checkpoint),
+            self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+            parent_sends=parent_sends,
+        )
+        self._save(thread_id, checkpoint_ns, record)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        record = self._load(thread_id, checkpoint_ns)
+        if record is None or record.checkpoint_id != config["configurable"]["checkpoint_id"]:
+            return  # Writes for a checkpoint that has since been replaced
+        # Records are replaced, never mutated, so size accounting and concurrent readers stay consistent.
+        pending = dict(record.writes)
+        for idx, (channel, value) in enumerate(writes):
+            key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+            if key[1] >= 0 and key in pending:
+                continue
+            pending[key] = (task_id, channel, self.serde.dumps_typed(value), task_path)
+        record = _SessionRecord(record.checkpoint_id, record.parent_id, record.checkpoint, record.metadata, pending, record.parent_sends)
+        self._save(thread_id, checkpoint_ns, record)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions with LRU, idle-TTL and total-size eviction."""
+
+    def __init__(self, max_sessions: int = None, ttl_seconds: float = None, max_bytes: int = None):
+        super().__init__()
+        self.max_sessions = max_sessions or config.SESSION_MAX_COUNT
+        self.ttl_seconds = ttl_seconds or config.SESSION_TTL_SECONDS
+        self.max_bytes = max_bytes or config.SESSION_MAX_BYTES
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # thread_id -> {checkpoint_ns: record}, least recently used first
+        self._touched = {}  # thread_id -> monotonic time of last write
+        self.size_bytes = 0
+        self.evicted = 0
+
+    def _drop(self, thread_id: str):
+        """Removes a session. Caller holds the lock."""
+        namespaces = self._sessions.pop(thread_id, None)
+        self._touched.pop(thread_id, None)
+        if namespaces:
+            self.size_bytes -= sum(record.size_bytes for record in namespaces.values())
+
+    def _evict(self, now: float):
+        """Drops expired sessions, then the least recently used beyond the caps. Caller holds the lock."""
+        expired = [thread_id for thread_id, touched in self._touched.items() if now - touched > self.ttl_seconds]
+        for thread_id in expired:
+            self._drop(thread_id)
+        self.evicted += len(expired)
+        while self._sessions and (len(self._sessions) > self.max_sessions or self.size_bytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+            self.evicted += 1
+
+    def _load(self, thread_id: str, checkpoint_ns: str) -> Optional[_SessionRecord]:
+        with self._lock:
+            namespaces = self._sessions.get(thread_id)
+            if namespaces is None:
+                return None
+            if time.monotonic() - self._touched[thread_id] > self.ttl_seconds:
+                self._drop(thread_id)
+                self.evicted += 1
+                return None
+            self._sessions.move_to_end(thread_id)
+            return namespaces.get(checkpoint_ns)
+
+    def _save(self, thread_id: str, checkpoint_ns: str, record: _SessionRecord):
+        now = time.monotonic()
+        with self._lock:
+            namespaces = self._sessions.setdefault(thread_id, {})
+            previous = namespaces.get(checkpoint_ns)
+            if previous is not None:
+                self.size_bytes -= previous.size_bytes
+            namespaces[checkpoint_ns] = record
+            self.size_bytes += record.size_bytes
+            self._sessions.move_to_end(thread_id)
+            self._touched[thread_id] = now
+            self._evict(now)
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock:
+            existed = session_id in self._sessions
+            self._drop(session_id)
+            return existed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "sessions": len(self._sessions), "size_bytes": self.size_bytes, "evicted": self.evicted}
+
+
+class SqliteSessionStore(SessionStore):
+    """Sessions persisted in SQLite (one row per session namespace), evicted by idle TTL and count."""
+
+    # Eviction queries run once per this many writes instead of on every checkpoint.
+    SWEEP_EVERY = 100
+
+    def __init__(self, path: str = None, max_sessions: int = None, ttl_seconds: float = None):
+        super().__init__()
+        self.path = path or config.SESSION_SQLITE_PATH
+        self.max_sessions = max_sessions or config.SESSION_MAX_COUNT
+        self.ttl_seconds = ttl_seconds or config.SESSION_TTL_SECONDS
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " size_bytes INTEGER NOT NULL, record BLOB NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._writes_since_sweep = 0
+        self.evicted = 0
+
+    def _sweep(self):
+        """Deletes expired sessions and the oldest beyond `max_sessions`. Caller holds the lock."""
+        cursor = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+        evicted = cursor.rowcount
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE thread_id IN ("
+            " SELECT thread_id FROM sessions GROUP BY thread_id ORDER BY MAX(updated_at) DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,),
+        )
+        self.evicted += evicted + cursor.rowcount
+
+    def _load(self, thread_id: str, checkpoint_ns: str) -> Optional[_SessionRecord]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, updated_at FROM sessions WHERE thread_id = ? AND checkpoint_ns = ?",
+                (thread_id, checkpoint_ns),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return _SessionRecord.unpack(row[0])
+
+    def _save(self, thread_id: str, checkpoint_ns: str, record: _SessionRecord):
+        data = record.pack()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (thread_id, checkpoint_ns, updated_at, size_bytes, record) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, time.time(), record.size_bytes, data),
+            )
+            self._writes_since_sweep += 1
+            if self._writes_since_sweep >= self.SWEEP_EVERY:
+                self._writes_since_sweep = 0
+                self._sweep()
+
+    def delete_session(self, session_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute("DELETE FROM sessions WHERE thread_id = ?", (session_id,)).rowcount > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, size_bytes = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COALESCE(SUM(size_bytes), 0) FROM sessions"
+            ).fetchone()
+        return {"backend": "sqlite", "sessions": sessions, "size_bytes": size_bytes, "evicted": self.evicted}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Disk I/O stays off the event loop.
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await run_blocking(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in await run_blocking(lambda: list(self.list(config, filter=filter, before=before, limit=limit))):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions) -> RunnableConfig:
+        return await run_blocking(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]], task_id: str, task_path: str = "") -> None:
+        await run_blocking(self.put_writes, config, writes, task_id, task_path)
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Returns the process-wide session store selected by `config.SESSION_STORE`."""
+    global _session_store
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                if config.SESSION_STORE == "sqlite":
+                    _session_store = SqliteSessionStore()
+                else:
+                    _session_store = MemorySessionStore()
+                logger.info("Session store ready", extra={"backend": config.SESSION_STORE})
+    return _session_store
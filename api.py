@@ -1,8 +1,15 @@
 import os
 import sys
-from fastapi import FastAPI, HTTPException
+import json
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
+from sse_starlette.sse import EventSourceResponse
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
@@ -11,12 +18,29 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(BASE_DIR)
 sys.path.append(PROJECT_ROOT)
 
+import config
+from tools.async_utils import shutdown_executor
+from tools.exchange_pool import shutdown_exchange_pool
+from tools.http_client import close_http_clients
+from tools.quote_hub import quote_hub
+from metrics import REQUEST_ERRORS, observe_request, render_metrics
+from image_store import ImageTooLargeError, ImageUpload, InvalidImageError, MultipartFileReader, image_store
+from logger import bind_request, get_logger, log_payload, new_request_id, request_id_var, reset_request
+
+logger = get_logger("api")
+
 # Conditional import for AgentManager
 try:
     from agents.agent_manager import AgentManager
+    from agents.agent_pool import agent_pool
+    from agents.answer_cache import answer_cache
+    from agents.session_store import get_session_store
 except ImportError:
-    print("Warning: Could not import AgentManager. Ensure it's correctly placed and has no import errors.")
+    logger.exception("Could not import AgentManager. Ensure it's correctly placed and has no import errors.")
     AgentManager = None 
+    agent_pool = None
+    answer_cache = None
+    get_session_store = None
 
 # Load environment variables
 dotenv_path = os.path.join(PROJECT_ROOT, '.env')
@@ -36,20 +60,91 @@ class ChatRequest(BaseModel):
     query: str
     agent_type: str = "financial_assistant"
     history: Optional[List[Message]] = Field(default_factory=list)
-    image: Optional[ImageSource] = None
+    image: Optional[ImageSource] = None  # Inline base64; prefer uploading once via POST /images and sending image_id
+    image_id: Optional[str] = None  # From POST /images; reuses the processed image
+    conversation_id: Optional[str] = None  # Keys the cached history summary; derived from the history if omitted
+    session_id: Optional[str] = None  # Server-side session from POST /sessions; send only the new turn
 
 class ChatResponse(BaseModel):
     response: str
     tool_outputs: Optional[List[Dict]] = Field(default_factory=list)
 
+class SessionResponse(BaseModel):
+    session_id: str
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    max_concurrency: Optional[int] = None  # Defaults to BATCH_DEFAULT_CONCURRENCY, capped at BATCH_MAX_CONCURRENCY
+
+def _check_agent_type(agent_type: str):
+    """Rejects unknown agent types; each accepted one gets its own pooled managers and metric labels."""
+    if agent_type not in config.SYSTEM_PROMPTS:
+        raise HTTPException(status_code=400, detail=f"Unknown agent_type '{agent_type}'; use one of: {', '.join(config.SYSTEM_PROMPTS)}.")
+
+def _is_cacheable(request_data: ChatRequest) -> bool:
+    """Only standalone text questions are answered from the cache; history, sessions or images change the answer."""
+    return (
+        config.ANSWER_CACHE_ENABLED and answer_cache is not None
+        and not request_data.history and not request_data.image and not request_data.image_id and not request_data.session_id
+    )
+
+# --- Application Lifecycle ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if agent_pool is not None and config.AGENT_POOL_WARM_ON_STARTUP:
+        try:
+            await run_in_threadpool(agent_pool.warm)
+        except Exception as e:
+            logger.warning("Agent pool warm-up failed, managers will be built on demand", extra={"error": str(e)})
+    try:
+        await quote_hub.start()
+    except Exception as e:
+        logger.warning("Quote hub failed to start, price tools will poll providers", extra={"error": str(e)})
+    yield
+    await quote_hub.stop()
+    if agent_pool is not None:
+        agent_pool.close()
+    if get_session_store is not None:
+        get_session_store().close()
+    shutdown_exchange_pool()
+    await close_http_clients()
+    shutdown_executor()
+
 # --- FastAPI App Setup ---
 app = FastAPI(
     title="Finance Agent API V2",
     docs_url=None,
-    redoc_url=None
+    redoc_url=None,
+    lifespan=lifespan
 )
 
 
+# --- Request Context Middleware ---
+class RequestContextMiddleware:
+    """Binds a correlation ID (incoming X-Request-ID or a new one) to each request and echoes it back."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1").strip()
+        request_id = incoming[:64] or new_request_id()
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        tokens = bind_request(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_request(tokens)
+
+app.add_middleware(RequestContextMiddleware)
+
 # --- CORS Middleware Configuration ---
 # app.add_middleware(
 #     CORSMiddleware,
@@ -65,6 +160,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
 # --- Health Check Endpoint ---
@@ -76,54 +172,245 @@ async def read_root():
 async def health_check():
     return {"status": "healthy"}
 
-# --- API Endpoint ---
-@app.post("/chat", response_model=ChatResponse)
-async def handle_chat(request_data: ChatRequest):
-    print(f"API: /chat endpoint hit. Request query: '{request_data.query}', agent_type: '{request_data.agent_type}'")
-    if AgentManager is None:
-        print("API: Error - AgentManager module was not imported successfully.")
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# --- Session Endpoints ---
+@app.post("/sessions", response_model=SessionResponse)
+async def create_session():
+    """Returns a new session ID; the session itself is created by its first chat turn."""
+    return SessionResponse(session_id=uuid.uuid4().hex)
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if get_session_store is None:
         raise HTTPException(status_code=503, detail="AgentManager is not initialized. Check server logs for import errors.")
+    store = get_session_store()
+    if not await run_in_threadpool(store.delete_session, session_id):
+        raise HTTPException(status_code=404, detail="Session not found.")
+    return {"session_id": session_id, "deleted": True}
+
+# --- Live Quotes ---
+@app.get("/quotes/subscribe")
+async def subscribe_quotes(symbols: str):
+    """Server-Sent Events stream of `quote` events for comma-separated `symbols`, served from the quote hub."""
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No symbols given.")
+    if len(requested) > config.QUOTE_HUB_MAX_SUBSCRIBE_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {config.QUOTE_HUB_MAX_SUBSCRIBE_SYMBOLS} symbols per subscription.")
+    if not quote_hub.running:
+        raise HTTPException(status_code=503, detail="Quote hub is not running (set QUOTE_HUB_SOURCE).")
+
+    async def event_stream():
+        async for quotes in quote_hub.subscribe(requested):
+            for quote in quotes:
+                yield {"event": "quote", "data": json.dumps(quote)}
+
+    return EventSourceResponse(event_stream())
+
+# --- Image Endpoints ---
+# Room for multipart boundaries, part headers and small form fields on top of the image bytes.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def _image_http_error(e: ValueError) -> HTTPException:
+    return HTTPException(status_code=413 if isinstance(e, ImageTooLargeError) else 400, detail=str(e))
+
+async def _receive_upload(request: Request, upload: ImageUpload):
+    """
+    Streams the multipart `file` field of the request body into `upload`.
+    The body is read here rather than by an UploadFile parameter, which would
+    spool all of it before the size limit could be checked; oversized uploads
+    are refused from Content-Length or at the first chunk past the limit.
+    """
+    limit = config.IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise ImageTooLargeError(f"Image exceeds {config.IMAGE_MAX_UPLOAD_BYTES} bytes.")
+    reader = MultipartFileReader(request.headers.get("content-type", ""), upload)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise ImageTooLargeError(f"Image exceeds {config.IMAGE_MAX_UPLOAD_BYTES} bytes.")
+        if chunk:
+            # Part data may spill to the spool file on disk, so parsing stays off the event loop.
+            await run_in_threadpool(reader.write, chunk)
+    reader.finish()
 
-    agent_manager = None 
+@app.post("/images")
+async def upload_image(request: Request):
+    """Multipart image upload (`file` field); returns an `image_id` to reference in chat requests."""
     try:
-        print(f"API: Attempting to initialize AgentManager for agent_type: '{request_data.agent_type}'")
-        agent_manager = AgentManager(agent_type=request_data.agent_type)
-        print("API: AgentManager initialized successfully.")
-        
+        with ImageUpload() as upload:
+            await _receive_upload(request, upload)
+            image, reused = await run_in_threadpool(image_store.ingest_upload, upload)
+    except (ImageTooLargeError, InvalidImageError) as e:
+        raise _image_http_error(e)
+    return image.describe(reused)
+
+async def _resolve_image(request_data: ChatRequest) -> Optional[dict]:
+    """Returns the downscaled image for a request, by `image_id` or by running inline base64 through the image pipeline."""
+    if request_data.image_id:
+        image = image_store.get(request_data.image_id)
+        if image is None:
+            raise HTTPException(status_code=404, detail="Unknown image_id; upload the image again via POST /images.")
+        return image.as_image_source()
+    if request_data.image:
+        try:
+            image, _ = await run_in_threadpool(image_store.ingest_base64, request_data.image.data)
+        except (ImageTooLargeError, InvalidImageError) as e:
+            raise _image_http_error(e)
+        return image.as_image_source()
+    return None
+
+# --- API Endpoint ---
+async def process_chat(request_data: ChatRequest, endpoint: str = "/chat") -> ChatResponse:
+    """Runs one chat request, timed under `endpoint` in the request metrics."""
+    with observe_request(endpoint, request_data.agent_type):
+        return await _process_chat(request_data)
+
+async def _process_chat(request_data: ChatRequest) -> ChatResponse:
+    """Runs one chat request through the answer cache and a pooled AgentManager."""
+    cacheable = _is_cacheable(request_data)
+    if cacheable:
+        cached_output = answer_cache.get(request_data.query, request_data.agent_type)
+        if cached_output:
+            logger.info("Answer cache hit", extra={"query": request_data.query})
+            return ChatResponse(response=cached_output["text_response"], tool_outputs=cached_output["tool_outputs"])
+
+    # Resolved before leasing so image processing does not hold a pooled manager.
+    image = await _resolve_image(request_data)
+    async with agent_pool.acquire_async(request_data.agent_type) as agent_manager:
         history_for_agent = [{"role": msg.role, "content": msg.content} for msg in request_data.history] if request_data.history else []
 
-        print(f"API: Attempting to process query: '{request_data.query}' with history_length: {len(history_for_agent)}")
-        processed_output = agent_manager.process_query(
+        processed_output = await agent_manager.aprocess_query(
                                                 request_data.query,
                                                 history=history_for_agent,
-                                                image=request_data.image.dict() if request_data.image else None
+                                                image=image,
+                                                conversation_id=request_data.conversation_id,
+                                                session_id=request_data.session_id
                                             )
 
-        
-        response_text = processed_output.get("text_response", "Agent processed the request but did not generate a specific text response.")
-        tool_outputs_data = processed_output.get("tool_outputs", [])
+    if cacheable:
+        answer_cache.put(request_data.query, request_data.agent_type, processed_output)
+
+    response_text = processed_output.get("text_response", "Agent processed the request but did not generate a specific text response.")
+    tool_outputs_data = processed_output.get("tool_outputs", [])
+
+    logger.info("Query processed", extra={"response_chars": len(response_text), "tool_outputs_count": len(tool_outputs_data)})
+    log_payload(logger, "Chat response payload", response=response_text, tool_outputs=tool_outputs_data)
+    return ChatResponse(response=response_text, tool_outputs=tool_outputs_data)
 
-        print(f"API: Query processed. Text response from agent: '{response_text}', Tool outputs count: {len(tool_outputs_data)}")
-        
-        print(f"API: Sending final response. Text: '{response_text}', Tool Outputs: {tool_outputs_data}")
-        return ChatResponse(response=response_text, tool_outputs=tool_outputs_data)
-    
+@app.post("/chat", response_model=ChatResponse)
+async def handle_chat(request_data: ChatRequest):
+    logger.info("/chat request", extra={"query": request_data.query, "agent_type": request_data.agent_type})
+    if AgentManager is None:
+        logger.error("AgentManager module was not imported successfully")
+        raise HTTPException(status_code=503, detail="AgentManager is not initialized. Check server logs for import errors.")
+    _check_agent_type(request_data.agent_type)
+
+    try:
+        return await process_chat(request_data)
+    except HTTPException:
+        raise
     except ValueError as ve: 
-        print(f"API: ValueError during AgentManager operation: {ve}")
+        logger.error("ValueError during AgentManager operation", extra={"error": str(ve)})
         raise HTTPException(status_code=500, detail=f"Configuration error: {str(ve)}")
     except ImportError as ie:
-        print(f"API: ImportError during AgentManager usage: {ie}")
+        logger.error("ImportError during AgentManager usage", extra={"error": str(ie)})
         raise HTTPException(status_code=500, detail=f"Internal server error related to agent processing (ImportError): {ie}")
     except Exception as e:
-        print(f"API: Unhandled exception during chat handling: {e}")
-        import traceback
-        print(traceback.format_exc()) 
-        if agent_manager:
-            print(f"API: AgentManager state before error: type={agent_manager.agent_type}, tools_loaded={len(agent_manager.tools) if hasattr(agent_manager, 'tools') else 'N/A'}")
-        else:
-            print("API: AgentManager was not successfully initialized before the error.")
+        logger.exception("Unhandled exception during chat handling")
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
+@app.post("/chat/batch")
+async def handle_chat_batch(batch: BatchChatRequest):
+    """
+    Runs many chat requests concurrently (bounded by `max_concurrency`) and streams
+    one NDJSON line per item in completion order.
+    """
+    logger.info("/chat/batch request", extra={"items": len(batch.requests)})
+    if AgentManager is None:
+        logger.error("AgentManager module was not imported successfully")
+        raise HTTPException(status_code=503, detail="AgentManager is not initialized. Check server logs for import errors.")
+    if len(batch.requests) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {config.BATCH_MAX_ITEMS} requests.")
+    for item in batch.requests:
+        _check_agent_type(item.agent_type)
+
+    concurrency = max(1, min(batch.max_concurrency or config.BATCH_DEFAULT_CONCURRENCY, config.BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, item: ChatRequest) -> dict:
+        # Each item runs in its own task (copied context), so the sub-ID only applies to this item.
+        request_id_var.set(f"{request_id_var.get()}/{index}")
+        async with semaphore:
+            try:
+                response = await process_chat(item, endpoint="/chat/batch")
+                return {"index": index, "status": "ok", "response": response.model_dump()}
+            except Exception as e:
+                logger.warning("Batch item failed", extra={"index": index, "error": str(e)})
+                return {"index": index, "status": "error", "error": str(e)}
+
+    async def ndjson_stream():
+        tasks = [asyncio.create_task(run_item(index, item)) for index, item in enumerate(batch.requests)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished, default=str) + "\n"
+        finally:
+            # Client disconnected or the stream ended early: stop the remaining items.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
+@app.post("/chat/stream")
+async def handle_chat_stream(request_data: ChatRequest):
+    """Server-Sent Events variant of /chat; the `final` event carries the ChatResponse payload."""
+    logger.info("/chat/stream request", extra={"query": request_data.query, "agent_type": request_data.agent_type})
+    if AgentManager is None:
+        logger.error("AgentManager module was not imported successfully")
+        raise HTTPException(status_code=503, detail="AgentManager is not initialized. Check server logs for import errors.")
+    _check_agent_type(request_data.agent_type)
+
+    history_for_agent = [{"role": msg.role, "content": msg.content} for msg in request_data.history] if request_data.history else []
+    image = await _resolve_image(request_data)
+
+    cacheable = _is_cacheable(request_data)
+
+    async def event_stream():
+        with observe_request("/chat/stream", request_data.agent_type):
+            if cacheable:
+                cached_output = answer_cache.get(request_data.query, request_data.agent_type)
+                if cached_output:
+                    logger.info("Answer cache hit", extra={"query": request_data.query})
+                    payload = ChatResponse(response=cached_output["text_response"], tool_outputs=cached_output["tool_outputs"])
+                    yield {"event": "final", "data": payload.model_dump_json()}
+                    return
+            try:
+                async with agent_pool.acquire_async(request_data.agent_type) as agent_manager:
+                    async for event in agent_manager.astream_query(request_data.query, history=history_for_agent, image=image, conversation_id=request_data.conversation_id, session_id=request_data.session_id):
+                        if event["event"] == "final":
+                            if cacheable:
+                                answer_cache.put(request_data.query, request_data.agent_type, event["data"])
+                            payload = ChatResponse(
+                                response=event["data"]["text_response"],
+                                tool_outputs=event["data"]["tool_outputs"],
+                            )
+                            yield {"event": "final", "data": payload.model_dump_json()}
+                        else:
+                            yield {"event": event["event"], "data": json.dumps(event["data"], default=str)}
+            except Exception as e:
+                logger.exception("Unhandled exception during chat streaming")
+                REQUEST_ERRORS.labels("/chat/stream", request_data.agent_type).inc()
+                yield {"event": "error", "data": json.dumps({"detail": f"An unexpected error occurred: {str(e)}"})}
+
+    return EventSourceResponse(event_stream())
+
 # --- How to Run ---
 # From the project root directory (super_agent):
 # source agenv/bin/activate
@@ -1,9 +1,9 @@
 import streamlit as st
 import os
 import sys
-import base64
 from PIL import Image
 import json
+import uuid
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -15,6 +15,8 @@ sys.path.append(PROJECT_ROOT)
 # Import AgentManager
 try:
     from agents.agent_manager import AgentManager
+    from agents.session_store import get_session_store
+    from image_store import image_store
 except ImportError:
     st.error("Could not import AgentManager. Please check your project structure.")
     st.stop()
@@ -83,35 +85,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def encode_image_to_base64(image_file) -> str:
-    """Convert uploaded image to base64 string."""
-    return base64.b64encode(image_file.read()).decode('utf-8')
-
-def get_image_info(uploaded_file) -> Dict:
-    """Get image information for processing."""
-    if uploaded_file is not None:
-        # Get file extension to determine media type
-        file_extension = uploaded_file.name.split('.')[-1].lower()
-        media_type_map = {
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'webp': 'image/webp'
-        }
-        media_type = media_type_map.get(file_extension, 'image/jpeg')
-
-        # Reset file pointer and encode
-        uploaded_file.seek(0)
-        image_data = encode_image_to_base64(uploaded_file)
-
-        return {
-            "type": "base64",
-            "media_type": media_type,
-            "data": image_data
-        }
-    return None
-
 def display_chat_message(role: str, content: str, timestamp: str = None):
     """Display a chat message with proper formatting."""
     if role == "user":
@@ -194,6 +167,9 @@ def main():
         st.session_state.agent_manager = None
     if 'current_agent_type' not in st.session_state:
         st.session_state.current_agent_type = None
+    if 'session_id' not in st.session_state:
+        # The conversation itself is kept server-side by the agent's session store
+        st.session_state.session_id = uuid.uuid4().hex
 
     # Initialize or reinitialize agent manager if agent type changed
     if st.session_state.current_agent_type != agent_type:
@@ -237,6 +213,8 @@ def main():
     # Handle clear chat
     if clear_button:
         st.session_state.chat_history = []
+        get_session_store().delete_session(st.session_state.session_id)
+        st.session_state.session_id = uuid.uuid4().hex
         st.rerun()
 
     # Handle message submission
@@ -260,20 +238,16 @@ def main():
                 # Prepare image data if uploaded
                 image_data = None
                 if uploaded_file:
-                    image_data = get_image_info(uploaded_file)
-
-                # Prepare history for agent (exclude tool messages)
-                history_for_agent = [
-                    {"role": msg['role'], "content": msg['content']}
-                    for msg in st.session_state.chat_history[:-1]  # Exclude current user message
-                    if msg['role'] in ['user', 'assistant']
-                ]
+                    # Downscaled once; the same file on later turns reuses the stored result
+                    uploaded_file.seek(0)
+                    stored_image, _ = image_store.ingest_stream(uploaded_file)
+                    image_data = stored_image.as_image_source()
 
-                # Process query
+                # Process query; earlier turns are already in the session
                 result = st.session_state.agent_manager.process_query(
                     query=user_input,
-                    history=history_for_agent,
-                    image=image_data
+                    image=image_data,
+                    session_id=st.session_state.session_id
                 )
 
                 # Extract response
@@ -16,6 +16,164 @@ EXCHANGE_RATE_API_KEY = os.getenv("EXCHANGE_RATE_API_KEY")
 # OpenAI Model Selection
 OPENAI_MODEL = 'gpt-4o-mini'
 
+# Agent Pool (prebuilt AgentManagers shared across API requests)
+AGENT_POOL_MIN_SIZE = int(os.getenv("AGENT_POOL_MIN_SIZE", 1))  # Managers prebuilt per agent type at startup
+AGENT_POOL_MAX_SIZE = int(os.getenv("AGENT_POOL_MAX_SIZE", 4))  # Upper bound per agent type
+AGENT_POOL_WARM_ON_STARTUP = os.getenv("AGENT_POOL_WARM_ON_STARTUP", "true").lower() == "true"
+
+# Batch Chat (/chat/batch)
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", 8))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 32))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 5000))
+
+# Conversation History Compaction
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 4000))  # Tokens for system prompt + history + query
+HISTORY_TARGET_RATIO = 0.6  # When folding, shrink the kept window to this share of the budget
+HISTORY_SUMMARY_MAX_TOKENS = 300  # Upper bound for the rolling summary
+HISTORY_SUMMARY_CACHE_SIZE = 1000  # Conversations whose summary is kept in memory
+HISTORY_TOKEN_CACHE_SIZE = 20000  # Per-message token counts kept in memory
+
+# Answer Cache (final /chat answers for repeated queries)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+ANSWER_CACHE_NO_TOOL_TTL = 300  # Seconds, for answers that used no tools
+ANSWER_CACHE_DEFAULT_TOOL_TTL = 60  # Seconds, for tools missing from the table below
+# Seconds an answer stays fresh, by tool name; the shortest TTL among the tools used wins, 0 disables caching.
+ANSWER_CACHE_TOOL_TTLS = {
+    "stock_market": 15,
+    "batch_stock_quote": 15,
+    "crypto_market": 10,
+    "historical_crypto_market": 60,
+    "currency_exchange_tool": 60,
+    "bulk_currency_conversion": 60,
+    "historical_currency_conversion": 300,
+    "historical_stock_market": 300,
+    "trend_analysis": 300,
+    "stock_screener": 300,
+    "news_api": 600,
+    "weather_tool": 600,
+    "search_tool": 1800,
+    "sentiment_analysis": 3600,
+    "wikipedia_tool": 6 * 3600,
+    "unit_conversion_tool": 24 * 3600,
+    "calculator_tool": 24 * 3600,
+    "datetime_tool": 0,
+    "timezone_tool": 0,
+    "calendar_reminder_tool": 0,
+}
+
+# Startup Budget (checked by scripts/check_import_time.py)
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", 3.0))
+
+# Async Tool Execution
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", 32))  # Threads for blocking libraries (yfinance, TinyDB)
+
+# Quote Cache (tools/quote_cache.py): fresh values are served as-is, stale ones while refreshing in the background
+STOCK_QUOTE_FRESH_SECONDS = float(os.getenv("STOCK_QUOTE_FRESH_SECONDS", 5))
+STOCK_QUOTE_STALE_SECONDS = float(os.getenv("STOCK_QUOTE_STALE_SECONDS", 30))
+CRYPTO_QUOTE_FRESH_SECONDS = float(os.getenv("CRYPTO_QUOTE_FRESH_SECONDS", 2))
+CRYPTO_QUOTE_STALE_SECONDS = float(os.getenv("CRYPTO_QUOTE_STALE_SECONDS", 10))
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", 5000))  # Per cache, LRU beyond this
+QUOTE_CACHE_WAIT_SECONDS = float(os.getenv("QUOTE_CACHE_WAIT_SECONDS", 15))  # Longest wait on another caller's in-flight fetch
+
+# Crypto Exchanges (tools/exchange_pool.py): shared ccxt.async_support clients with ccxt's rate limiter
+CRYPTO_EXCHANGE = os.getenv("CRYPTO_EXCHANGE", "binance")  # Any ccxt exchange id
+EXCHANGE_TIMEOUT_MS = int(os.getenv("EXCHANGE_TIMEOUT_MS", 10000))
+EXCHANGE_MARKETS_REFRESH_SECONDS = float(os.getenv("EXCHANGE_MARKETS_REFRESH_SECONDS", 3600))  # Background market metadata reload
+CRYPTO_OHLCV_PAGE_LIMIT = int(os.getenv("CRYPTO_OHLCV_PAGE_LIMIT", 1000))  # Candles per fetch_ohlcv page (exchange maximum)
+CRYPTO_OHLCV_CONCURRENCY = int(os.getenv("CRYPTO_OHLCV_CONCURRENCY", 4))  # Pages in flight per request
+CRYPTO_OHLCV_MAX_PAGES = int(os.getenv("CRYPTO_OHLCV_MAX_PAGES", 20))  # Pages one request may fetch; longer ranges need a coarser timeframe
+CRYPTO_OHLCV_MAX_OUTPUT = int(os.getenv("CRYPTO_OHLCV_MAX_OUTPUT", 500))  # Latest candles returned to the LLM
+CANDLE_CACHE_DIR = os.getenv("CANDLE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "candles"))
+
+# Quote Hub (tools/quote_hub.py): live ticks pushed into the API process; price tools read them first
+QUOTE_HUB_SOURCE = os.getenv("QUOTE_HUB_SOURCE", "none")  # "none", "ccxt" (exchange websocket via ccxt.pro) or "replay"
+QUOTE_HUB_SYMBOLS = os.getenv("QUOTE_HUB_SYMBOLS", "BTC/USDT,ETH/USDT")  # Always watched, in addition to SSE subscriptions
+QUOTE_HUB_MAX_AGE_SECONDS = float(os.getenv("QUOTE_HUB_MAX_AGE_SECONDS", 5))  # Older ticks fall back to a provider request
+QUOTE_HUB_MAX_SUBSCRIBE_SYMBOLS = int(os.getenv("QUOTE_HUB_MAX_SUBSCRIBE_SYMBOLS", 50))  # Per /quotes/subscribe connection
+QUOTE_HUB_REPLAY_PATH = os.getenv("QUOTE_HUB_REPLAY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "quotes_replay.jsonl"))
+QUOTE_HUB_REPLAY_SPEED = float(os.getenv("QUOTE_HUB_REPLAY_SPEED", 1.0))  # Replay time compression factor
+
+# Provider Routing (tools/provider_router.py): hedged requests and circuit breakers for data provider fallbacks
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", 10))  # Upper bound for one routed call, hedges included
+PROVIDER_HEDGE_PERCENTILE = float(os.getenv("PROVIDER_HEDGE_PERCENTILE", 95))  # Primary latency percentile before hedging to the fallback
+PROVIDER_HEDGE_MIN_SAMPLES = int(os.getenv("PROVIDER_HEDGE_MIN_SAMPLES", 20))  # Successful calls needed before the percentile is trusted
+PROVIDER_HEDGE_DEFAULT_SECONDS = float(os.getenv("PROVIDER_HEDGE_DEFAULT_SECONDS", 2.0))
+PROVIDER_HEDGE_MIN_SECONDS = float(os.getenv("PROVIDER_HEDGE_MIN_SECONDS", 0.2))
+PROVIDER_WINDOW_SIZE = int(os.getenv("PROVIDER_WINDOW_SIZE", 100))  # Recent calls kept per provider
+PROVIDER_BREAKER_ERROR_RATE = float(os.getenv("PROVIDER_BREAKER_ERROR_RATE", 0.5))  # Opens the breaker (with enough calls)
+PROVIDER_BREAKER_MIN_CALLS = int(os.getenv("PROVIDER_BREAKER_MIN_CALLS", 10))
+PROVIDER_BREAKER_CONSECUTIVE_FAILURES = int(os.getenv("PROVIDER_BREAKER_CONSECUTIVE_FAILURES", 5))
+PROVIDER_BREAKER_OPEN_SECONDS = float(os.getenv("PROVIDER_BREAKER_OPEN_SECONDS", 30))  # Before a single probe call is let through
+PROVIDER_ROUTER_WORKERS = int(os.getenv("PROVIDER_ROUTER_WORKERS", 32))  # Threads for sync provider calls and hedges
+
+# FX Rates (tools/fx_rates.py): one base rate table per TTL; every other pair is a local cross rate
+FX_BASE_CURRENCY = os.getenv("FX_BASE_CURRENCY", "USD")
+FX_RATE_TTL_SECONDS = float(os.getenv("FX_RATE_TTL_SECONDS", 3600))  # Providers publish rates at most hourly
+FX_RATE_STALE_SECONDS = float(os.getenv("FX_RATE_STALE_SECONDS", 3600))  # Served while refreshing in the background
+FX_BULK_MAX_ITEMS = int(os.getenv("FX_BULK_MAX_ITEMS", 500))  # Conversions per BulkCurrencyConversionTool call
+FX_HISTORY_DIR = os.getenv("FX_HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fx_history"))
+FX_HISTORY_LOOKBACK_DAYS = int(os.getenv("FX_HISTORY_LOOKBACK_DAYS", 7))  # Extra days fetched so early bars have a prior rate
+
+# HTTP Client (tools/http_client.py): shared keep-alive connection pools for every REST tool
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 3))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))  # Per client, across hosts
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))  # Idle connections kept open for reuse
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 30))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))  # Extra attempts for idempotent requests (GET/HEAD)
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.25))  # Base of the jittered exponential backoff
+HTTP_RETRY_MAX_BACKOFF = float(os.getenv("HTTP_RETRY_MAX_BACKOFF", 2.0))
+# (connect, read) seconds per tool; quote paths stay well inside PROVIDER_TIMEOUT_SECONDS so hedges can still win
+HTTP_TIMEOUTS = {
+    "default": (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+    "stock_market_tool": (2, 4),
+    "currency_exchange_tool": (2, 4),
+    "news_api_tool": (3, 10),
+    "search_tool": (3, 10),
+    "weather_tool": (3, 6),
+}
+
+# Batch Quotes
+BATCH_QUOTE_MAX_TICKERS = int(os.getenv("BATCH_QUOTE_MAX_TICKERS", 50))  # Tickers per BatchStockQuoteTool call
+
+# Price Store (tools/price_store.py): per-ticker memory-mapped daily OHLCV, shared read-only by all workers
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "prices"))
+PRICE_STORE_MAX_OPEN = int(os.getenv("PRICE_STORE_MAX_OPEN", 256))  # Memory maps kept open per process
+
+# Indicator State (tools/indicator_state.py): rolling per-ticker indicators updated bar by bar
+INDICATOR_STATE_DIR = os.getenv("INDICATOR_STATE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "indicator_state"))
+INDICATOR_STATE_WARMUP_DAYS = int(os.getenv("INDICATOR_STATE_WARMUP_DAYS", 365))  # History replayed when a state is first built
+
+# Screener (tools/screener_tool.py); universes are ticker lists in data/universes/<name>.txt
+SCREENER_LOOKBACK_DAYS = int(os.getenv("SCREENER_LOOKBACK_DAYS", 400))  # Calendar days of bars loaded per ticker
+SCREENER_MAX_TICKERS = int(os.getenv("SCREENER_MAX_TICKERS", 1000))
+SCREENER_MAX_RESULTS = int(os.getenv("SCREENER_MAX_RESULTS", 50))  # Matches returned to the LLM
+SCREENER_FETCH_WORKERS = int(os.getenv("SCREENER_FETCH_WORKERS", 16))  # Parallel provider fetches for tickers not yet stored
+
+# Conversation Sessions (server-side history, see agents/session_store.py)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # "memory" or "sqlite"
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sessions.db"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 24 * 3600))  # Idle time before a session is evicted
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 10000))  # Least recently used sessions are evicted beyond this
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 256 * 1024 * 1024))  # Memory cap for the in-memory store
+
+# Image Ingestion (see image_store.py)
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", 1536))  # Longest side after downscaling, in pixels
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG")  # JPEG, WEBP or PNG
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 85))  # JPEG/WEBP quality
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+IMAGE_SPOOL_MAX_MEMORY = 1024 * 1024  # Uploads larger than this are buffered on disk while hashing
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", 128 * 1024 * 1024))  # Processed images kept for reuse
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" for log shippers, "text" for local runs
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", 500))  # Longer strings/lists are truncated in log records
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))  # Share of requests that log full payloads at INFO
+LOG_VERBOSE_CHUNKS = os.getenv("LOG_VERBOSE_CHUNKS", "false").lower() == "true"  # Dump every agent stream chunk (development only)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # Records buffered for the writer thread; extra records are dropped
+
 # System Prompt
 SYSTEM_PROMPTS = {
     "financial_assistant": """You are a financial assistant specializing in stock market insights, 
@@ -24,12 +182,21 @@ SYSTEM_PROMPTS = {
     **Instructions:**
     - **Use the correct tools before answering.**  
     - If asked about stock prices, call `StockMarketTool`.  
+    - If asked to compare or list prices for several tickers, call `BatchStockQuoteTool` once with all of them.
+    - If asked which stocks meet technical criteria (e.g., oversold, MACD crossover), call `ScreenerTool` once with a condition instead of analysing tickers one by one.
+    - If asked to convert several amounts or into several currencies, call `BulkCurrencyConversionTool` once.
+    - If asked for a stock's price history in another currency, call `HistoricalCurrencyConversionTool` instead of converting rows yourself.
+    - If asked for a cryptocurrency's price history or candles, call `HistoricalCryptoMarketTool` with a timeframe that suits the period.
     - If asked about financial news, call `NewsAPITool`.  
     - If unsure, ask the user for clarification **instead of assuming**.
 
     **Example Usage:**
     - User: "What’s Tesla’s stock price today?"  
       ✅ Correct: Call `StockMarketTool("TSLA")`
+    - User: "Compare AAPL, MSFT and NVDA."  
+      ✅ Correct: Call `BatchStockQuoteTool(["AAPL", "MSFT", "NVDA"])`
+    - User: "Which Dow stocks are oversold with a MACD crossover today?"  
+      ✅ Correct: Call `ScreenerTool(condition="rsi < 30 and macd_cross_up", universe="dow30")`
 
     Think step by step before responding.
     """,
@@ -66,11 +233,14 @@ SYSTEM_PROMPTS = {
 # Tool Registry (List of tools to be loaded dynamically)
 TOOL_REGISTRY = [
     "StockMarketTool",
+    "BatchStockQuoteTool",
     "HistoricalStockMarketTool",
     "TrendAnalysisTool",
+    "ScreenerTool",
     "NewsAPITool",
     "SentimentAnalysisTool",
     "CryptoMarketTool",
+    "HistoricalCryptoMarketTool",
     "DateTimeTool",
     "UnitConversionTool",
     "TimeZoneTool",
@@ -78,6 +248,8 @@ TOOL_REGISTRY = [
     "WikipediaTool",
     "SearchTool",
     "CurrencyExchangeTool",
+    "BulkCurrencyConversionTool",
+    "HistoricalCurrencyConversionTool",
     "WeatherTool",
     "CalendarReminderTool",
 ]
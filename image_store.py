@@ -0,0 +1,257 @@
+import base64
+import binascii
+import hashlib
+import io
+import tempfile
+import threading
+from collections import OrderedDict
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+import config
+from logger import get_logger
+from metrics import CACHE_REQUESTS
+
+logger = get_logger("image_store")
+
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+class InvalidImageError(ValueError):
+    pass
+
+
+class ImageUpload:
+    """
+    Image bytes as they arrive: counted against IMAGE_MAX_UPLOAD_BYTES (so an
+    oversized upload fails at the first chunk past the limit), hashed, and
+    spooled to disk past IMAGE_SPOOL_MAX_MEMORY.
+    """
+
+    def __init__(self):
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=config.IMAGE_SPOOL_MAX_MEMORY)
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > config.IMAGE_MAX_UPLOAD_BYTES:
+            raise ImageTooLargeError(f"Image exceeds {config.IMAGE_MAX_UPLOAD_BYTES} bytes.")
+        self.digest.update(chunk)
+        self.buffer.write(chunk)
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MultipartFileReader:
+    """
+    Parses a multipart/form-data body chunk by chunk (python-multipart),
+    writing the first `field_name` part into an ImageUpload and skipping the rest.
+    """
+
+    def __init__(self, content_type: str, upload: ImageUpload, field_name: str = "file"):
+        mime_type, params = parse_options_header(content_type)
+        if mime_type != b"multipart/form-data" or not params.get(b"boundary"):
+            raise InvalidImageError(f"Expected a multipart/form-data upload with a `{field_name}` field.")
+        self.upload = upload
+        self.field_name = field_name
+        self._header = self._value = b""
+        self._part_name = None
+        self._active = self._done = False
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin, "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value, "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished, "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def write(self, chunk: bytes):
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError as e:
+            raise InvalidImageError(f"Malformed multipart upload: {e}") from e
+
+    def finish(self):
+        """Call once the body has been read; fails if the file part never completed."""
+        if not self._done:
+            raise InvalidImageError(f"The upload has no complete `{self.field_name}` field.")
+
+    # --- Parser callbacks ---
+    def _on_part_begin(self):
+        self._part_name = None
+
+    def _on_header_field(self, data, start, end):
+        self._header += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header.lower() == b"content-disposition":
+            self._part_name = parse_options_header(self._value)[1].get(b"name")
+        self._header = self._value = b""
+
+    def _on_headers_finished(self):
+        self._active = not self._done and self._part_name == self.field_name.encode()
+
+    def _on_part_data(self, data, start, end):
+        if self._active:
+            self.upload.write(data[start:end])
+
+    def _on_part_end(self):
+        if self._active:
+            self._active, self._done = False, True
+
+
+class _StoredImage:
+    __slots__ = ("image_id", "media_type", "data", "width", "height", "original_bytes", "size_bytes")
+
+    def __init__(self, image_id, media_type, data, width, height, original_bytes):
+        self.image_id = image_id
+        self.media_type = media_type
+        self.data = data  # base64 of the processed image, ready for the model's data URL
+        self.width = width
+        self.height = height
+        self.original_bytes = original_bytes
+        self.size_bytes = len(data)
+
+    def as_image_source(self) -> dict:
+        """The `image` dict AgentManager expects."""
+        return {"type": "base64", "media_type": self.media_type, "data": self.data}
+
+    def describe(self, reused: bool) -> dict:
+        return {
+            "image_id": self.image_id,
+            "media_type": self.media_type,
+            "width": self.width,
+            "height": self.height,
+            "bytes": len(self.data) * 3 // 4,
+            "original_bytes": self.original_bytes,
+            "reused": reused,
+        }
+
+
+class ImageStore:
+    """
+    Downscales and recompresses uploaded images once and keeps the result,
+    keyed by the SHA-256 of the original bytes, in a size-bounded LRU.
+
+    Re-sending the same screenshot (by upload, base64 or `image_id`) reuses the
+    processed image without decoding it again.
+    """
+
+    def __init__(self, max_bytes: int = None):
+        self.max_bytes = max_bytes or config.IMAGE_STORE_MAX_BYTES
+        self._lock = threading.Lock()
+        self._images = OrderedDict()
+        self.size_bytes = 0
+
+    def get(self, image_id: str):
+        with self._lock:
+            image = self._images.get(image_id)
+            if image is not None:
+                self._images.move_to_end(image_id)
+            return image
+
+    def _put(self, image: _StoredImage):
+        with self._lock:
+            previous = self._images.pop(image.image_id, None)
+            if previous is not None:
+                self.size_bytes -= previous.size_bytes
+            self._images[image.image_id] = image
+            self.size_bytes += image.size_bytes
+            while self.size_bytes > self.max_bytes and len(self._images) > 1:
+                _, evicted = self._images.popitem(last=False)
+                self.size_bytes -= evicted.size_bytes
+
+    def _process(self, image_id: str, source, original_bytes: int) -> _StoredImage:
+        """Decodes, downscales and recompresses `source` (a binary file object)."""
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        max_dimension = config.IMAGE_MAX_DIMENSION
+        try:
+            with Image.open(source) as image:
+                # JPEG can decode straight at a reduced scale, which is far cheaper than a full decode + resize.
+                image.draft("RGB", (max_dimension, max_dimension))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                if image.mode in ("RGBA", "LA", "P"):
+                    image = image.convert("RGBA")
+                    flattened = Image.new("RGB", image.size, (255, 255, 255))
+                    flattened.paste(image, mask=image.getchannel("A"))
+                    image = flattened
+                elif image.mode != "RGB":
+                    image = image.convert("RGB")
+
+                output = io.BytesIO()
+                output_format = config.IMAGE_OUTPUT_FORMAT.upper()
+                if output_format == "PNG":
+                    image.save(output, "PNG", optimize=True)
+                else:
+                    image.save(output, output_format, quality=config.IMAGE_QUALITY)
+                width, height = image.size
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+            raise InvalidImageError(f"Could not decode image: {e}") from e
+
+        media_type = Image.MIME.get(output_format, f"image/{output_format.lower()}")
+        return _StoredImage(image_id, media_type, base64.b64encode(output.getvalue()).decode("ascii"), width, height, original_bytes)
+
+    def ingest_upload(self, upload: ImageUpload):
+        """
+        Processes a fully received upload unless the same image was stored
+        before. Returns (stored image, whether it was reused).
+        """
+        if upload.size == 0:
+            raise InvalidImageError("Empty image upload.")
+        image_id = upload.digest.hexdigest()
+        cached = self.get(image_id)
+        if cached is not None:
+            CACHE_REQUESTS.labels("image", "hit").inc()
+            return cached, True
+        CACHE_REQUESTS.labels("image", "miss").inc()
+        upload.buffer.seek(0)
+        image = self._process(image_id, upload.buffer, upload.size)
+
+        self._put(image)
+        logger.info("Stored image", extra={"image_id": image_id[:12], "original_bytes": upload.size, "bytes": image.size_bytes * 3 // 4,
+                                           "width": image.width, "height": image.height})
+        return image, False
+
+    def ingest_stream(self, stream):
+        """Reads a binary file object in chunks and ingests it (see `ingest_upload`)."""
+        with ImageUpload() as upload:
+            while True:
+                chunk = stream.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                upload.write(chunk)
+            return self.ingest_upload(upload)
+
+    def ingest_base64(self, data: str):
+        """Same pipeline for images sent inline as base64 in JSON."""
+        if len(data) > config.IMAGE_MAX_UPLOAD_BYTES * 4 // 3 + 4:
+            raise ImageTooLargeError(f"Image exceeds {config.IMAGE_MAX_UPLOAD_BYTES} bytes.")
+        try:
+            raw = base64.b64decode(data, validate=False)
+        except (binascii.Error, ValueError) as e:
+            raise InvalidImageError(f"Invalid base64 image data: {e}") from e
+        return self.ingest_stream(io.BytesIO(raw))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"images": len(self._images), "size_bytes": self.size_bytes}
+
+
+image_store = ImageStore()
@@ -0,0 +1,183 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+import config
+
+# Correlation ID of the request being handled; "-" outside of a request.
+request_id_var = ContextVar("request_id", default="-")
+# Whether this request was picked to log full payloads (see LOG_PAYLOAD_SAMPLE_RATE).
+payload_sampled_var = ContextVar("payload_sampled", default=False)
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_configure_lock = threading.Lock()
+_listener = None
+_handler = None
+_exc_formatter = logging.Formatter()
+
+
+def truncate(value, limit: int = None, depth: int = 0):
+    """Returns a JSON-friendly copy of `value` with long strings and collections cut to `limit`."""
+    limit = limit or config.LOG_MAX_FIELD_CHARS
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    if depth >= 4:
+        value = repr(value)
+    if isinstance(value, dict):
+        items = list(value.items())
+        truncated = {str(k): truncate(v, limit, depth + 1) for k, v in items[:20]}
+        if len(items) > 20:
+            truncated["..."] = f"{len(items) - 20} more key(s)"
+        return truncated
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        truncated = [truncate(v, limit, depth + 1) for v in items[:10]]
+        if len(items) > 10:
+            truncated.append(f"... {len(items) - 10} more item(s)")
+        return truncated
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > limit:
+        return f"{text[:limit]}... (+{len(text) - limit} chars)"
+    return text
+
+
+def _record_fields(record: logging.LogRecord) -> dict:
+    return {key: truncate(value) for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; runs on the listener thread, so serialisation stays off the request path."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": truncate(record.getMessage()),
+        }
+        entry.update(_record_fields(record))
+        # Tracebacks are kept whole: they are the one field that must not be cut to LOG_MAX_FIELD_CHARS.
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _record_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, default=str, ensure_ascii=False)}" for key, value in fields.items())
+        return line
+
+
+class _ContextFilter(logging.Filter):
+    """Stamps the caller's correlation ID on the record before it crosses to the listener thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: records are dropped (and counted) when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Freezes the record on the caller's thread: the message is interpolated
+        (its arguments may change later) and the traceback is rendered into
+        `exc_text`, but, unlike `QueueHandler.prepare`, not folded into the
+        message, so formatters can emit it as its own field.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _exc_formatter.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging():
+    """Routes the "finance_agent" logger through a bounded queue to a background writer (idempotent)."""
+    global _listener, _handler
+    with _configure_lock:
+        if _listener is not None:
+            return
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter())
+
+        _handler = _DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+        _handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger("finance_agent")
+        root.setLevel(config.LOG_LEVEL)
+        root.addHandler(_handler)
+        root.propagate = False
+
+        _listener = QueueListener(_handler.queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Returns a logger under the "finance_agent" namespace."""
+    configure_logging()
+    return logging.getLogger(f"finance_agent.{name}")
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler else 0
+
+
+# --- Request context ---
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def bind_request(request_id: str):
+    """Sets the correlation ID and payload-sampling decision for the current context; returns reset tokens."""
+    return (
+        request_id_var.set(request_id),
+        payload_sampled_var.set(random.random() < config.LOG_PAYLOAD_SAMPLE_RATE),
+    )
+
+
+def reset_request(tokens):
+    request_id_token, sampled_token = tokens
+    request_id_var.reset(request_id_token)
+    payload_sampled_var.reset(sampled_token)
+
+
+def log_payload(logger: logging.Logger, msg: str, **fields):
+    """Logs a large payload only for sampled requests (at INFO) or when DEBUG is enabled."""
+    if payload_sampled_var.get():
+        logger.info(msg, extra=fields)
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, extra=fields)
@@ -0,0 +1,162 @@
+import os
+import time
+from contextlib import contextmanager
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# --- Metric Definitions ---
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+TOOL_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+REQUEST_LATENCY = Histogram(
+    "finance_agent_request_seconds", "End-to-end chat request latency.",
+    ["endpoint", "agent_type"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_ERRORS = Counter(
+    "finance_agent_request_errors_total", "Chat requests that raised an error.",
+    ["endpoint", "agent_type"],
+)
+REACT_ITERATIONS = Histogram(
+    "finance_agent_react_iterations", "LLM steps taken by the ReAct loop per query.",
+    ["agent_type"], buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 25),
+)
+LLM_LATENCY = Histogram(
+    "finance_agent_llm_call_seconds", "Latency of individual LLM calls.",
+    ["model"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "finance_agent_llm_tokens_total", "Tokens used by LLM calls.",
+    ["model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "finance_agent_llm_errors_total", "LLM calls that raised an error.",
+    ["model"],
+)
+TOOL_CALLS = Counter(
+    "finance_agent_tool_calls_total", "Tool invocations.",
+    ["tool"],
+)
+TOOL_LATENCY = Histogram(
+    "finance_agent_tool_call_seconds", "Tool invocation latency.",
+    ["tool"], buckets=TOOL_LATENCY_BUCKETS,
+)
+TOOL_ERRORS = Counter(
+    "finance_agent_tool_errors_total", "Tool invocations that raised or returned an error.",
+    ["tool"],
+)
+TOOL_INIT_SECONDS = Gauge(
+    "finance_agent_tool_init_seconds", "Time the last lazy initialisation of a tool took.",
+    ["tool"],
+)
+CACHE_REQUESTS = Counter(
+    "finance_agent_cache_requests_total",
+    "Cache lookups by result (hit, near_hit, miss); hit ratio = hits / all lookups.",
+    ["cache", "result"],
+)
+
+PROVIDER_CALLS = Counter(
+    "finance_agent_provider_calls_total", "Market data provider calls by outcome (success, error).",
+    ["route", "provider", "outcome"],
+)
+PROVIDER_LATENCY = Histogram(
+    "finance_agent_provider_call_seconds", "Market data provider call latency.",
+    ["route", "provider"], buckets=TOOL_LATENCY_BUCKETS,
+)
+PROVIDER_DECISIONS = Counter(
+    "finance_agent_provider_decisions_total",
+    "Routing decisions: hedge (slow primary), fallback (failed primary), skip (breaker open), win (result used).",
+    ["route", "provider", "decision"],
+)
+PROVIDER_BREAKER_STATE = Gauge(
+    "finance_agent_provider_breaker_state", "Circuit breaker state per provider: 0 closed, 1 half-open, 2 open.",
+    ["route", "provider"],
+)
+
+
+def render_metrics():
+    """Returns (body, content_type) for the /metrics endpoint, aggregating workers in multiprocess mode."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# --- Helpers ---
+@contextmanager
+def observe_request(endpoint: str, agent_type: str):
+    """Times a chat request and counts it as an error if the block raises (cancellation is not an error)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REQUEST_ERRORS.labels(endpoint, agent_type).inc()
+        raise
+    finally:
+        REQUEST_LATENCY.labels(endpoint, agent_type).observe(time.perf_counter() - start)
+
+
+def is_error_result(result) -> bool:
+    """Tools report failures as {"error": ...} (or a list starting with one) rather than raising."""
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list) and result and isinstance(result[0], dict):
+        return "error" in result[0]
+    return False
+
+
+def record_tool_call(tool: str, seconds: float, failed: bool):
+    TOOL_CALLS.labels(tool).inc()
+    TOOL_LATENCY.labels(tool).observe(seconds)
+    if failed:
+        TOOL_ERRORS.labels(tool).inc()
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records LLM call latency, token usage and errors."""
+
+    # Run in the caller's thread/loop; the bookkeeping is too small to justify an executor hop.
+    run_inline = True
+
+    def __init__(self, model: str):
+        self.model = model
+        self._starts = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            LLM_LATENCY.labels(self.model).observe(time.perf_counter() - start)
+
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    input_tokens += usage.get("input_tokens", 0)
+                    output_tokens += usage.get("output_tokens", 0)
+        if not (input_tokens or output_tokens):
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            input_tokens = token_usage.get("prompt_tokens", 0)
+            output_tokens = token_usage.get("completion_tokens", 0)
+        if input_tokens:
+            LLM_TOKENS.labels(self.model, "prompt").inc(input_tokens)
+        if output_tokens:
+            LLM_TOKENS.labels(self.model, "completion").inc(output_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._starts.pop(run_id, None)
+        LLM_ERRORS.labels(self.model).inc()
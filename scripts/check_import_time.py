@@ -0,0 +1,84 @@
+"""
+Import-time report for the API entry point.
+
+Runs `python -X importtime -c "import api"` in a fresh interpreter, prints the
+slowest imports, and exits non-zero when the total exceeds
+`config.IMPORT_TIME_BUDGET_SECONDS` or when a deferred heavy library is
+imported eagerly.
+
+Usage:
+    python scripts/check_import_time.py [--module api] [--budget 3.0] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+
+# Libraries that must only be imported when the tool using them runs.
+DEFERRED_MODULES = ["transformers", "torch", "ccxt", "yfinance", "pint", "wikipedia", "tinydb"]
+
+
+def measure_imports(module: str):
+    """Imports `module` in a subprocess and returns ([(cumulative_us, name)], eagerly loaded deferred modules)."""
+    probe = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        print(completed.stderr[-2000:])
+        raise SystemExit(f"Importing '{module}' failed with exit code {completed.returncode}.")
+
+    timings = []
+    for line in completed.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Drop the separator space; what remains is two spaces of indent per nesting level.
+        timings.append((int(cumulative.strip()), name[1:].rstrip()))
+
+    eager = [name for name in completed.stdout.strip().split(",") if name]
+    return timings, eager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="api", help="Module to import (default: api).")
+    parser.add_argument("--budget", type=float, default=config.IMPORT_TIME_BUDGET_SECONDS, help="Budget in seconds.")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list.")
+    args = parser.parse_args()
+
+    timings, eager = measure_imports(args.module)
+    # Top-level imports (no leading indentation in the package column) sum to the total.
+    total_seconds = sum(us for us, name in timings if not name.startswith(" ")) / 1e6
+
+    print(f"Import time for '{args.module}': {total_seconds:.3f}s (budget {args.budget:.3f}s)")
+    print(f"\nSlowest {args.top} imports (cumulative):")
+    for us, name in sorted(timings, reverse=True)[:args.top]:
+        print(f"  {us / 1e6:8.3f}s  {name.strip()}")
+
+    failed = False
+    if eager:
+        print(f"\n❌ Deferred libraries imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_seconds > args.budget:
+        print(f"\n❌ Import time {total_seconds:.3f}s exceeds the budget of {args.budget:.3f}s")
+        failed = True
+    if not failed:
+        print("\n✅ Import time within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import modules the way the app does: from the finance_agents directory.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
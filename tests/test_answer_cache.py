@@ -0,0 +1,36 @@
+from agents.answer_cache import AnswerCache
+
+FX_ANSWER = {"response": "92.1 EUR", "tool_outputs": [{"tool_name": "currency_exchange", "output": {}}]}
+
+
+def test_exact_and_filler_word_matches_hit():
+    cache = AnswerCache()
+    cache.put("price of AAPL", "general", {"response": "AAPL is 190", "tool_outputs": []})
+    assert cache.get("Price of AAPL?", "general")["response"] == "AAPL is 190"
+    assert cache.get("what's the AAPL price", "general")["response"] == "AAPL is 190"
+    assert cache.stats()["hits"] == 1 and cache.stats()["near_hits"] == 1
+
+
+def test_reversed_direction_misses():
+    cache = AnswerCache()
+    cache.put("convert 100 usd to eur", "general", FX_ANSWER)
+    assert cache.get("convert 100 eur to usd", "general") is None
+    cache.put("10 km to miles", "general", FX_ANSWER)
+    assert cache.get("10 miles to km", "general") is None
+
+
+def test_different_amounts_and_agent_types_miss():
+    cache = AnswerCache()
+    cache.put("convert 100 usd to eur", "general", FX_ANSWER)
+    assert cache.get("convert 1000 usd to eur", "general") is None
+    assert cache.get("convert 100 usd to eur", "other") is None
+    assert cache.get("please convert 100 usd in eur", "general")["response"] == "92.1 EUR"
+
+
+def test_eviction_drops_the_content_index():
+    cache = AnswerCache()
+    cache.put("price of AAPL", "general", {"response": "old", "tool_outputs": []})
+    cache.put("AAPL price", "general", {"response": "new", "tool_outputs": []})
+    cache._remove(cache._key("aapl price", "general"))
+    assert cache.get("what's the AAPL price", "general") is None
+    assert cache.get("price of AAPL", "general")["response"] == "old"
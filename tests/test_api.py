@@ -0,0 +1,27 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def no_lease(agent_type):
+        pytest.fail("an unknown agent_type must not reach the pool")
+
+    monkeypatch.setattr(api.agent_pool, "acquire_async", no_lease)
+    return TestClient(api.app)  # Not entered as a context manager: no startup warm-up
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+def test_unknown_agent_type_is_rejected(client, path):
+    response = client.post(path, json={"query": "price of AAPL", "agent_type": "made_up"})
+    assert response.status_code == 400
+    assert "financial_assistant" in response.json()["detail"]
+
+
+def test_unknown_agent_type_in_a_batch_is_rejected(client):
+    response = client.post("/chat/batch", json={"requests": [
+        {"query": "price of AAPL"}, {"query": "weather", "agent_type": "made_up"},
+    ]})
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+import config
+import tools
+from tools import crypto_market_tool
+from tools.candle_cache import CandleCache
+from tools.crypto_market_tool import HistoricalCryptoMarketTool
+
+HOUR_MS = 3_600_000
+NOW = 1_700_000_000_000 // HOUR_MS * HOUR_MS + HOUR_MS // 2  # mid-candle
+
+
+class FakeExchange:
+    id = "fake"
+    timeframes = {"1h": "1h", "1d": "1d"}
+
+    def __init__(self):
+        self.pages = []
+
+    def parse_timeframe(self, timeframe):
+        return {"1h": 3600, "1d": 86400}[timeframe]
+
+    def milliseconds(self):
+        return NOW
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.pages.append(since)
+        step = self.parse_timeframe(timeframe) * 1000
+        return [[t, 1.0, 2.0, 0.5, 1.5, 10.0] for t in range(since, min(since + limit * step, NOW + 1), step)]
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(crypto_market_tool, "candle_cache", CandleCache(root=str(tmp_path)))
+    monkeypatch.setattr(config, "CRYPTO_OHLCV_PAGE_LIMIT", 100)
+    monkeypatch.setattr(config, "CRYPTO_OHLCV_MAX_PAGES", 5)
+
+
+def test_pages_cover_the_range_and_closed_candles_are_cached():
+    exchange = FakeExchange()
+    candles = asyncio.run(HistoricalCryptoMarketTool()._load_candles(exchange, "BTC/USDT", "1h", 10))
+    assert len(exchange.pages) == 3  # 240 hours in pages of 100
+    assert candles.shape[0] == 241 and candles[-1, 0] + HOUR_MS > NOW
+    exchange.pages.clear()
+    again = asyncio.run(HistoricalCryptoMarketTool()._load_candles(exchange, "BTC/USDT", "1h", 10))
+    assert len(exchange.pages) == 1  # only the still-open candle is fetched again
+    assert (again == candles).all()
+
+
+def test_ranges_beyond_the_page_bound_are_rejected():
+    exchange = FakeExchange()
+    with pytest.raises(ValueError, match="coarser timeframe"):
+        asyncio.run(HistoricalCryptoMarketTool()._load_candles(exchange, "BTC/USDT", "1h", 30))
+    assert exchange.pages == []
+
+
+def test_tool_is_registered():
+    assert "HistoricalCryptoMarketTool" in config.TOOL_REGISTRY
+    assert tools.HistoricalCryptoMarketTool is HistoricalCryptoMarketTool
@@ -0,0 +1,65 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from tools import currency_exchange_tool
+from tools.currency_exchange_tool import HistoricalCurrencyConversionTool
+from tools.price_store import to_day
+from tools.stock_market_tool import HistoricalStockMarketTool
+
+DAYS = [to_day(date(2024, 1, 2)), to_day(date(2024, 1, 3))]
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    """(from, to) pairs asked of the FX history; every day converts at 0.5."""
+    series = np.array([DAYS, [100.0, 110.0], [101.0, 111.0], [99.0, 109.0], [100.0, 110.0], [1e6, 1e6]])
+    monkeypatch.setattr(HistoricalStockMarketTool, "_load_series", lambda self, ticker, days: series)
+    requested = []
+
+    def rates(from_currency, to_currency, start, end):
+        requested.append((from_currency, to_currency))
+        return np.array(DAYS, dtype=np.float64), np.array([0.5, 0.5])
+
+    monkeypatch.setattr(currency_exchange_tool.fx_history, "rates", rates)
+    return requested
+
+
+@pytest.fixture
+def tool(requested):
+    return HistoricalCurrencyConversionTool()
+
+
+def test_given_currency_is_used_as_is(tool, requested, monkeypatch):
+    monkeypatch.setattr(currency_exchange_tool, "listing_currency", lambda ticker: pytest.fail("lookup not expected"))
+    result = tool._run("7203.T", "usd", from_currency="jpy")
+    assert requested == [("JPY", "usd")]
+    assert result["from_currency"] == "JPY"
+    assert result["from_currency_source"] == "given"
+    assert result["historical_data"][0]["close"] == pytest.approx(50.0)
+
+
+def test_currency_is_inferred_from_the_listing(tool, requested, monkeypatch):
+    monkeypatch.setattr(currency_exchange_tool, "listing_currency", lambda ticker: "JPY")
+    result = tool._run("7203.T", "USD")
+    assert requested == [("JPY", "USD")]
+    assert result["from_currency"] == "JPY"
+    assert result["from_currency_source"] == "inferred"
+    assert "quoted_in" not in result
+
+
+def test_minor_unit_listing_is_scaled(tool, requested, monkeypatch):
+    monkeypatch.setattr(currency_exchange_tool, "listing_currency", lambda ticker: "GBp")
+    result = tool._run("VOD.L", "USD")
+    assert requested == [("GBP", "USD")]
+    assert result["quoted_in"] == "GBp"
+    assert result["historical_data"][0]["close"] == pytest.approx(0.5)
+    assert result["historical_data"][0]["fx_rate"] == pytest.approx(0.5)
+
+
+def test_unknown_listing_currency_is_an_error(tool, requested, monkeypatch):
+    monkeypatch.setattr(currency_exchange_tool, "listing_currency", lambda ticker: None)
+    result = tool._run("NOPE", "USD")
+    assert "from_currency" in result["error"]
+    assert requested == []
@@ -0,0 +1,73 @@
+import pytest
+
+from agents import history_manager as history_module
+from agents.history_manager import HistoryManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(history_module.config, "HISTORY_SUMMARY_MAX_TOKENS", 10)
+    manager = HistoryManager(token_budget=200, target_ratio=0.6)
+    # One token per word keeps the budget arithmetic readable (and avoids downloading an encoding).
+    monkeypatch.setattr(manager, "count_text_tokens", lambda text: len(text.split()))
+    return manager
+
+
+def words(n):
+    return " ".join(["w"] * n)
+
+
+def fail_summarize(previous, messages):
+    pytest.fail("nothing should be folded")
+
+
+def test_history_within_budget_is_unchanged(manager):
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+    assert manager.compact(history, fail_summarize) == history
+
+
+def test_first_turn_with_large_tool_output_is_kept(manager):
+    history = [
+        {"role": "user", "content": "price of AAPL"},
+        {"role": "assistant", "content": "calling stock_market"},
+        {"role": "tool", "content": words(500)},
+    ]
+    assert manager.compact(history, fail_summarize, conversation_id="first") == history
+
+
+def test_latest_turn_is_kept_when_older_turns_fold(manager):
+    history = [
+        {"role": "user", "content": words(50)},
+        {"role": "assistant", "content": words(50)},
+        {"role": "user", "content": "price of AAPL"},
+        {"role": "assistant", "content": "calling stock_market"},
+        {"role": "tool", "content": words(500)},
+    ]
+    folded = []
+
+    def summarize(previous, messages):
+        folded.extend(messages)
+        return "earlier"
+
+    compacted = manager.compact(history, summarize, conversation_id="later")
+    assert folded == history[:2]
+    assert compacted[0] == {"role": "system", "content": history_module.SUMMARY_PREFIX + "earlier"}
+    assert compacted[1:] == history[2:]
+
+
+def test_first_session_turn_reaches_the_model(manager, monkeypatch):
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+    from agents import agent_manager
+
+    monkeypatch.setattr(agent_manager, "history_manager", manager)
+    agent = object.__new__(agent_manager.AgentManager)
+    agent.system_prompt = "You are a finance assistant."
+    messages = [
+        HumanMessage("price of AAPL"),
+        AIMessage("", tool_calls=[{"name": "stock_market", "args": {"ticker": "AAPL"}, "id": "call_1"}]),
+        ToolMessage(words(500), tool_call_id="call_1"),
+    ]
+    prompt = agent._session_prompt({"messages": messages}, {"configurable": {"thread_id": "session"}})
+    assert isinstance(prompt[0], SystemMessage)
+    assert prompt[1:] == messages
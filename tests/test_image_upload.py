@@ -0,0 +1,59 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+import config
+from image_store import ImageStore
+
+
+def png_bytes(size=(64, 48), color=(200, 30, 30)):
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, "PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "image_store", ImageStore())
+    return TestClient(api.app)
+
+
+def test_upload_is_processed_once_and_reused(client):
+    data = png_bytes()
+    first = client.post("/images", files={"file": ("chart.png", data, "image/png")}, data={"note": "ignored"})
+    assert first.status_code == 200
+    assert first.json()["reused"] is False and first.json()["original_bytes"] == len(data)
+    second = client.post("/images", files={"file": ("chart.png", data, "image/png")})
+    assert second.json() == {**first.json(), "reused": True}
+
+
+def test_oversized_content_length_is_refused(client, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(api, "MULTIPART_OVERHEAD_BYTES", 100)
+    response = client.post("/images", files={"file": ("chart.png", b"x" * 1000, "image/png")})
+    assert response.status_code == 413
+
+
+def test_oversized_file_part_is_refused_while_streaming(client, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_MAX_UPLOAD_BYTES", 100)
+    body = (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n"
+            + b"x" * 500 + b"\r\n--b--\r\n")
+    # Chunked transfer: no Content-Length to refuse early, so the running count has to catch it.
+    response = client.post("/images", content=iter([body[:200], body[200:]]),
+                           headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"files": {"other": ("a.png", b"x", "image/png")}},
+    {"content": b"not multipart", "headers": {"content-type": "image/png"}},
+    {"files": {"file": ("a.png", b"not an image", "image/png")}},
+    {"content": b"--b\r\nContent-Disposition: form-data; name=\"file\"\r\n\r\ntruncated",
+     "headers": {"content-type": "multipart/form-data; boundary=b"}},
+])
+def test_bad_uploads_are_rejected(client, kwargs):
+    assert client.post("/images", **kwargs).status_code == 400
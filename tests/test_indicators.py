@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from tools import indicators
+from tools.indicator_state import IndicatorState
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(7)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 250)))
+
+
+@pytest.fixture
+def state(closes):
+    state = IndicatorState(windows=(5, 20), rsi_period=14, macd=(12, 26, 9))
+    state.update_many(np.arange(len(closes)), closes)
+    return state
+
+
+def test_moving_averages_match(closes, state):
+    snapshot = state.snapshot()
+    sma = indicators.sma(closes, [5, 20])
+    ema = indicators.ema(closes, [5, 20])
+    for w in (5, 20):
+        assert snapshot[f"SMA_{w}"] == pytest.approx(sma[w][-1])
+        assert snapshot[f"EMA_{w}"] == pytest.approx(ema[w][-1])
+
+
+def test_rsi_matches(closes, state):
+    assert state.snapshot()["RSI_14"] == pytest.approx(indicators.rsi(closes, 14)[-1])
+
+
+def test_macd_matches(closes, state):
+    snapshot = state.snapshot()["MACD"]
+    vectorised = indicators.macd(closes, 12, 26, 9)
+    for key in ("macd_line", "signal_line", "histogram"):
+        assert snapshot[key] == pytest.approx(vectorised[key][-1])
+
+
+def test_incremental_updates_match_batch(closes):
+    """Replaying the series in two halves (as with daily top-ups) ends at the same values."""
+    batch = IndicatorState(windows=(5, 20))
+    batch.update_many(np.arange(len(closes)), closes)
+    split = IndicatorState(windows=(5, 20))
+    split.update_many(np.arange(150), closes[:150])
+    split = IndicatorState.from_dict(split.to_dict())
+    split.update_many(np.arange(150, len(closes)), closes[150:])
+    assert split.update(0, 1.0) is False
+    for key, value in batch.snapshot().items():
+        assert split.snapshot()[key] == pytest.approx(value)
+
+
+def test_trend_tool_advertises_its_input_schema():
+    from tools.trend_analysis_tool import TrendAnalysisTool
+
+    schema = TrendAnalysisTool().args
+    assert "fast path" in schema["latest_only"]["description"]
+    assert schema["windows"]["description"].startswith("Windows for SMA and EMA")
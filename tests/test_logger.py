@@ -0,0 +1,43 @@
+import json
+import logging
+import queue
+import sys
+
+import config
+from logger import JsonFormatter, TextFormatter, _DroppingQueueHandler
+
+
+def make_record(message: str, *args, exc_info=None) -> logging.LogRecord:
+    record = logging.LogRecord("finance_agent.test", logging.ERROR, __file__, 1, message, args, exc_info)
+    record.request_id = "req"
+    return record
+
+
+def raise_deep(depth: int):
+    if depth == 0:
+        raise ValueError("boom")
+    raise_deep(depth - 1)
+
+
+def test_prepare_keeps_traceback_separate_and_whole():
+    try:
+        raise_deep(40)
+    except ValueError:
+        record = make_record("failed %s", "AAPL", exc_info=sys.exc_info())
+    prepared = _DroppingQueueHandler(queue.Queue()).prepare(record)
+    assert prepared.msg == "failed AAPL" and prepared.args is None
+    assert prepared.exc_info is None
+    assert "ValueError: boom" in prepared.exc_text
+    assert len(prepared.exc_text) > config.LOG_MAX_FIELD_CHARS
+
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["msg"] == "failed AAPL"
+    assert entry["exc"] == prepared.exc_text
+    assert "ValueError: boom" in TextFormatter().format(prepared)
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(make_record("one"))
+    handler.emit(make_record("two"))
+    assert handler.dropped == 1
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from tools.price_store import CLOSE, FIELDS, PriceStore, empty_series, expects_bars, to_day
+
+
+def weekday_bars(start, end):
+    days = np.array([to_day(start + timedelta(days=i)) for i in range((end - start).days + 1)
+                     if (start + timedelta(days=i)).weekday() < 5], dtype=np.float64)
+    bars = np.ones((len(FIELDS), len(days)))
+    bars[0] = days
+    return bars
+
+
+def test_expects_bars():
+    monday = date.today() - timedelta(days=date.today().weekday() + 7)
+    assert expects_bars(monday, monday + timedelta(days=4))
+    assert not expects_bars(monday, monday)  # one weekday: may be a holiday
+    assert not expects_bars(monday + timedelta(days=5), monday + timedelta(days=6))  # weekend
+    assert not expects_bars(date.today(), date.today() + timedelta(days=10))  # nothing has traded yet
+
+
+def test_empty_fetch_is_not_recorded_as_coverage(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=30)
+    calls = []
+
+    def empty(ticker, gap_start, gap_end):
+        calls.append((gap_start, gap_end))
+        return empty_series()
+
+    assert store.get_range("NOPE", start, end, empty).shape[1] == 0
+    assert store._coverage("NOPE") is None
+
+    def full(ticker, gap_start, gap_end):
+        calls.append((gap_start, gap_end))
+        return weekday_bars(gap_start, gap_end)
+
+    assert store.get_range("NOPE", start, end, full).shape[1] > 0
+    assert calls == [(start, end), (start, end)]
+    assert store.get_range("NOPE", start, end, empty)[CLOSE].tolist()  # covered now, served from the store
+    assert len(calls) == 2
+
+
+def test_empty_weekend_gap_is_recorded(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    saturday = date.today() - timedelta(days=date.today().weekday() + 2)
+    store.get_range("AAPL", saturday, saturday + timedelta(days=1), lambda *args: empty_series())
+    assert store._coverage("AAPL") == (to_day(saturday), to_day(saturday + timedelta(days=1)))
+
+
+def test_empty_yahoo_frame_falls_back_to_fmp(monkeypatch):
+    import sys
+    import types
+
+    import pandas as pd
+
+    from tools.stock_market_tool import HistoricalStockMarketTool
+
+    fake_yf = types.SimpleNamespace(Ticker=lambda ticker: types.SimpleNamespace(history=lambda **kwargs: pd.DataFrame()))
+    monkeypatch.setitem(sys.modules, "yfinance", fake_yf)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=14)
+    tool = HistoricalStockMarketTool()
+    assert tool._fetch_yahoo_finance_range("AAPL", start, end) is None
+    monkeypatch.setattr(HistoricalStockMarketTool, "_fetch_fmp_range", lambda self, ticker, s, e: weekday_bars(s, e))
+    assert tool._fetch_range("AAPL", start, end).shape[1] > 0
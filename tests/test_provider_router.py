@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from tools.provider_router import CLOSED, HALF_OPEN, OPEN, ProviderHealth, ProviderRoute
+
+
+@pytest.fixture(autouse=True)
+def fast_breakers(monkeypatch):
+    monkeypatch.setattr(config, "PROVIDER_BREAKER_OPEN_SECONDS", 0.05)
+    monkeypatch.setattr(config, "PROVIDER_BREAKER_CONSECUTIVE_FAILURES", 3)
+    monkeypatch.setattr(config, "PROVIDER_HEDGE_DEFAULT_SECONDS", 0.05)
+    monkeypatch.setattr(config, "PROVIDER_HEDGE_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(config, "PROVIDER_TIMEOUT_SECONDS", 2)
+
+
+def trip(health: ProviderHealth):
+    for _ in range(config.PROVIDER_BREAKER_CONSECUTIVE_FAILURES):
+        health.record(False, 0.01)
+
+
+def test_breaker_closed_open_half_open_closed():
+    health = ProviderHealth("test_transitions", "p")
+    assert health.state == CLOSED and health.available()
+    trip(health)
+    assert health.state == OPEN and not health.available()
+    time.sleep(0.06)
+    assert health.available()
+    assert health.state == OPEN  # checking does not claim the probe
+    assert health.claim() == "probe"
+    assert health.state == HALF_OPEN and health.probing
+    assert not health.available()  # only one probe at a time
+    assert health.claim() is None
+    health.record(True, 0.01)
+    assert health.state == CLOSED and not health.probing
+
+
+def test_failed_probe_reopens_breaker():
+    health = ProviderHealth("test_reopen", "p")
+    trip(health)
+    time.sleep(0.06)
+    assert health.claim() == "probe"
+    health.record(False, 0.01)
+    assert health.state == OPEN and not health.available()
+
+
+def test_error_rate_trips_breaker(monkeypatch):
+    monkeypatch.setattr(config, "PROVIDER_BREAKER_MIN_CALLS", 4)
+    health = ProviderHealth("test_error_rate", "p")
+    for ok in (True, False, True, False):
+        health.record(ok, 0.01)
+    assert health.state == OPEN
+
+
+def test_fallback_when_primary_fails():
+    route = ProviderRoute("test_fallback")
+    calls = []
+    result = route.call([
+        ("primary", lambda: calls.append("primary") or None),
+        ("secondary", lambda: calls.append("secondary") or "value"),
+    ])
+    assert result == "value"
+    assert calls == ["primary", "secondary"]
+
+
+def test_default_when_every_provider_fails():
+    route = ProviderRoute("test_default")
+    assert route.call([("a", lambda: None), ("b", lambda: {})], default={}) == {}
+
+
+def test_open_primary_is_skipped():
+    route = ProviderRoute("test_skip")
+    trip(route.health("primary"))
+    calls = []
+    result = route.call([
+        ("primary", lambda: calls.append("primary") or "stale"),
+        ("secondary", lambda: calls.append("secondary") or "value"),
+    ])
+    assert result == "value"
+    assert calls == ["secondary"]
+
+
+def test_all_open_still_tries_in_order():
+    route = ProviderRoute("test_all_open")
+    trip(route.health("a"))
+    trip(route.health("b"))
+    assert route.call([("a", lambda: "a"), ("b", lambda: "b")]) == "a"
+
+
+def test_unlaunched_fallback_keeps_probe_slot():
+    route = ProviderRoute("test_probe_slot")
+    trip(route.health("fallback"))
+    time.sleep(0.06)
+    # The primary answers, so the (expired) fallback is ordered but never launched.
+    assert route.call([("primary", lambda: "ok"), ("fallback", lambda: "fb")]) == "ok"
+    health = route.health("fallback")
+    assert not health.probing and health.available()
+    # On the next primary outage the fallback is still reachable and closes on success.
+    assert route.call([("primary", lambda: None), ("fallback", lambda: "fb")]) == "fb"
+    assert route.health("fallback").state == CLOSED
+
+
+def test_slow_primary_is_hedged():
+    route = ProviderRoute("test_hedge")
+    started = time.perf_counter()
+    result = route.call([
+        ("slow", lambda: time.sleep(0.5) or "slow"),
+        ("fast", lambda: "fast"),
+    ])
+    assert result == "fast"
+    assert time.perf_counter() - started < 0.4
+
+
+def test_async_hedge_cancels_loser():
+    route = ProviderRoute("test_async_hedge")
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+            return "slow"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def fast():
+        return "fast"
+
+    async def scenario():
+        result = await route.acall([("slow", slow), ("fast", fast)])
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "fast"
+    assert cancelled == [True]
+
+
+def test_async_cancelled_probe_is_released():
+    route = ProviderRoute("test_async_probe")
+    trip(route.health("slow"))
+    time.sleep(0.06)
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    # The half-open provider is probed, loses to the hedge and is cancelled.
+    assert asyncio.run(route.acall([("slow", slow), ("fast", fast)])) == "fast"
+    health = route.health("slow")
+    assert health.state == HALF_OPEN and not health.probing and health.available()
+
+
+def test_concurrent_callers_send_one_probe():
+    route = ProviderRoute("test_single_probe")
+    trip(route.health("flaky"))
+    time.sleep(0.06)
+    probes = []
+    barrier = threading.Barrier(8)
+
+    def flaky():
+        probes.append(True)
+        time.sleep(0.2)
+        return None
+
+    def caller():
+        barrier.wait()
+        return route.call([("flaky", flaky), ("backup", lambda: "backup")])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: caller(), range(8)))
+    assert results == ["backup"] * 8
+    assert len(probes) == 1
@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import config
+from tools.quote_cache import QuoteCache
+
+
+def make_cache(fresh=10.0, stale=10.0, max_entries=100):
+    return QuoteCache("test", fresh, stale, max_entries=max_entries)
+
+
+def test_fresh_hit_does_not_fetch():
+    cache = make_cache()
+    calls = []
+    fetch = lambda: calls.append(1) or {"price": 1}
+    assert cache.get("TSLA", fetch) == {"price": 1}
+    assert cache.get("TSLA", fetch) == {"price": 1}
+    assert len(calls) == 1
+    assert cache.stats()["hit"] == 1
+
+
+def test_empty_and_error_values_are_not_cached():
+    cache = make_cache()
+    calls = []
+    cache.get("TSLA", lambda: calls.append(1) or {})
+    cache.get("TSLA", lambda: calls.append(1) or {"error": "down"})
+    assert len(calls) == 2
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = make_cache()
+    calls = []
+    started = threading.Event()
+
+    def slow_fetch():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"price": 2}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("TSLA", slow_fetch))) for _ in range(5)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"price": 2}] * 5
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_stale_value_served_while_refreshing():
+    cache = make_cache(fresh=0.05, stale=10)
+    cache.get("TSLA", lambda: {"price": 1})
+    time.sleep(0.1)
+    refreshed = threading.Event()
+
+    def refresh():
+        refreshed.set()
+        return {"price": 2}
+
+    assert cache.get("TSLA", refresh) == {"price": 1}
+    assert refreshed.wait(2)
+    for _ in range(50):
+        if cache.peek("TSLA") == {"price": 2}:
+            break
+        time.sleep(0.01)
+    assert cache.peek("TSLA") == {"price": 2}
+
+
+def test_expired_value_is_refetched():
+    cache = make_cache(fresh=0.01, stale=0.01)
+    cache.get("TSLA", lambda: {"price": 1})
+    time.sleep(0.05)
+    assert cache.get("TSLA", lambda: {"price": 3}) == {"price": 3}
+
+
+def test_lru_eviction():
+    cache = make_cache(max_entries=2)
+    cache.put("A", {"price": 1})
+    cache.put("B", {"price": 2})
+    assert cache.peek("A") is not None  # A becomes most recently used
+    cache.put("C", {"price": 3})
+    assert cache.peek("B") is None
+    assert cache.peek("A") == {"price": 1}
+    assert cache.peek("C") == {"price": 3}
+
+
+def test_failed_fetch_releases_key():
+    cache = make_cache()
+
+    def fail():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("TSLA", fail)
+    assert cache.get("TSLA", lambda: {"price": 4}) == {"price": 4}
+
+
+def test_cancelled_leader_releases_key_and_waiters():
+    cache = make_cache()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        leader = asyncio.create_task(cache.aget("TSLA", hang))
+        await started.wait()
+        waiter = asyncio.create_task(cache.aget("TSLA", hang))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, 1)
+        assert not cache._inflight
+
+        async def fetch():
+            return {"price": 5}
+
+        assert await asyncio.wait_for(cache.aget("TSLA", fetch), 1) == {"price": 5}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    cache = make_cache()
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return {"price": 6}
+
+        leader = asyncio.create_task(cache.aget("TSLA", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget("TSLA", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        assert await leader == {"price": 6}
+        assert cache.peek("TSLA") == {"price": 6}
+
+    asyncio.run(scenario())
+
+
+def test_coalesced_wait_is_bounded(monkeypatch):
+    monkeypatch.setattr(config, "QUOTE_CACHE_WAIT_SECONDS", 0.1)
+    cache = make_cache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+        return {"price": 7}
+
+    leader = threading.Thread(target=cache.get, args=("TSLA", blocked))
+    leader.start()
+    started.wait()
+    try:
+        with pytest.raises(TimeoutError):
+            cache.get("TSLA", blocked)
+    finally:
+        release.set()
+        leader.join()
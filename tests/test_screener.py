@@ -0,0 +1,126 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from tools import screener_tool
+from tools.price_store import CLOSE, DATE, FIELDS, to_day
+from tools.screener_tool import (
+    ScreenerSyntaxError, ScreenerTool, _evaluate, _tokenize, compute_metrics, parse_condition,
+)
+
+
+def make_series(closes, end=None, skip=()):
+    """Daily bars ending yesterday (weekdays only), optionally without some of the trailing days."""
+    end = end or date.today() - timedelta(days=1)
+    days = []
+    day = end
+    while len(days) < len(closes) + len(skip):
+        if day.weekday() < 5:
+            days.append(to_day(day))
+        day -= timedelta(days=1)
+    days = sorted(days)
+    days = [d for i, d in enumerate(days) if len(days) - 1 - i not in skip][-len(closes):]
+    closes = np.asarray(closes, dtype=np.float64)
+    return np.vstack([days, closes, closes + 1, closes - 1, closes, np.full(len(closes), 1000.0)])
+
+
+# --- Tokenizer and parser ---
+def test_tokenize_keywords_and_numbers():
+    assert _tokenize("RSI_14 < -5.5 AND not macd_cross_up") == [
+        ("name", "rsi_14"), ("op", "<"), ("number", "-5.5"), ("and", "and"), ("not", "not"), ("name", "macd_cross_up"),
+    ]
+
+
+def test_parse_precedence():
+    tree, names = parse_condition("rsi < 30 or close > 10 and volume > 5")
+    assert tree[0] == "or" and tree[2][0] == "and"
+    assert names == {"rsi", "close", "volume"}
+
+
+def test_parse_parentheses_and_not():
+    tree, _ = parse_condition("not (rsi < 30 or rsi > 70)")
+    assert tree[0] == "not" and tree[1][0] == "or"
+
+
+@pytest.mark.parametrize("text", ["rsi <", "(rsi < 30", "rsi < 30)", "rsi < 30 and", "rsi ; drop", "__import__('os')", "< 5"])
+def test_parse_errors(text):
+    with pytest.raises(ScreenerSyntaxError):
+        parse_condition(text)
+
+
+def test_evaluate_on_vectors():
+    tree, _ = parse_condition("a < 2 and not b")
+    mask = _evaluate(tree, {"a": np.array([1.0, 1.0, 3.0, np.nan]), "b": np.array([0.0, 1.0, 0.0, 0.0])})
+    assert mask.tolist() == [True, False, False, False]
+
+
+# --- Metrics ---
+def aligned_block(*series_list):
+    days = np.unique(np.concatenate([s[DATE] for s in series_list]))
+    block = np.full((len(FIELDS), len(series_list), len(days)), np.nan)
+    for row, series in enumerate(series_list):
+        block[:, row, np.searchsorted(days, series[DATE])] = series
+    block[DATE] = days
+    return block
+
+
+def test_short_history_does_not_truncate_others():
+    rng = np.random.default_rng(0)
+    long = make_series(100 + np.cumsum(rng.normal(size=250)))
+    short = make_series(50 + np.cumsum(rng.normal(size=40)))
+    metrics = compute_metrics(aligned_block(long, short), {"sma_200", "rsi", "close"})
+    assert metrics["sma_200"][0] == pytest.approx(long[CLOSE][-200:].mean())
+    assert np.isnan(metrics["sma_200"][1])
+    assert not np.isnan(metrics["rsi"][1])
+    assert metrics["close"].tolist() == [long[CLOSE][-1], short[CLOSE][-1]]
+
+
+def test_metrics_match_single_ticker_computation():
+    rng = np.random.default_rng(1)
+    a = make_series(100 + np.cumsum(rng.normal(size=120)))
+    b = make_series(80 + np.cumsum(rng.normal(size=60)))
+    names = {"ema_20", "macd_hist", "atr", "bb_upper"}
+    together = compute_metrics(aligned_block(a, b), names)
+    for row, series in enumerate((a, b)):
+        alone = compute_metrics(series[:, np.newaxis, :], names)
+        for name in names:
+            assert together[name][row] == pytest.approx(alone[name][0])
+
+
+def test_crossover_false_without_enough_history():
+    series = make_series(np.linspace(10, 20, 20))
+    metrics = compute_metrics(series[:, np.newaxis, :], {"macd_cross_up"})
+    assert metrics["macd_cross_up"].tolist() == [False]
+
+
+def test_unknown_metric():
+    with pytest.raises(ScreenerSyntaxError):
+        compute_metrics(make_series([1.0, 2.0])[:, np.newaxis, :], {"magic"})
+
+
+# --- Tool ---
+def test_tool_aligns_on_dates_and_reports_short_history(monkeypatch):
+    closes = np.linspace(100, 150, 260)
+    stored = {
+        "AAA": make_series(closes),
+        "BBB": make_series(closes, skip=(3,)),  # missing one day a few sessions ago
+        "NEW": make_series(np.linspace(10, 12, 30)),
+        "NONE": np.empty((len(FIELDS), 0)),
+    }
+    monkeypatch.setattr(screener_tool.price_store, "get_range", lambda ticker, *args, **kwargs: stored[ticker])
+    result = ScreenerTool()._run("close > sma_200", tickers=list(stored))
+    assert result["scanned"] == 3
+    assert {m["ticker"] for m in result["matches"]} == {"AAA", "BBB"}
+    assert result["missing"] == ["NONE"]
+    assert result["insufficient_history"] == {"sma_200": ["NEW"]}
+
+    symbols, block, _ = ScreenerTool()._load_block(["AAA", "BBB"])
+    # The gap day carries BBB's previous close forward instead of shifting later bars.
+    assert block[CLOSE][1, -1] == block[CLOSE][0, -1]
+    assert block[CLOSE][1, -4] == block[CLOSE][1, -5]
+
+
+def test_unknown_universe():
+    result = ScreenerTool()._run("rsi < 30", universe="nope")
+    assert "error" in result and "dow30" in result["available_universes"]
@@ -1,32 +1,42 @@
-from .stock_market_tool import StockMarketTool, HistoricalStockMarketTool
-from .trend_analysis_tool import TrendAnalysisTool
-from .news_api_tool import NewsAPITool
-from .sentiment_analysis_tool import SentimentAnalysisTool
-from .crypto_market_tool import CryptoMarketTool
-from .date_time_tool import DateTimeTool
-from .unit_conversion_tool import UnitConversionTool
-from .timezone_conversion_tool import TimeZoneTool
-from .calculator_tool import CalculatorTool
-from .wikipedia_tool import WikipediaTool
-from .search_tool import SearchTool
-from .currency_exchange_tool import CurrencyExchangeTool
-from .weather_tool import WeatherTool
-from .calender_reminder_tool import CalendarReminderTool
+import importlib
 
-__all__ = [
-    "StockMarketTool",
-    "HistoricalStockMarketTool",
-    "TrendAnalysisTool",
-    "NewsAPITool",
-    "SentimentAnalysisTool",
-    "CryptoMarketTool",
-    "DateTimeTool",
-    "UnitConversionTool",
-    "TimeZoneTool",
-    "CalculatorTool",
-    "WikipediaTool",
-    "SearchTool",
-    "CurrencyExchangeTool",
-    "WeatherTool",
-    "CalendarReminderTool",
-]
+# Tool classes are imported on first attribute access (PEP 562) so that
+# `import tools` stays cheap; heavy third-party libraries are deferred further
+# inside each tool module until the tool is actually used.
+_TOOL_MODULES = {
+    "StockMarketTool": ".stock_market_tool",
+    "BatchStockQuoteTool": ".stock_market_tool",
+    "HistoricalStockMarketTool": ".stock_market_tool",
+    "TrendAnalysisTool": ".trend_analysis_tool",
+    "ScreenerTool": ".screener_tool",
+    "NewsAPITool": ".news_api_tool",
+    "SentimentAnalysisTool": ".sentiment_analysis_tool",
+    "CryptoMarketTool": ".crypto_market_tool",
+    "HistoricalCryptoMarketTool": ".crypto_market_tool",
+    "DateTimeTool": ".date_time_tool",
+    "UnitConversionTool": ".unit_conversion_tool",
+    "TimeZoneTool": ".timezone_conversion_tool",
+    "CalculatorTool": ".calculator_tool",
+    "WikipediaTool": ".wikipedia_tool",
+    "SearchTool": ".search_tool",
+    "CurrencyExchangeTool": ".currency_exchange_tool",
+    "BulkCurrencyConversionTool": ".currency_exchange_tool",
+    "HistoricalCurrencyConversionTool": ".currency_exchange_tool",
+    "WeatherTool": ".weather_tool",
+    "CalendarReminderTool": ".calender_reminder_tool",
+}
+
+__all__ = list(_TOOL_MODULES)
+
+
+def __getattr__(name):
+    module_name = _TOOL_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
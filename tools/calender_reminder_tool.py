@@ -1,14 +1,26 @@
-from tinydb import TinyDB, Query
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Dict, Any, List
 import os
+import threading
+from tools.async_utils import run_blocking
 
 # Define database path
 data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data")
-os.makedirs(data_dir, exist_ok=True)
 db_path = os.path.join(data_dir, "calendar_reminders.json")
-db = TinyDB(db_path)
+_db = None
+_db_lock = threading.Lock()
+
+def get_db():
+    """Opens the reminders TinyDB on first use."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                from tinydb import TinyDB
+                os.makedirs(data_dir, exist_ok=True)
+                _db = TinyDB(db_path)
+    return _db
 
 class ReminderInput(BaseModel):
     event: str = Field(description="Event name or title.")
@@ -22,18 +34,20 @@ class CalendarReminderTool(BaseTool):
     
     def _add_reminder(self, event: str, date: str, time: str, description: str) -> Dict[str, Any]:
         """Adds a new reminder."""
-        db.insert({"event": event, "date": date, "time": time, "description": description})
+        get_db().insert({"event": event, "date": date, "time": time, "description": description})
         return {"message": "Reminder added successfully."}
     
     def _get_reminders(self, date: str = None) -> List[Dict[str, Any]]:
         """Fetches reminders for a specific date or all upcoming reminders."""
+        from tinydb import Query
         if date:
-            return db.search(Query().date == date)
-        return db.all()
+            return get_db().search(Query().date == date)
+        return get_db().all()
     
     def _delete_reminder(self, event: str, date: str) -> Dict[str, Any]:
         """Deletes a specific reminder."""
-        db.remove((Query().event == event) & (Query().date == date))
+        from tinydb import Query
+        get_db().remove((Query().event == event) & (Query().date == date))
         return {"message": "Reminder deleted successfully."}
     
     def _run(self, action: str, event: str = "", date: str = "", time: str = "", description: str = "") -> Any:
@@ -46,7 +60,7 @@ class CalendarReminderTool(BaseTool):
         return {"error": "Invalid action specified."}
     
     async def _arun(self, action: str, event: str = "", date: str = "", time: str = "", description: str = "") -> Any:
-        return self._run(action, event, date, time, description)
+        return await run_blocking(self._run, action, event, date, time, description)
 
 
 # calrender_reminder_tool = CalendarReminderTool()
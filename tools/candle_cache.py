@@ -0,0 +1,122 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+
+# One candle per row, as ccxt returns it: [timestamp_ms, open, high, low, close, volume].
+CANDLE_WIDTH = 6
+CandleKey = Tuple[str, str, str]  # (exchange id, symbol, timeframe)
+
+
+def empty_candles() -> np.ndarray:
+    return np.empty((0, CANDLE_WIDTH), dtype=np.float64)
+
+
+def merge_candles(*blocks: np.ndarray) -> np.ndarray:
+    """Sorted union by timestamp; for duplicate timestamps the earliest block wins."""
+    blocks = [np.asarray(block, dtype=np.float64).reshape(-1, CANDLE_WIDTH) for block in blocks]
+    combined = np.concatenate(blocks) if blocks else empty_candles()
+    _, index = np.unique(combined[:, 0], return_index=True)
+    return combined[index]
+
+
+class CandleCache:
+    """
+    Closed OHLCV candles persisted per (exchange, symbol, timeframe) as a flat
+    binary file of float64 rows.
+
+    - New candles are appended in place; only a backfill of older history
+      rewrites the file (atomically).
+    - A JSON sidecar records the earliest time already requested, so history
+      before a symbol's listing is not asked for again.
+    - Reads map the file read-only.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or config.CANDLE_CACHE_DIR
+        self._lock = threading.Lock()
+
+    def _path(self, key: CandleKey, suffix: str) -> str:
+        exchange_id, symbol, timeframe = key
+        name = re.sub(r"[^A-Za-z0-9.\-]", "_", f"{symbol.upper()}_{timeframe}")
+        return os.path.join(self.root, exchange_id.lower(), f"{name}{suffix}")
+
+    def read(self, key: CandleKey) -> np.ndarray:
+        path = self._path(key, ".bin")
+        try:
+            rows = os.path.getsize(path) // (CANDLE_WIDTH * 8)
+        except FileNotFoundError:
+            return empty_candles()
+        if rows == 0:
+            return empty_candles()
+        return np.memmap(path, dtype=np.float64, mode="r", shape=(rows, CANDLE_WIDTH))
+
+    def covered_since(self, key: CandleKey) -> Optional[int]:
+        """Earliest timestamp (ms) already fetched, or None."""
+        try:
+            with open(self._path(key, ".json")) as f:
+                return json.load(f)["since"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    @contextmanager
+    def _writer(self, key: CandleKey):
+        with self._lock:
+            os.makedirs(os.path.dirname(self._path(key, ".bin")), exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(key, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _replace(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def store(self, key: CandleKey, candles: np.ndarray, since: int):
+        """
+        Persists closed `candles` fetched for a range starting at `since` (ms):
+        newer ones are appended, older ones trigger a one-off rewrite.
+        """
+        candles = merge_candles(candles)
+        with self._writer(key):
+            existing = self.read(key)
+            covered = self.covered_since(key)
+            if existing.shape[0] and candles.shape[0] and candles[0, 0] < existing[0, 0]:
+                self._replace(self._path(key, ".bin"), merge_candles(existing, candles).tobytes())
+            elif candles.shape[0]:
+                newer = candles[candles[:, 0] > existing[-1, 0]] if existing.shape[0] else candles
+                if newer.shape[0]:
+                    with open(self._path(key, ".bin"), "ab") as f:
+                        f.write(np.ascontiguousarray(newer).tobytes())
+            if covered is None or since < covered:
+                self._replace(self._path(key, ".json"), json.dumps({"since": int(since)}).encode())
+
+
+candle_cache = CandleCache()
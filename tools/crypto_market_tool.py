@@ -1,97 +1,207 @@
-import ccxt
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
-from typing import Type, Any, Dict, List
+from typing import Type, Any, Dict, List, Optional
 from datetime import datetime, timedelta
+import asyncio
+import math
+import os
+import sys
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from tools.candle_cache import CANDLE_WIDTH, candle_cache, merge_candles
+from tools.exchange_pool import exchange_pool
+from tools.quote_cache import crypto_quote_cache
+from tools.quote_hub import quote_hub
 
 class CryptoPriceInput(BaseModel):
     symbol: str = Field(default="BTC/USDT", description="Cryptocurrency symbol in exchange format (e.g., BTC/USDT).")
+    symbols: Optional[List[str]] = Field(default=None, description="Several symbols to quote in one request (e.g., [\"BTC/USDT\", \"ETH/USDT\"]).")
 
 class HistoricalCryptoInput(BaseModel):
     symbol: str = Field(default="BTC/USDT", description="Cryptocurrency symbol in exchange format (e.g., BTC/USDT).")
     days: int = Field(default=30, description="Number of past days for historical data.")
+    timeframe: str = Field(default="1d", description="Candle timeframe (e.g., 1m, 15m, 1h, 4h, 1d).")
 
 class CryptoMarketTool(BaseTool):
     name: str = "crypto_market"
-    description: str = "Fetches real-time cryptocurrency market data."
-    exchange_name: str = "binance"
-    
-    def __init__(self, exchange_name: str = "binance", **kwargs):
-        super().__init__(**kwargs)
-        object.__setattr__(self, "exchange", self.initialize_exchange(exchange_name))
-    
-    def initialize_exchange(self, exchange_name):
-        """Initialize the crypto exchange."""
+    description: str = "Fetches real-time cryptocurrency market data for one symbol or several at once."
+    args_schema: Type[BaseModel] = CryptoPriceInput
+    exchange_name: str = config.CRYPTO_EXCHANGE
+
+    def _format_ticker(self, symbol: str, ticker: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "symbol": symbol,
+            "latest_price": round(ticker["last"], 2),
+            "high": round(ticker["high"], 2),
+            "low": round(ticker["low"], 2),
+            "volume": round(ticker["quoteVolume"], 2),
+            "timestamp": datetime.utcfromtimestamp(ticker["timestamp"] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    async def _afetch_crypto_price(self, symbol: str) -> Dict[str, Any]:
+        """Fetches real-time cryptocurrency price through the shared exchange pool."""
         try:
-            return getattr(ccxt, exchange_name)()
-        except AttributeError:
-            raise ValueError(f"Exchange '{exchange_name}' not supported by CCXT.")
+            ticker = await exchange_pool.arun(self.exchange_name, lambda exchange: exchange.fetch_ticker(symbol))
+            return self._format_ticker(symbol, ticker)
+        except Exception as e:
+            return {"error": f"Crypto price retrieval failed: {str(e)}"}
 
     def _fetch_crypto_price(self, symbol: str) -> Dict[str, Any]:
         """Fetches real-time cryptocurrency price."""
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
-            return {
-                "symbol": symbol,
-                "latest_price": round(ticker["last"], 2),
-                "high": round(ticker["high"], 2),
-                "low": round(ticker["low"], 2),
-                "volume": round(ticker["quoteVolume"], 2),
-                "timestamp": datetime.utcfromtimestamp(ticker["timestamp"] / 1000).strftime('%Y-%m-%d %H:%M:%S')
-            }
+            ticker = exchange_pool.run(self.exchange_name, lambda exchange: exchange.fetch_ticker(symbol))
+            return self._format_ticker(symbol, ticker)
         except Exception as e:
             return {"error": f"Crypto price retrieval failed: {str(e)}"}
-    
-    def _run(self, symbol: str = "BTC/USDT") -> Dict[str, Any]:
-        """Synchronous method to fetch crypto price."""
-        return self._fetch_crypto_price(symbol)
-    
-    async def _arun(self, symbol: str = "BTC/USDT") -> Dict[str, Any]:
-        """Asynchronous method to fetch crypto price."""
-        return self._fetch_crypto_price(symbol)
+
+    async def _fetch_tickers(self, exchange, symbols: List[str]) -> Dict[str, Any]:
+        """One `fetch_tickers` request where the exchange supports it, otherwise concurrent `fetch_ticker` calls."""
+        if exchange.has.get("fetchTickers"):
+            return await exchange.fetch_tickers(symbols)
+        results = await asyncio.gather(*(exchange.fetch_ticker(symbol) for symbol in symbols), return_exceptions=True)
+        return {symbol: result for symbol, result in zip(symbols, results) if not isinstance(result, Exception)}
+
+    def _merge_quotes(self, symbols: List[str], cached: Dict[str, Any], tickers: Dict[str, Any]) -> Dict[str, Any]:
+        quotes = []
+        for symbol in symbols:
+            if symbol in cached:
+                quotes.append(cached[symbol])
+            elif tickers.get(symbol):
+                quote = self._format_ticker(symbol, tickers[symbol])
+                crypto_quote_cache.put((self.exchange_name, symbol), quote)
+                quotes.append(quote)
+            else:
+                quotes.append({"symbol": symbol, "error": "No ticker returned."})
+        return {"quotes": quotes}
+
+    def _split_cached(self, symbols: List[str]):
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        cached = {}
+        for symbol in symbols:
+            quote = quote_hub.latest(symbol) or crypto_quote_cache.peek((self.exchange_name, symbol))
+            if quote is not None:
+                cached[symbol] = quote
+        return symbols, cached, [s for s in symbols if s not in cached]
+
+    def _run(self, symbol: str = "BTC/USDT", symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Synchronous method to fetch crypto prices."""
+        if symbols:
+            symbols, cached, missing = self._split_cached(symbols)
+            try:
+                tickers = exchange_pool.run(self.exchange_name, lambda exchange: self._fetch_tickers(exchange, missing)) if missing else {}
+            except Exception as e:
+                return {"error": f"Crypto price retrieval failed: {str(e)}"}
+            return self._merge_quotes(symbols, cached, tickers)
+        symbol = symbol.strip().upper()
+        return quote_hub.latest(symbol) or crypto_quote_cache.get((self.exchange_name, symbol), lambda: self._fetch_crypto_price(symbol))
+
+    async def _arun(self, symbol: str = "BTC/USDT", symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Asynchronous method to fetch crypto prices."""
+        if symbols:
+            symbols, cached, missing = self._split_cached(symbols)
+            try:
+                tickers = await exchange_pool.arun(self.exchange_name, lambda exchange: self._fetch_tickers(exchange, missing)) if missing else {}
+            except Exception as e:
+                return {"error": f"Crypto price retrieval failed: {str(e)}"}
+            return self._merge_quotes(symbols, cached, tickers)
+        symbol = symbol.strip().upper()
+        return quote_hub.latest(symbol) or await crypto_quote_cache.aget((self.exchange_name, symbol), lambda: self._afetch_crypto_price(symbol))
 
 class HistoricalCryptoMarketTool(BaseTool):
     name: str = "historical_crypto_market"
-    description: str = "Fetches historical cryptocurrency market data."
-    exchange_name: str = "binance"
-    
-    def __init__(self, exchange_name: str = "binance", **kwargs):
-        super().__init__(**kwargs)
-        object.__setattr__(self, "exchange", self.initialize_exchange(exchange_name))
-    
-    def initialize_exchange(self, exchange_name):
-        """Initialize the crypto exchange."""
-        try:
-            return getattr(ccxt, exchange_name)()
-        except AttributeError:
-            raise ValueError(f"Exchange '{exchange_name}' not supported by CCXT.")
-    
-    def _fetch_historical_crypto(self, symbol: str, days: int) -> List[Dict[str, Any]]:
-        """Fetches historical cryptocurrency data."""
-        try:
-            since = self.exchange.parse8601((datetime.utcnow() - timedelta(days=days)).isoformat())
-            candles = self.exchange.fetch_ohlcv(symbol, timeframe="1d", since=since, limit=days)
-
-            if not candles:
-                return [{"error": f"No historical data found for {symbol}"}]
-
-            return [
+    description: str = "Fetches historical cryptocurrency OHLCV candles for any timeframe (1m, 5m, 1h, 4h, 1d, ...)."
+    args_schema: Type[BaseModel] = HistoricalCryptoInput
+    exchange_name: str = config.CRYPTO_EXCHANGE
+
+    async def _fetch_pages(self, exchange, symbol: str, timeframe: str, ranges: List[tuple], timeframe_ms: int) -> np.ndarray:
+        """Fetches [start, end] ranges page by page, pages running concurrently (ccxt's limiter spaces the requests)."""
+        page_limit = config.CRYPTO_OHLCV_PAGE_LIMIT
+        page_span = page_limit * timeframe_ms
+        semaphore = asyncio.Semaphore(config.CRYPTO_OHLCV_CONCURRENCY)
+
+        async def fetch_page(page_start: int, end: int):
+            async with semaphore:
+                candles = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=page_start, limit=page_limit)
+            candles = np.asarray(candles or [], dtype=np.float64).reshape(-1, CANDLE_WIDTH)
+            # Pages are disjoint: drop rows the exchange returned beyond this page's window.
+            return candles[(candles[:, 0] < page_start + page_span) & (candles[:, 0] <= end)]
+
+        starts = [(page_start, end) for start, end in ranges for page_start in range(start, end + 1, page_span)]
+        if len(starts) > config.CRYPTO_OHLCV_MAX_PAGES:
+            raise ValueError(f"The range needs {len(starts)} pages of {timeframe} candles (at most {config.CRYPTO_OHLCV_MAX_PAGES}); "
+                             "use a coarser timeframe or fewer days.")
+        return merge_candles(*await asyncio.gather(*(fetch_page(page_start, end) for page_start, end in starts)))
+
+    async def _load_candles(self, exchange, symbol: str, timeframe: str, days: int) -> np.ndarray:
+        """
+        Candles since `days` ago: closed candles come from the local cache, and
+        only history before the cached range and candles after the last cached
+        one are fetched. Newly closed candles are persisted; the still-open one is not.
+        """
+        if exchange.timeframes and timeframe not in exchange.timeframes:
+            raise ValueError(f"Timeframe '{timeframe}' not supported by {exchange.id}; use one of {', '.join(exchange.timeframes)}.")
+        timeframe_ms = exchange.parse_timeframe(timeframe) * 1000
+        now = exchange.milliseconds()
+        since = (now - days * 86_400_000) // timeframe_ms * timeframe_ms
+        key = (exchange.id, symbol, timeframe)
+
+        cached = candle_cache.read(key)
+        covered = candle_cache.covered_since(key)
+        if cached.shape[0] == 0:
+            ranges = [(since, now)]
+        else:
+            ranges = [(int(cached[-1, 0]) + timeframe_ms, now)]
+            if covered is None or since < covered:
+                ranges.insert(0, (since, int(cached[0, 0]) - timeframe_ms))
+        fetched = await self._fetch_pages(exchange, symbol, timeframe, ranges, timeframe_ms)
+
+        closed = fetched[fetched[:, 0] + timeframe_ms <= now]
+        candle_cache.store(key, closed, since if covered is None else min(since, covered))
+        candles = merge_candles(fetched, cached)
+        return candles[candles[:, 0] >= since]
+
+    def _format_candles(self, symbol: str, timeframe: str, candles: np.ndarray) -> Dict[str, Any]:
+        if candles.shape[0] == 0:
+            return {"error": f"No historical data found for {symbol}"}
+        limit = config.CRYPTO_OHLCV_MAX_OUTPUT
+        date_format = "%Y-%m-%d" if timeframe.endswith(("d", "w", "M")) else "%Y-%m-%d %H:%M"
+        result = {
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "candles": [
                 {
-                    "timestamp": datetime.utcfromtimestamp(c[0] / 1000).strftime('%Y-%m-%d'),
+                    "timestamp": datetime.utcfromtimestamp(c[0] / 1000).strftime(date_format),
                     "open": c[1], "high": c[2], "low": c[3], "close": c[4], "volume": c[5]
-                } for c in candles
-            ]
-        except Exception as e:
-            return [{"error": f"Historical crypto data retrieval failed: {str(e)}"}]
-    
-    def _run(self, symbol: str = "BTC/USDT", days: int = 30) -> List[Dict[str, Any]]:
+                } for c in candles[-limit:].tolist()
+            ],
+        }
+        if candles.shape[0] > limit:
+            result["truncated"] = f"Showing the latest {limit} of {candles.shape[0]} candles; use a coarser timeframe for the full range."
+        return result
+
+    def _run(self, symbol: str = "BTC/USDT", days: int = 30, timeframe: str = "1d") -> Dict[str, Any]:
         """Synchronous method to fetch historical crypto data."""
-        return self._fetch_historical_crypto(symbol, days)
-    
-    async def _arun(self, symbol: str = "BTC/USDT", days: int = 30) -> List[Dict[str, Any]]:
-        """Asynchronous method to fetch historical crypto data."""
-        return self._fetch_historical_crypto(symbol, days)
+        symbol = symbol.strip().upper()
+        try:
+            # Pages run CRYPTO_OHLCV_CONCURRENCY at a time; allow a round trip per batch plus client setup.
+            timeout = config.EXCHANGE_TIMEOUT_MS / 1000 * (math.ceil(config.CRYPTO_OHLCV_MAX_PAGES / config.CRYPTO_OHLCV_CONCURRENCY) + 2)
+            candles = exchange_pool.run(self.exchange_name, lambda exchange: self._load_candles(exchange, symbol, timeframe, days), timeout)
+            return self._format_candles(symbol, timeframe, candles)
+        except Exception as e:
+            return {"error": f"Historical crypto data retrieval failed: {str(e)}"}
 
+    async def _arun(self, symbol: str = "BTC/USDT", days: int = 30, timeframe: str = "1d") -> Dict[str, Any]:
+        """Asynchronous method to fetch historical crypto data."""
+        symbol = symbol.strip().upper()
+        try:
+            candles = await exchange_pool.arun(self.exchange_name, lambda exchange: self._load_candles(exchange, symbol, timeframe, days))
+            return self._format_candles(symbol, timeframe, candles)
+        except Exception as e:
+            return {"error": f"Historical crypto data retrieval failed: {str(e)}"}
 
 
 # # **Test the Fix**
@@ -1,54 +1,74 @@
 import os
 import sys
-import requests
+import threading
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
-from typing import Dict, Any
+from typing import Type, Dict, Any, List, Optional
+import numpy as np
 
 # Get the absolute path of the finance_agents directory
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 import config
+from datetime import timedelta
+from tools.async_utils import run_blocking
+from tools.fx_history import align_rates, convert_series, fx_history
+from tools.fx_rates import RateTable, fx_rates
+from tools.price_store import DATE, from_day, series_to_records
 # print(f"API Key: {config.EXCHANGE_RATE_API_KEY}")
 
+BULK_CONVERSION_COLUMNS = ["amount", "from_currency", "to_currency", "rate", "converted_amount"]
+# Minor-unit codes Yahoo quotes some exchanges in (e.g. London in pence): ISO code and its size.
+MINOR_UNITS = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+
+# A listing's quote currency does not change, so lookups are kept for the life of the process.
+_listing_currencies = {}  # ticker -> currency code as Yahoo reports it
+_listing_lock = threading.Lock()
+
+
+def listing_currency(ticker: str) -> Optional[str]:
+    """Currency Yahoo Finance quotes `ticker` in (e.g. "JPY", or "GBp" for pence), or None if unknown."""
+    ticker = ticker.upper()
+    with _listing_lock:
+        if ticker in _listing_currencies:
+            return _listing_currencies[ticker]
+    try:
+        import yfinance as yf
+        currency = (yf.Ticker(ticker).info or {}).get("currency")
+    except Exception:
+        return None  # Not cached, so a transient failure is retried on the next call
+    if not currency:
+        return None
+    with _listing_lock:
+        _listing_currencies[ticker] = currency
+    return currency
+
 class CurrencyExchangeInput(BaseModel):
     from_currency: str = Field(description="Currency code to convert from (e.g., USD, EUR, GBP).")
     to_currency: str = Field(description="Currency code to convert to (e.g., JPY, INR, CAD).")
     amount: float = Field(description="Amount to convert.")
 
+class BulkCurrencyConversionInput(BaseModel):
+    amounts: List[float] = Field(description="Amounts to convert.")
+    from_currencies: List[str] = Field(description="Currency code per amount, or one code for all of them (e.g., [\"USD\"]).")
+    to_currencies: List[str] = Field(description="Target currency code per amount, or one code for all of them (e.g., [\"EUR\", \"JPY\", \"INR\"]).")
+
 class CurrencyExchangeTool(BaseTool):
     name: str = "currency_exchange_tool"
     description: str = "Fetches real-time currency exchange rates and performs conversions."
-    api_key: str = config.EXCHANGE_RATE_API_KEY
-    base_url: str = "https://v6.exchangerate-api.com/v6/"  # ExchangeRate-API
-    ecb_url: str = "https://api.exchangeratesapi.io/latest"  # ECB API fallback
     
     def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> float:
-        """Fetches exchange rate from ExchangeRate-API, falls back to ECB API if needed."""
-        try:
-            url = f"{self.base_url}{self.api_key}/latest/{from_currency}"
-            response = requests.get(url)
-            data = response.json()
-            
-            if response.status_code == 200 and "conversion_rates" in data:
-                return data["conversion_rates"].get(to_currency, None)
-        except Exception:
-            pass  # If API fails, use fallback
-        
-        # Fallback to ECB API (EUR-based rates)
-        try:
-            response = requests.get(self.ecb_url)
-            data = response.json()
-            if "rates" in data and from_currency in data["rates"] and to_currency in data["rates"]:
-                return data["rates"][to_currency] / data["rates"][from_currency]
-        except Exception:
-            pass
-        
-        return None  # Failed both APIs
-    
-    def _convert_currency(self, from_currency: str, to_currency: str, amount: float) -> Dict[str, Any]:
-        """Performs currency conversion."""
-        rate = self._fetch_exchange_rate(from_currency, to_currency)
+        """Cross rate from the cached base rate table (refreshed every FX_RATE_TTL_SECONDS)."""
+        table = fx_rates.table()
+        return table.rate(from_currency, to_currency) if table else None
+
+    async def _afetch_exchange_rate(self, from_currency: str, to_currency: str) -> float:
+        """Like `_fetch_exchange_rate` without blocking the event loop."""
+        table = await fx_rates.atable()
+        return table.rate(from_currency, to_currency) if table else None
+
+    def _build_conversion(self, from_currency: str, to_currency: str, amount: float, rate: float) -> Dict[str, Any]:
+        """Formats a conversion result for a fetched rate."""
         if rate:
             return {
                 "from_currency": from_currency,
@@ -59,11 +79,121 @@ class CurrencyExchangeTool(BaseTool):
             }
         return {"error": "Failed to fetch exchange rate."}
     
+    def _convert_currency(self, from_currency: str, to_currency: str, amount: float) -> Dict[str, Any]:
+        """Performs currency conversion."""
+        rate = self._fetch_exchange_rate(from_currency, to_currency)
+        return self._build_conversion(from_currency, to_currency, amount, rate)
+    
     def _run(self, from_currency: str, to_currency: str, amount: float) -> Dict[str, Any]:
         return self._convert_currency(from_currency, to_currency, amount)
     
     async def _arun(self, from_currency: str, to_currency: str, amount: float) -> Dict[str, Any]:
-        return self._convert_currency(from_currency, to_currency, amount)
+        rate = await self._afetch_exchange_rate(from_currency, to_currency)
+        return self._build_conversion(from_currency, to_currency, amount, rate)
+
+
+class HistoricalCurrencyConversionInput(BaseModel):
+    ticker: str = Field(description="Stock ticker symbol (e.g., 7203.T for Toyota).")
+    to_currency: str = Field(description="Currency to express the prices in (e.g., USD, EUR).")
+    from_currency: Optional[str] = Field(default=None, description="Currency the ticker is quoted in (e.g., JPY for 7203.T); looked up from the listing if omitted.")
+    days: int = Field(default=30, description="Number of past days for historical data.")
+
+class BulkCurrencyConversionTool(BaseTool):
+    name: str = "bulk_currency_conversion"
+    description: str = (
+        "Converts many amounts and/or currency pairs in one call. Lists of length 1 apply to every row, "
+        "e.g. amounts=[100], from_currencies=[\"USD\"], to_currencies=[\"EUR\", \"JPY\", \"INR\"]."
+    )
+    args_schema: Type[BaseModel] = BulkCurrencyConversionInput
+
+    def _broadcast(self, amounts: List[float], from_currencies: List[str], to_currencies: List[str]):
+        size = max(len(amounts), len(from_currencies), len(to_currencies))
+        if not amounts or not from_currencies or not to_currencies:
+            raise ValueError("amounts, from_currencies and to_currencies must not be empty")
+        if size > config.FX_BULK_MAX_ITEMS:
+            raise ValueError(f"At most {config.FX_BULK_MAX_ITEMS} conversions per call")
+        columns = []
+        for name, values in (("amounts", amounts), ("from_currencies", from_currencies), ("to_currencies", to_currencies)):
+            if len(values) not in (1, size):
+                raise ValueError(f"{name} must have 1 or {size} entries")
+            columns.append(values * size if len(values) == 1 else values)
+        amounts, from_currencies, to_currencies = columns
+        return np.asarray(amounts, dtype=np.float64), [c.strip().upper() for c in from_currencies], [c.strip().upper() for c in to_currencies]
+
+    def _convert(self, table: RateTable, amounts: List[float], from_currencies: List[str], to_currencies: List[str]) -> Dict[str, Any]:
+        if not table:
+            return {"error": "Failed to fetch exchange rates."}
+        try:
+            amounts, from_currencies, to_currencies = self._broadcast(amounts, from_currencies, to_currencies)
+        except ValueError as e:
+            return {"error": str(e)}
+        rates = table.cross(from_currencies, to_currencies)
+        converted = np.round(amounts * rates, 2)
+        known = ~np.isnan(rates)
+        result = {
+            "columns": BULK_CONVERSION_COLUMNS,
+            "rows": [
+                [float(amounts[i]), from_currencies[i], to_currencies[i], round(float(rates[i]), 6), float(converted[i])]
+                for i in np.flatnonzero(known)
+            ],
+            "rates_as_of": table.as_of,
+        }
+        if not known.all():
+            result["unknown_currencies"] = table.unknown(from_currencies + to_currencies)
+        return result
+
+    def _run(self, amounts: List[float], from_currencies: List[str], to_currencies: List[str]) -> Dict[str, Any]:
+        return self._convert(fx_rates.table(), amounts, from_currencies, to_currencies)
+
+    async def _arun(self, amounts: List[float], from_currencies: List[str], to_currencies: List[str]) -> Dict[str, Any]:
+        return self._convert(await fx_rates.atable(), amounts, from_currencies, to_currencies)
+
+
+class HistoricalCurrencyConversionTool(BaseTool):
+    name: str = "historical_currency_conversion"
+    description: str = "Fetches a stock's daily price history re-denominated in another currency using each day's FX rate."
+    args_schema: Type[BaseModel] = HistoricalCurrencyConversionInput
+
+    def _run(self, ticker: str, to_currency: str, from_currency: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+        from tools.stock_market_tool import HistoricalStockMarketTool
+
+        listing, scale, currency_source = None, 1.0, "given"
+        if not from_currency:
+            listing = listing_currency(ticker)
+            if listing is None:
+                return {"error": f"Could not determine the currency {ticker} is quoted in; pass from_currency."}
+            from_currency, scale = MINOR_UNITS.get(listing, (listing, 1.0))
+            currency_source = "inferred"
+        from_currency = from_currency.strip().upper()
+        series = HistoricalStockMarketTool()._load_series(ticker, days)
+        if series.shape[1] == 0:
+            return {"error": f"No historical data found for {ticker}"}
+        # Start a few days early so the first bars have a prior rate across weekends and holidays.
+        start = from_day(series[DATE][0]) - timedelta(days=config.FX_HISTORY_LOOKBACK_DAYS)
+        fx_days, fx_values = fx_history.rates(from_currency, to_currency, start, from_day(series[DATE][-1]))
+        rates = align_rates(series[DATE], fx_days, fx_values)
+        known = ~np.isnan(rates)
+        if not known.any():
+            return {"error": f"No {from_currency}/{to_currency.upper()} rates found for {ticker}'s dates"}
+        records = series_to_records(convert_series(series[:, known], rates[known] * scale))
+        for record, rate in zip(records, rates[known].tolist()):
+            record["fx_rate"] = rate
+        result = {
+            "ticker": ticker,
+            "currency": to_currency.upper(),
+            "from_currency": from_currency,
+            "from_currency_source": currency_source,
+            "historical_data": records,
+        }
+        if scale != 1.0:
+            result["quoted_in"] = listing  # Source prices were in a minor unit (e.g. pence) of from_currency
+        if not known.all():
+            result["days_without_rate"] = int((~known).sum())
+        return result
+
+    async def _arun(self, ticker: str, to_currency: str, from_currency: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+        # Store reads, file locks, provider fetches and the currency lookup are all blocking.
+        return await run_blocking(self._run, ticker, to_currency, from_currency, days)
 
 
 # currency_exchange_tool = CurrencyExchangeTool()
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+
+logger = get_logger("exchange_pool")
+
+
+class ExchangePool:
+    """
+    Process-wide `ccxt.async_support` clients, one per exchange id.
+
+    All clients live on one background event loop, because a ccxt async client
+    is bound to the loop its HTTP session was created on. Sync and async callers
+    from any thread or loop submit coroutines to it. Each client:
+    - loads markets once, and reloads them every EXCHANGE_MARKETS_REFRESH_SECONDS
+      in the background;
+    - uses ccxt's built-in rate limiter (`enableRateLimit`), so concurrent tool
+      calls are throttled instead of being banned by the exchange.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._clients = {}  # exchange id -> asyncio.Task resolving to a ready client
+        self._refreshers = []
+
+    # --- Loop thread ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="exchange-pool", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    # --- Clients (only touched on the pool loop) ---
+    async def _create(self, exchange_id: str):
+        import ccxt.async_support as ccxt_async
+
+        exchange_class = getattr(ccxt_async, exchange_id, None)
+        if exchange_class is None:
+            raise ValueError(f"Exchange '{exchange_id}' not supported by CCXT.")
+        exchange = exchange_class({"enableRateLimit": True, "timeout": config.EXCHANGE_TIMEOUT_MS})
+        started = time.perf_counter()
+        try:
+            await exchange.load_markets()
+        except Exception:
+            await exchange.close()
+            raise
+        logger.info("Exchange ready", extra={"exchange": exchange_id, "markets": len(exchange.markets or {}),
+                                             "load_ms": round((time.perf_counter() - started) * 1000, 1)})
+        self._refreshers.append(asyncio.get_running_loop().create_task(self._refresh_markets(exchange)))
+        return exchange
+
+    async def _refresh_markets(self, exchange):
+        while True:
+            await asyncio.sleep(config.EXCHANGE_MARKETS_REFRESH_SECONDS)
+            try:
+                await exchange.load_markets(reload=True)
+            except Exception as e:
+                # Keep serving the previous market metadata.
+                logger.warning("Market refresh failed", extra={"exchange": exchange.id, "error": str(e)})
+
+    async def _client(self, exchange_id: str):
+        task = self._clients.get(exchange_id)
+        if task is None or (task.done() and task.exception() is not None):
+            # Concurrent first callers share one creation task; a failed creation is retried next time.
+            task = asyncio.get_running_loop().create_task(self._create(exchange_id))
+            self._clients[exchange_id] = task
+        return await task
+
+    async def _call(self, exchange_id: str, fn: Callable[[Any], Awaitable[Any]]):
+        return await fn(await self._client(exchange_id))
+
+    # --- Public API ---
+    def submit(self, exchange_id: str, fn: Callable[[Any], Awaitable[Any]]) -> Future:
+        """Runs `await fn(exchange)` on the pool loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self._call(exchange_id.lower(), fn), self._ensure_loop())
+
+    def run(self, exchange_id: str, fn: Callable[[Any], Awaitable[Any]], timeout: float = None) -> Any:
+        """Blocking variant of `submit`, for sync tool paths; `timeout` defaults to three exchange round trips."""
+        return self.submit(exchange_id, fn).result(timeout=timeout or config.EXCHANGE_TIMEOUT_MS / 1000 * 3)
+
+    async def arun(self, exchange_id: str, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        """Awaitable variant of `submit`, usable from any event loop."""
+        return await asyncio.wrap_future(self.submit(exchange_id, fn))
+
+    async def _close_all(self):
+        for task in self._refreshers:
+            task.cancel()
+        for task in self._clients.values():
+            if task.done() and task.exception() is None:
+                await task.result().close()
+        self._clients.clear()
+        self._refreshers.clear()
+
+    def close(self):
+        """Closes every client session and stops the loop thread."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), loop).result(timeout=10)
+        except Exception as e:
+            logger.warning("Closing exchange clients failed", extra={"error": str(e)})
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+exchange_pool = ExchangePool()
+
+
+def shutdown_exchange_pool():
+    """Closes the shared exchange clients. Called on application shutdown."""
+    exchange_pool.close()
@@ -0,0 +1,100 @@
+import os
+import sys
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from tools import http_client
+from tools.price_store import CLOSE, DATE, FIELDS, PriceStore, empty_series, expects_bars, to_day
+from tools.provider_router import get_route
+
+FRANKFURTER_URL = "https://api.frankfurter.app/"  # ECB reference rates, no API key
+
+
+def _parse_frankfurter(currency: str, status_code: int, data: dict) -> Optional[np.ndarray]:
+    """Converts a Frankfurter time series into the price store's layout (open = high = low = close = rate)."""
+    if status_code != 200 or not isinstance(data, dict) or "rates" not in data:
+        return None
+    points = sorted((to_day(date.fromisoformat(day)), rates[currency])
+                    for day, rates in data["rates"].items() if currency in rates)
+    if not points:
+        return empty_series()
+    days, rates = np.array(points, dtype=np.float64).T
+    return np.vstack([days, rates, rates, rates, rates, np.zeros_like(rates)])
+
+
+class FXHistory:
+    """
+    Daily FX rates per currency, as units of that currency per FX_BASE_CURRENCY.
+
+    Each currency is one series in a PriceStore under FX_HISTORY_DIR, so history
+    is fetched once and then only extended by the missing days. Cross rates
+    between two non-base currencies are derived from the two stored series.
+    """
+
+    def __init__(self, store: PriceStore = None, base: str = None):
+        self.store = store or PriceStore(root=config.FX_HISTORY_DIR)
+        self.base = (base or config.FX_BASE_CURRENCY).upper()
+
+    def _fetch_frankfurter(self, currency: str, start: date, end: date) -> Optional[np.ndarray]:
+        url = f"{FRANKFURTER_URL}{start.isoformat()}..{end.isoformat()}"
+        response = http_client.get(url, "currency_exchange_tool", params={"from": self.base, "to": currency})
+        bars = _parse_frankfurter(currency, response.status_code, response.json())
+        if bars is not None and bars.shape[1] == 0 and expects_bars(start, end):
+            return None  # e.g. a currency Frankfurter does not publish; let the next provider try
+        return bars
+
+    def _fetch_yahoo(self, currency: str, start: date, end: date) -> Optional[np.ndarray]:
+        from tools.stock_market_tool import HistoricalStockMarketTool
+
+        return HistoricalStockMarketTool()._fetch_yahoo_finance_range(f"{self.base}{currency}=X", start, end)
+
+    def _fetch(self, key: str, start: date, end: date) -> Optional[np.ndarray]:
+        currency = key[len(self.base):]
+        return get_route("fx_history").call([
+            ("frankfurter", lambda: self._fetch_frankfurter(currency, start, end)),
+            ("yahoo", lambda: self._fetch_yahoo(currency, start, end)),
+        ], is_success=lambda bars: bars is not None)
+
+    def series(self, currency: str, start: date, end: date) -> np.ndarray:
+        """Stored (and, for missing days, fetched) rates of `currency` per base currency in [start, end]."""
+        currency = currency.strip().upper()
+        return self.store.get_range(f"{self.base}{currency}", start, end, self._fetch)
+
+    def rates(self, from_currency: str, to_currency: str, start: date, end: date) -> Tuple[np.ndarray, np.ndarray]:
+        """(days, rates) converting `from_currency` into `to_currency`, on the dates both legs have a rate."""
+        from_currency, to_currency = from_currency.strip().upper(), to_currency.strip().upper()
+        if from_currency == to_currency:
+            days = np.arange(to_day(start), to_day(end) + 1, dtype=np.float64)
+            return days, np.ones_like(days)
+        if from_currency == self.base:
+            quote = self.series(to_currency, start, end)
+            return quote[DATE], quote[CLOSE]
+        base = self.series(from_currency, start, end)
+        if to_currency == self.base:
+            return base[DATE], 1.0 / base[CLOSE]
+        quote = self.series(to_currency, start, end)
+        days, base_index, quote_index = np.intersect1d(base[DATE], quote[DATE], assume_unique=True, return_indices=True)
+        return days, quote[CLOSE][quote_index] / base[CLOSE][base_index]
+
+
+def align_rates(days: np.ndarray, fx_days: np.ndarray, fx_rates: np.ndarray) -> np.ndarray:
+    """As-of join: for each of `days`, the latest rate on or before it (NaN if there is none)."""
+    index = np.searchsorted(fx_days, days, side="right") - 1
+    aligned = np.asarray(fx_rates, dtype=np.float64)[np.maximum(index, 0)] if len(fx_rates) else np.full(len(days), np.nan)
+    return np.where(index >= 0, aligned, np.nan)
+
+
+def convert_series(series: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    """Re-denominates the open/high/low/close rows of a price store series; volume is unchanged."""
+    converted = np.array(series, dtype=np.float64)
+    converted[FIELDS.index("open"):CLOSE + 1] *= rates
+    return converted
+
+
+fx_history = FXHistory()
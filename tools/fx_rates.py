@@ -0,0 +1,122 @@
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from tools import http_client
+from tools.provider_router import get_route
+from tools.quote_cache import QuoteCache
+
+EXCHANGE_RATE_API_URL = "https://v6.exchangerate-api.com/v6/"  # ExchangeRate-API
+ECB_URL = "https://api.exchangeratesapi.io/latest"  # ECB API fallback (EUR-based)
+
+
+class RateTable:
+    """
+    One provider snapshot: units of each currency per unit of `base`, in a
+    float64 array indexed by currency code. Any pair is derived locally as the
+    cross rate rates[to] / rates[from].
+    """
+
+    def __init__(self, base: str, rates: Dict[str, float], source: str):
+        rates = {code.upper(): float(rate) for code, rate in rates.items()
+                 if isinstance(rate, (int, float)) and np.isfinite(rate) and rate > 0}
+        rates[base.upper()] = 1.0
+        self.base = base.upper()
+        self.source = source
+        self.as_of = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.codes = sorted(rates)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        # Trailing NaN: unknown codes map to index -1 and come out as NaN.
+        self.values = np.array([rates[code] for code in self.codes] + [np.nan])
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _positions(self, codes: Iterable[str]) -> np.ndarray:
+        return np.array([self.index.get(code.strip().upper(), -1) for code in codes], dtype=np.intp)
+
+    def cross(self, from_codes: Iterable[str], to_codes: Iterable[str]) -> np.ndarray:
+        """Element-wise rates from `from_codes` to `to_codes` (NaN where either code is unknown)."""
+        return self.values[self._positions(to_codes)] / self.values[self._positions(from_codes)]
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        rate = self.cross([from_currency], [to_currency])[0]
+        return None if np.isnan(rate) else float(rate)
+
+    def unknown(self, codes: Iterable[str]) -> list:
+        return sorted({code.strip().upper() for code in codes} - set(self.index))
+
+
+# --- Providers ---
+def _parse_primary_table(base: str, status_code: int, data: Dict) -> Optional[RateTable]:
+    if status_code == 200 and isinstance(data, dict) and data.get("conversion_rates"):
+        return RateTable(data.get("base_code", base), data["conversion_rates"], "exchangerate_api")
+    return None
+
+
+def _parse_ecb_table(data: Dict) -> Optional[RateTable]:
+    if isinstance(data, dict) and data.get("rates"):
+        return RateTable(data.get("base", "EUR"), data["rates"], "ecb")
+    return None
+
+
+def fetch_primary_table(base: str) -> Optional[RateTable]:
+    response = http_client.get(f"{EXCHANGE_RATE_API_URL}{config.EXCHANGE_RATE_API_KEY}/latest/{base}", "currency_exchange_tool")
+    return _parse_primary_table(base, response.status_code, response.json())
+
+
+def fetch_ecb_table() -> Optional[RateTable]:
+    return _parse_ecb_table(http_client.get(ECB_URL, "currency_exchange_tool").json())
+
+
+async def afetch_primary_table(base: str) -> Optional[RateTable]:
+    response = await http_client.aget(f"{EXCHANGE_RATE_API_URL}{config.EXCHANGE_RATE_API_KEY}/latest/{base}", "currency_exchange_tool")
+    return _parse_primary_table(base, response.status_code, response.json())
+
+
+async def afetch_ecb_table() -> Optional[RateTable]:
+    return _parse_ecb_table((await http_client.aget(ECB_URL, "currency_exchange_tool")).json())
+
+
+class FXRates:
+    """
+    Latest rate table for FX_BASE_CURRENCY, shared by every currency tool.
+    The table is downloaded once per FX_RATE_TTL_SECONDS (served stale while
+    refreshing in the background) through the "fx_rate" provider route, so
+    conversions between any two listed currencies need no request.
+    """
+
+    def __init__(self, base: str = None):
+        self.base = (base or config.FX_BASE_CURRENCY).upper()
+        self._cache = QuoteCache("fx_rates", config.FX_RATE_TTL_SECONDS, config.FX_RATE_STALE_SECONDS, max_entries=4)
+
+    def _fetch(self) -> Optional[RateTable]:
+        return get_route("fx_rate").call([
+            ("exchangerate_api", lambda: fetch_primary_table(self.base)),
+            ("ecb", fetch_ecb_table),
+        ])
+
+    async def _afetch(self) -> Optional[RateTable]:
+        return await get_route("fx_rate").acall([
+            ("exchangerate_api", lambda: afetch_primary_table(self.base)),
+            ("ecb", afetch_ecb_table),
+        ])
+
+    def table(self) -> Optional[RateTable]:
+        return self._cache.get(self.base, self._fetch)
+
+    async def atable(self) -> Optional[RateTable]:
+        return await self._cache.aget(self.base, self._afetch)
+
+    def clear(self):
+        self._cache.clear()
+
+
+fx_rates = FXRates()
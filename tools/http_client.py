@@ -0,0 +1,148 @@
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from typing import Optional
+
+import httpx
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+
+logger = get_logger("http_client")
+
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+_lock = threading.Lock()
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def timeout_for(tool: Optional[str]) -> httpx.Timeout:
+    """Connect/read timeouts for `tool` from HTTP_TIMEOUTS (falling back to "default")."""
+    connect, read = config.HTTP_TIMEOUTS.get(tool) or config.HTTP_TIMEOUTS["default"]
+    return httpx.Timeout(read, connect=connect)
+
+
+def get_client() -> httpx.Client:
+    """Process-wide sync client; connection pools are per host and kept alive between calls."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(limits=_limits(), timeout=timeout_for(None), follow_redirects=True)
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Async client for the running event loop (an AsyncClient's connections cannot cross loops)."""
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(limits=_limits(), timeout=timeout_for(None), follow_redirects=True)
+            _async_clients[loop] = client
+    return client
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when it is short enough."""
+    cap = config.HTTP_RETRY_MAX_BACKOFF
+    if response is not None:
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit() and int(retry_after) <= cap:
+            return float(retry_after)
+    return random.uniform(0, min(cap, config.HTTP_RETRY_BACKOFF * 2 ** attempt))
+
+
+def _should_retry(method: str, attempt: int, response: Optional[httpx.Response]) -> bool:
+    if method.upper() not in RETRY_METHODS or attempt >= config.HTTP_RETRIES:
+        return False
+    return response is None or response.status_code in RETRY_STATUSES
+
+
+def request(method: str, url: str, tool: str = None, **kwargs) -> httpx.Response:
+    """
+    Sends a request on the shared client with `tool`'s timeouts. Idempotent
+    methods are retried with jittered backoff on transport errors and on
+    429/502/503/504; the last response (or error) is returned (or raised).
+    """
+    kwargs.setdefault("timeout", timeout_for(tool))
+    attempt = 0
+    while True:
+        try:
+            response = get_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(method, attempt, None):
+                raise
+            logger.debug("Retrying request", extra={"tool": tool, "url": url.split("?")[0], "error": repr(e), "attempt": attempt + 1})
+            time.sleep(_retry_delay(attempt, None))
+        else:
+            if not _should_retry(method, attempt, response):
+                return response
+            logger.debug("Retrying request", extra={"tool": tool, "url": url.split("?")[0], "status": response.status_code, "attempt": attempt + 1})
+            time.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+async def arequest(method: str, url: str, tool: str = None, **kwargs) -> httpx.Response:
+    """Async variant of `request`."""
+    kwargs.setdefault("timeout", timeout_for(tool))
+    attempt = 0
+    while True:
+        try:
+            response = await get_async_client().request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            if not _should_retry(method, attempt, None):
+                raise
+            logger.debug("Retrying request", extra={"tool": tool, "url": url.split("?")[0], "error": repr(e), "attempt": attempt + 1})
+            await asyncio.sleep(_retry_delay(attempt, None))
+        else:
+            if not _should_retry(method, attempt, response):
+                return response
+            logger.debug("Retrying request", extra={"tool": tool, "url": url.split("?")[0], "status": response.status_code, "attempt": attempt + 1})
+            await asyncio.sleep(_retry_delay(attempt, response))
+        attempt += 1
+
+
+def get(url: str, tool: str = None, **kwargs) -> httpx.Response:
+    return request("GET", url, tool, **kwargs)
+
+
+def post(url: str, tool: str = None, **kwargs) -> httpx.Response:
+    return request("POST", url, tool, **kwargs)
+
+
+async def aget(url: str, tool: str = None, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, tool, **kwargs)
+
+
+async def apost(url: str, tool: str = None, **kwargs) -> httpx.Response:
+    return await arequest("POST", url, tool, **kwargs)
+
+
+async def close_http_clients():
+    """Closes the sync client and the running loop's async client. Called on application shutdown."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+        async_client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
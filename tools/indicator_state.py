@@ -0,0 +1,271 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+
+
+class SMAState:
+    """Rolling mean over the last `window` values: a ring buffer plus a running sum."""
+
+    def __init__(self, window: int, values: Iterable[float] = (), total: float = 0.0):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.total = total
+
+    def update(self, x: float) -> Optional[float]:
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.window if len(self.values) == self.window else None
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "values": list(self.values), "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SMAState":
+        return cls(data["window"], data["values"], data["total"])
+
+
+class EMAState:
+    """EMA with alpha = 2 / (window + 1), seeded with the first value (same as indicators.ema)."""
+
+    def __init__(self, window: int, value: float = None, alpha: float = None):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self.value = value
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"window": self.window, "alpha": self.alpha, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EMAState":
+        return cls(data["window"], data["value"], data["alpha"])
+
+
+class WilderRSIState:
+    """Wilder RSI: average gain/loss seeded with the mean of the first `period` changes (same as indicators.rsi)."""
+
+    def __init__(self, period: int = 14, prev_close: float = None, avg_gain: float = 0.0, avg_loss: float = 0.0, count: int = 0):
+        self.period = period
+        self.prev_close = prev_close
+        self.avg_gain = avg_gain
+        self.avg_loss = avg_loss
+        self.count = count  # Price changes seen so far
+
+    def update(self, close: float) -> Optional[float]:
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            self.count += 1
+            if self.count <= self.period:
+                # Seed phase: accumulate a plain mean of the first `period` changes.
+                self.avg_gain += (gain - self.avg_gain) / self.count
+                self.avg_loss += (loss - self.avg_loss) / self.count
+            else:
+                self.avg_gain += (gain - self.avg_gain) / self.period
+                self.avg_loss += (loss - self.avg_loss) / self.period
+        self.prev_close = close
+        return self.value
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count < self.period:
+            return None
+        if self.avg_loss == 0.0:
+            return 50.0 if self.avg_gain == 0.0 else 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+    def to_dict(self) -> dict:
+        return {"period": self.period, "prev_close": self.prev_close, "avg_gain": self.avg_gain,
+                "avg_loss": self.avg_loss, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WilderRSIState":
+        return cls(**data)
+
+
+class MACDState:
+    """Fast/slow EMAs and the EMA signal line of their difference."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9, emas: dict = None):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        emas = emas or {}
+        self.fast_ema = EMAState.from_dict(emas["fast"]) if "fast" in emas else EMAState(fast)
+        self.slow_ema = EMAState.from_dict(emas["slow"]) if "slow" in emas else EMAState(slow)
+        self.signal_ema = EMAState.from_dict(emas["signal"]) if "signal" in emas else EMAState(signal)
+
+    def update(self, close: float) -> dict:
+        line = self.fast_ema.update(close) - self.slow_ema.update(close)
+        self.signal_ema.update(line)
+        return self.value
+
+    @property
+    def value(self) -> Optional[dict]:
+        if self.signal_ema.value is None:
+            return None
+        line = self.fast_ema.value - self.slow_ema.value
+        return {"macd_line": line, "signal_line": self.signal_ema.value, "histogram": line - self.signal_ema.value}
+
+    def to_dict(self) -> dict:
+        return {"fast": self.fast, "slow": self.slow, "signal": self.signal,
+                "emas": {"fast": self.fast_ema.to_dict(), "slow": self.slow_ema.to_dict(), "signal": self.signal_ema.to_dict()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MACDState":
+        return cls(**data)
+
+
+class IndicatorState:
+    """
+    Rolling indicator state for one ticker and one parameter set. Each bar is
+    applied in O(1); `last_day` (days since 1970-01-01) guards against applying
+    a bar twice.
+    """
+
+    def __init__(self, windows: Iterable[int] = (20,), rsi_period: int = 14, macd: Iterable[int] = (12, 26, 9)):
+        self.windows = tuple(sorted({int(w) for w in windows}))
+        self.rsi_period = rsi_period
+        self.macd_params = tuple(macd)
+        self.last_day = None
+        self.sma = {w: SMAState(w) for w in self.windows}
+        self.ema = {w: EMAState(w) for w in self.windows}
+        self.rsi = WilderRSIState(rsi_period)
+        self.macd = MACDState(*self.macd_params)
+
+    @staticmethod
+    def make_key(windows: Iterable[int], rsi_period: int = 14, macd: Iterable[int] = (12, 26, 9)) -> str:
+        windows = ",".join(str(w) for w in sorted({int(w) for w in windows}))
+        return f"w={windows};rsi={rsi_period};macd={','.join(str(p) for p in macd)}"
+
+    @property
+    def key(self) -> str:
+        return self.make_key(self.windows, self.rsi_period, self.macd_params)
+
+    def update(self, day: int, close: float) -> bool:
+        """Applies one bar; returns False if it is not newer than the last applied bar."""
+        day = int(day)
+        if self.last_day is not None and day <= self.last_day:
+            return False
+        close = float(close)
+        for state in self.sma.values():
+            state.update(close)
+        for state in self.ema.values():
+            state.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.last_day = day
+        return True
+
+    def update_many(self, days, closes) -> int:
+        return sum(self.update(day, close) for day, close in zip(days, closes))
+
+    def snapshot(self) -> Dict[str, object]:
+        """Latest indicator values, keyed like TrendAnalysisTool's output."""
+        values = {}
+        for w in self.windows:
+            values[f"SMA_{w}"] = self.sma[w].value
+            values[f"EMA_{w}"] = self.ema[w].value
+        values[f"RSI_{self.rsi_period}"] = self.rsi.value
+        values["MACD"] = self.macd.value
+        return values
+
+    def copy(self) -> "IndicatorState":
+        return IndicatorState.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {
+            "windows": list(self.windows),
+            "rsi_period": self.rsi_period,
+            "macd": list(self.macd_params),
+            "last_day": self.last_day,
+            "sma": [self.sma[w].to_dict() for w in self.windows],
+            "ema": [self.ema[w].to_dict() for w in self.windows],
+            "rsi_state": self.rsi.to_dict(),
+            "macd_state": self.macd.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls(data["windows"], data["rsi_period"], data["macd"])
+        state.last_day = data["last_day"]
+        state.sma = {s["window"]: SMAState.from_dict(s) for s in data["sma"]}
+        state.ema = {s["window"]: EMAState.from_dict(s) for s in data["ema"]}
+        state.rsi = WilderRSIState.from_dict(data["rsi_state"])
+        state.macd = MACDState.from_dict(data["macd_state"])
+        return state
+
+
+class IndicatorStateStore:
+    """
+    Per-ticker indicator states kept in memory and persisted as one JSON file
+    per ticker (all parameter sets), so they survive restarts.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or config.INDICATOR_STATE_DIR
+        self._lock = threading.Lock()
+        self._states = {}  # ticker -> {key: IndicatorState}
+        self._ticker_locks = {}
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Z0-9.\-^=]", "_", ticker.upper()) + ".json")
+
+    def lock(self, ticker: str) -> threading.Lock:
+        """Lock to hold while reading and advancing a ticker's states."""
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker.upper(), threading.Lock())
+
+    def _load_ticker(self, ticker: str) -> dict:
+        with self._lock:
+            states = self._states.get(ticker.upper())
+        if states is not None:
+            return states
+        try:
+            with open(self._path(ticker)) as f:
+                states = {key: IndicatorState.from_dict(data) for key, data in json.load(f).items()}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            states = {}
+        with self._lock:
+            return self._states.setdefault(ticker.upper(), states)
+
+    def get(self, ticker: str, windows: Iterable[int], rsi_period: int = 14, macd: Iterable[int] = (12, 26, 9)) -> IndicatorState:
+        """The ticker's state for this parameter set, created empty if missing."""
+        states = self._load_ticker(ticker)
+        key = IndicatorState.make_key(windows, rsi_period, macd)
+        if key not in states:
+            states[key] = IndicatorState(windows, rsi_period, macd)
+        return states[key]
+
+    def save(self, ticker: str):
+        states = self._load_ticker(ticker)
+        payload = json.dumps({key: state.to_dict() for key, state in states.items()})
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path(ticker))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+indicator_states = IndicatorStateStore()
@@ -0,0 +1,122 @@
+"""
+Vectorised technical indicators over contiguous float64 arrays.
+
+Every function accepts a 1-D series or a 2-D (rows x time) block and works
+along the last axis, so a whole universe of tickers is processed in one call.
+Outputs have the input's length; warm-up positions are NaN.
+"""
+from typing import Dict, Iterable, Union
+
+import numpy as np
+from scipy.signal import lfilter
+
+Windows = Union[int, Iterable[int]]
+
+
+def as_series(values) -> np.ndarray:
+    """float64 view of `values` (no copy for contiguous float64 input such as a price-store column)."""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _window_list(windows: Windows) -> list:
+    return [int(windows)] if np.isscalar(windows) else [int(w) for w in windows]
+
+
+def _smooth(values: np.ndarray, alpha: float, seed: np.ndarray) -> np.ndarray:
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t-1], with y[-1] = seed, as a single IIR filter pass."""
+    zi = ((1.0 - alpha) * seed)[..., np.newaxis]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values, axis=-1, zi=zi)
+    return smoothed
+
+
+def sma(values, windows: Windows = 20) -> Dict[int, np.ndarray]:
+    """Simple moving averages for every window, sharing one cumulative sum."""
+    x = as_series(values)
+    csum = np.cumsum(x, axis=-1)
+    csum = np.concatenate([np.zeros(x.shape[:-1] + (1,)), csum], axis=-1)
+    result = {}
+    for window in _window_list(windows):
+        out = np.full(x.shape, np.nan)
+        if 0 < window <= x.shape[-1]:
+            out[..., window - 1:] = (csum[..., window:] - csum[..., :-window]) / window
+        result[window] = out
+    return result
+
+
+def ema(values, windows: Windows = 20) -> Dict[int, np.ndarray]:
+    """Exponential moving averages (alpha = 2 / (window + 1)) seeded with the first value."""
+    x = as_series(values)
+    result = {}
+    for window in _window_list(windows):
+        if x.shape[-1] == 0:
+            result[window] = x.copy()
+            continue
+        result[window] = _smooth(x, 2.0 / (window + 1), x[..., 0])
+    return result
+
+
+def wilder(values, period: int) -> np.ndarray:
+    """Wilder's smoothing (RMA): seeded with the mean of the first `period` values, then alpha = 1 / period."""
+    x = as_series(values)
+    out = np.full(x.shape, np.nan)
+    if period <= 0 or x.shape[-1] < period:
+        return out
+    seed = x[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    out[..., period:] = _smooth(x[..., period:], 1.0 / period, seed)
+    return out
+
+
+def rsi(close, period: int = 14) -> np.ndarray:
+    """Wilder RSI. Position 0 has no change and is always NaN."""
+    x = as_series(close)
+    delta = np.diff(x, axis=-1)
+    avg_gain = wilder(np.clip(delta, 0.0, None), period)
+    avg_loss = wilder(np.clip(-delta, 0.0, None), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # No losses in the window: RSI is 100 (or undefined when flat, reported as 50).
+    values = np.where(avg_loss == 0.0, np.where(avg_gain == 0.0, 50.0, 100.0), values)
+    values = np.where(np.isnan(avg_gain), np.nan, values)
+    return np.concatenate([np.full(x.shape[:-1] + (1,), np.nan), values], axis=-1)
+
+
+def macd(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its EMA signal line and the histogram."""
+    emas = ema(close, (fast, slow))
+    line = emas[fast] - emas[slow]
+    signal_line = ema(line, signal)[signal]
+    return {"macd_line": line, "signal_line": signal_line, "histogram": line - signal_line}
+
+
+def bollinger(close, window: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger bands: SMA +/- `num_std` population standard deviations over `window`."""
+    x = as_series(close)
+    middle = sma(x, window)[window]
+    std = np.full(x.shape, np.nan)
+    if 0 < window <= x.shape[-1]:
+        std[..., window - 1:] = np.lib.stride_tricks.sliding_window_view(x, window, axis=-1).std(axis=-1)
+    return {"middle": middle, "upper": middle + num_std * std, "lower": middle - num_std * std}
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = as_series(high), as_series(low), as_series(close)
+    tr = high - low
+    if tr.shape[-1] > 1:
+        previous = close[..., :-1]
+        tr[..., 1:] = np.maximum.reduce([tr[..., 1:], np.abs(high[..., 1:] - previous), np.abs(low[..., 1:] - previous)])
+    return tr
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing."""
+    return wilder(true_range(high, low, close), period)
+
+
+def valid_tail(values: np.ndarray, decimals: int = 4) -> list:
+    """Drops the NaN warm-up of a 1-D indicator and returns the rest as a rounded list."""
+    values = np.asarray(values)
+    valid = np.flatnonzero(~np.isnan(values))
+    if valid.size == 0:
+        return []
+    return np.round(values[valid[0]:], decimals).tolist()
@@ -0,0 +1,76 @@
+import threading
+import time
+from langchain_core.tools import BaseTool
+from langchain_core.tools.base import create_schema_from_function
+from typing import Any, Optional, Type
+from tools.async_utils import run_blocking
+from metrics import TOOL_INIT_SECONDS, is_error_result, record_tool_call
+from logger import get_logger
+
+logger = get_logger("lazy_tool")
+
+
+class LazyTool(BaseTool):
+    """
+    Proxy that exposes a tool's name, description and args schema right away and
+    only instantiates the backing tool (FinBERT pipeline, ccxt exchange, pint
+    registry, ...) on its first invocation.
+    """
+
+    tool_class: Type[BaseTool]
+
+    def __init__(self, tool_class: Type[BaseTool], **kwargs):
+        fields = tool_class.model_fields
+        name = fields["name"].default
+        args_schema = fields["args_schema"].default if "args_schema" in fields else None
+        if args_schema is None:
+            # Same schema BaseTool would infer from the backing tool's `_run` signature.
+            args_schema = create_schema_from_function(name, tool_class._run)
+        super().__init__(
+            name=name,
+            description=fields["description"].default,
+            args_schema=args_schema,
+            tool_class=tool_class,
+            **kwargs,
+        )
+        object.__setattr__(self, "backing_tool", None)
+        object.__setattr__(self, "init_lock", threading.Lock())
+        object.__setattr__(self, "init_seconds", None)
+
+    @property
+    def is_initialized(self) -> bool:
+        return self.backing_tool is not None
+
+    def get_tool(self) -> BaseTool:
+        """Returns the backing tool, building it exactly once across threads."""
+        if self.backing_tool is None:
+            with self.init_lock:
+                if self.backing_tool is None:
+                    start = time.perf_counter()
+                    tool = self.tool_class()
+                    object.__setattr__(self, "init_seconds", time.perf_counter() - start)
+                    object.__setattr__(self, "backing_tool", tool)
+                    TOOL_INIT_SECONDS.labels(self.name).set(self.init_seconds)
+                    logger.info("Initialized tool on first use", extra={"tool": self.name, "init_seconds": round(self.init_seconds, 3)})
+        return self.backing_tool
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self.get_tool()._run(*args, **kwargs)
+            return result
+        finally:
+            # An exception leaves `result` as None, which also counts as an error.
+            record_tool_call(self.name, time.perf_counter() - start, result is None or is_error_result(result))
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        result = None
+        try:
+            # Heavy constructors (model downloads, market metadata) must not run on the event loop.
+            tool: Optional[BaseTool] = self.backing_tool or await run_blocking(self.get_tool)
+            result = await tool._arun(*args, **kwargs)
+            return result
+        finally:
+            record_tool_call(self.name, time.perf_counter() - start, result is None or is_error_result(result))
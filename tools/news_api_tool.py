@@ -1,9 +1,9 @@
-import requests
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Type, Any, Dict, List
 from datetime import datetime, timedelta
 import config
+from tools import http_client
 
 class NewsAPIInput(BaseModel):
     query: str = Field(default="stocks", description="Keywords to search for (e.g., Tesla, Bitcoin).")
@@ -19,12 +19,12 @@ class NewsAPITool(BaseTool):
     
     BASE_URL: str = "https://newsapi.org/v2/everything"
     
-    def _fetch_news(self, query: str, language: str, from_date: str, sort_by: str, max_results: int) -> List[Dict[str, Any]]:
-        """Fetch financial news related to a given query."""
+    def _build_params(self, query: str, language: str, from_date: str, sort_by: str) -> Dict[str, Any]:
+        """Builds the NewsAPI query parameters."""
         if from_date is None:
             from_date = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-        params = {
+        return {
             "q": query,
             "language": language,
             "from": from_date,
@@ -32,22 +32,38 @@ class NewsAPITool(BaseTool):
             "apiKey": self.api_key
         }
 
+    def _parse_news(self, data: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+        """Converts a NewsAPI response into a list of articles."""
+        if data.get("status") != "ok":
+            return [{"error": f"News API error: {data.get('message', 'Unknown error')}"}]
+
+        articles = data.get("articles", [])[:max_results]
+        return [
+            {
+                "title": article["title"],
+                "source": article["source"]["name"],
+                "published_at": article["publishedAt"],
+                "url": article["url"]
+            } for article in articles
+        ]
+    
+    def _fetch_news(self, query: str, language: str, from_date: str, sort_by: str, max_results: int) -> List[Dict[str, Any]]:
+        """Fetch financial news related to a given query."""
+        params = self._build_params(query, language, from_date, sort_by)
+
         try:
-            response = requests.get(self.BASE_URL, params=params)
-            data = response.json()
+            response = http_client.get(self.BASE_URL, "news_api_tool", params=params)
+            return self._parse_news(response.json(), max_results)
+        except Exception as e:
+            return [{"error": f"Failed to retrieve news: {str(e)}"}]
 
-            if data.get("status") != "ok":
-                return [{"error": f"News API error: {data.get('message', 'Unknown error')}"}]
+    async def _afetch_news(self, query: str, language: str, from_date: str, sort_by: str, max_results: int) -> List[Dict[str, Any]]:
+        """Fetch financial news related to a given query without blocking the event loop."""
+        params = self._build_params(query, language, from_date, sort_by)
 
-            articles = data.get("articles", [])[:max_results]
-            return [
-                {
-                    "title": article["title"],
-                    "source": article["source"]["name"],
-                    "published_at": article["publishedAt"],
-                    "url": article["url"]
-                } for article in articles
-            ]
+        try:
+            response = await http_client.aget(self.BASE_URL, "news_api_tool", params=params)
+            return self._parse_news(response.json(), max_results)
         except Exception as e:
             return [{"error": f"Failed to retrieve news: {str(e)}"}]
     
@@ -57,7 +73,7 @@ class NewsAPITool(BaseTool):
     
     async def _arun(self, query: str = "stocks", language: str = "en", from_date: str = None, sort_by: str = "publishedAt", max_results: int = 5) -> List[Dict[str, Any]]:
         """Asynchronous method to fetch news."""
-        return self._fetch_news(query, language, from_date, sort_by, max_results)
+        return await self._afetch_news(query, language, from_date, sort_by, max_results)
 
 class StockNewsTool(BaseTool):
     name: str = "stock_news"
@@ -0,0 +1,236 @@
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+from metrics import CACHE_REQUESTS
+
+logger = get_logger("price_store")
+
+# Row layout of a stored series: shape (len(FIELDS), n), C-order, so every field
+# is one contiguous column and `series[CLOSE]` is a zero-copy view.
+FIELDS = ("date", "open", "high", "low", "close", "volume")
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+
+_EPOCH = date(1970, 1, 1)
+
+
+def to_day(value: date) -> int:
+    """Days since 1970-01-01 (the store's date encoding)."""
+    return (value - _EPOCH).days
+
+
+def from_day(day) -> date:
+    return _EPOCH + timedelta(days=int(day))
+
+
+def empty_series() -> np.ndarray:
+    return np.empty((len(FIELDS), 0), dtype=np.float64)
+
+
+def expects_bars(start: date, end: date) -> bool:
+    """
+    Whether [start, end] spans at least two weekdays before today. A provider
+    returning no bars for such a range failed (or does not know the ticker);
+    a single empty weekday may just be a holiday.
+    """
+    return np.busday_count(start, min(end + timedelta(days=1), date.today())) >= 2
+
+
+def series_to_records(series: np.ndarray) -> list:
+    """Converts a stored series into the tools' list-of-dicts format (oldest first)."""
+    columns = series.tolist()
+    return [
+        {
+            "date": from_day(row[DATE]).isoformat(),
+            "open": row[OPEN],
+            "high": row[HIGH],
+            "low": row[LOW],
+            "close": row[CLOSE],
+            "volume": row[VOLUME],
+        }
+        for row in zip(*columns)
+    ]
+
+
+class PriceStore:
+    """
+    Local columnar store of daily OHLCV bars, one `.npy` file per ticker.
+
+    - Reads map the file read-only (`mmap_mode="r"`), so slices are zero-copy
+      and several uvicorn workers share the same pages through the OS cache.
+    - A JSON sidecar records the calendar range already fetched; only the
+      missing part of a requested range is fetched and merged in.
+    - Writes go to a temporary file that atomically replaces the old one, under
+      a per-ticker file lock, so readers never see a partial file and workers
+      don't fetch the same gap twice.
+    - Today's bar is never marked as covered, so it is refreshed on the next read.
+    """
+
+    def __init__(self, root: str = None, max_open: int = None):
+        self.root = root or config.PRICE_STORE_DIR
+        self.max_open = max_open or config.PRICE_STORE_MAX_OPEN
+        self._lock = threading.Lock()
+        self._maps = OrderedDict()  # path -> (mtime_ns, size, memmap)
+        self._ticker_locks = {}
+
+    # --- Paths ---
+    def _path(self, ticker: str, suffix: str) -> str:
+        name = re.sub(r"[^A-Z0-9.\-^=]", "_", ticker.upper())
+        return os.path.join(self.root, f"{name}{suffix}")
+
+    # --- Reading ---
+    def _load(self, ticker: str) -> np.ndarray:
+        """Returns the ticker's full series as a read-only memmap (cached until the file is replaced)."""
+        path = self._path(ticker, ".npy")
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return empty_series()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[:2] == signature:
+                self._maps.move_to_end(path)
+                return cached[2]
+        series = np.load(path, mmap_mode="r")
+        with self._lock:
+            self._maps[path] = (*signature, series)
+            self._maps.move_to_end(path)
+            while len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        return series
+
+    def _coverage(self, ticker: str) -> Optional[tuple]:
+        """(first_day, last_day) already fetched, or None."""
+        try:
+            with open(self._path(ticker, ".json")) as f:
+                meta = json.load(f)
+            return meta["start"], meta["end"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def read(self, ticker: str, start: date, end: date) -> np.ndarray:
+        """Stored bars with start <= date <= end, as a view into the memmap."""
+        series = self._load(ticker)
+        dates = series[DATE]
+        lo = np.searchsorted(dates, to_day(start), side="left")
+        hi = np.searchsorted(dates, to_day(end), side="right")
+        return series[:, lo:hi]
+
+    # --- Writing ---
+    @contextmanager
+    def _writer(self, ticker: str):
+        """Serialises writers for one ticker across threads and processes."""
+        with self._lock:
+            thread_lock = self._ticker_locks.setdefault(ticker.upper(), threading.Lock())
+        with thread_lock:
+            os.makedirs(self.root, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(self._path(ticker, ".lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _replace(self, path: str, write: Callable):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _write(self, ticker: str, series: np.ndarray, coverage: tuple):
+        self._replace(self._path(ticker, ".npy"), lambda f: np.save(f, np.ascontiguousarray(series, dtype=np.float64)))
+        meta = json.dumps({"start": coverage[0], "end": coverage[1]}).encode()
+        self._replace(self._path(ticker, ".json"), lambda f: f.write(meta))
+
+    @staticmethod
+    def _merge(existing: np.ndarray, fetched: np.ndarray) -> np.ndarray:
+        """Union of two series by date; fetched bars win over stored ones for the same day."""
+        combined = np.concatenate([np.asarray(fetched), np.asarray(existing)], axis=1)
+        # np.unique keeps the first occurrence, i.e. the freshly fetched bar.
+        _, index = np.unique(combined[DATE], return_index=True)
+        return combined[:, index]
+
+    @staticmethod
+    def _gaps(coverage: Optional[tuple], start: int, end: int) -> list:
+        """Day ranges of [start, end] not yet fetched, extending coverage contiguously."""
+        if coverage is None:
+            return [(start, end)]
+        covered_start, covered_end = coverage
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start - 1))
+        if end > covered_end:
+            gaps.append((covered_end + 1, end))
+        return gaps
+
+    def get_range(self, ticker: str, start: date, end: date, fetch: Callable[[str, date, date], Optional[np.ndarray]],
+                  refresh_today: bool = True) -> np.ndarray:
+        """
+        Returns bars for [start, end], calling `fetch(ticker, gap_start, gap_end)`
+        only for the days not yet stored. `fetch` returns a (len(FIELDS), n)
+        array or None on provider failure; no bars for a gap with trading days
+        (see `expects_bars`) also counts as a failure. With `refresh_today=False`, a store
+        covered through yesterday is served as-is (today's bar only if already stored).
+        """
+        start_day, end_day = to_day(start), to_day(end)
+        if not refresh_today:
+            end_day = min(end_day, to_day(date.today()) - 1)
+        if not self._gaps(self._coverage(ticker), start_day, end_day):
+            CACHE_REQUESTS.labels("price_store", "hit").inc()
+            return self.read(ticker, start, end)
+
+        with self._writer(ticker):
+            # Another worker may have filled the gap while we waited for the lock.
+            coverage = self._coverage(ticker)
+            gaps = self._gaps(coverage, start_day, end_day)
+            if gaps:
+                CACHE_REQUESTS.labels("price_store", "miss" if coverage is None else "partial").inc()
+                series = self._load(ticker)
+                fetched = []
+                for gap_start, gap_end in gaps:
+                    bars = fetch(ticker, from_day(gap_start), from_day(gap_end))
+                    if bars is None or (bars.shape[1] == 0 and expects_bars(from_day(gap_start), from_day(gap_end))):
+                        # Provider failure: serve what is stored without recording coverage.
+                        return self.read(ticker, start, end)
+                    fetched.append(bars)
+                merged = self._merge(series, np.concatenate(fetched, axis=1))
+                covered_end = min(end_day, to_day(date.today()) - 1)
+                if coverage is not None:
+                    covered_end = max(covered_end, coverage[1])
+                    start_day = min(start_day, coverage[0])
+                self._write(ticker, merged, (start_day, covered_end))
+                logger.info("Price store updated", extra={"ticker": ticker, "fetched_bars": sum(b.shape[1] for b in fetched),
+                                                          "stored_bars": merged.shape[1], "gaps": len(gaps)})
+            else:
+                CACHE_REQUESTS.labels("price_store", "hit").inc()
+        return self.read(ticker, start, end)
+
+
+price_store = PriceStore()
@@ -0,0 +1,311 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+from metrics import PROVIDER_BREAKER_STATE, PROVIDER_CALLS, PROVIDER_DECISIONS, PROVIDER_LATENCY
+
+logger = get_logger("provider_router")
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+_STATE_NAMES = {CLOSED: "closed", HALF_OPEN: "half_open", OPEN: "open"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Separate from the shared tool executor: sync tools already run there and must not wait on it.
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.PROVIDER_ROUTER_WORKERS, thread_name_prefix="provider")
+    return _executor
+
+
+class ProviderHealth:
+    """Rolling latency/error window and circuit breaker for one provider on one route."""
+
+    def __init__(self, route: str, provider: str):
+        self.route, self.provider = route, provider
+        self.calls = deque(maxlen=config.PROVIDER_WINDOW_SIZE)  # (ok, seconds)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+        PROVIDER_BREAKER_STATE.labels(route, provider).set(CLOSED)
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            logger.warning("Circuit breaker changed", extra={"route": self.route, "provider": self.provider,
+                                                             "state": _STATE_NAMES[state]})
+        self.state = state
+        PROVIDER_BREAKER_STATE.labels(self.route, self.provider).set(state)
+
+    def available(self) -> bool:
+        """Whether a call may go to this provider now. Read-only: the half-open probe is only claimed by `claim`."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= config.PROVIDER_BREAKER_OPEN_SECONDS
+        return not self.probing
+
+    def claim(self) -> Optional[str]:
+        """
+        Checks and claims a call in one step (the caller holds the route lock):
+        None if the breaker refuses it, "probe" if it is the half-open probe (an
+        expired open breaker turns half-open), otherwise "call". A provider that
+        looked available when routes were ordered may have been claimed since.
+        """
+        if not self.available():
+            return None
+        if self.state == OPEN:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            self.probing = True
+            return "probe"
+        return "call"
+
+    def record(self, ok: bool, seconds: float):
+        self.calls.append((ok, seconds))
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        if self.state == HALF_OPEN:
+            self.probing = False
+            if ok:
+                self.calls.clear()
+                self._set_state(CLOSED)
+            else:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+        elif self.state == CLOSED and not ok and self._should_trip():
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def _should_trip(self) -> bool:
+        if self.consecutive_failures >= config.PROVIDER_BREAKER_CONSECUTIVE_FAILURES:
+            return True
+        if len(self.calls) < config.PROVIDER_BREAKER_MIN_CALLS:
+            return False
+        return self.error_rate() >= config.PROVIDER_BREAKER_ERROR_RATE
+
+    def error_rate(self) -> float:
+        return sum(1 for ok, _ in self.calls if not ok) / len(self.calls) if self.calls else 0.0
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for this provider before hedging: its latency percentile over recent successes."""
+        latencies = sorted(seconds for ok, seconds in self.calls if ok)
+        if len(latencies) < config.PROVIDER_HEDGE_MIN_SAMPLES:
+            delay = config.PROVIDER_HEDGE_DEFAULT_SECONDS
+        else:
+            delay = latencies[min(len(latencies) - 1, int(len(latencies) * config.PROVIDER_HEDGE_PERCENTILE / 100))]
+        return min(max(delay, config.PROVIDER_HEDGE_MIN_SECONDS), config.PROVIDER_TIMEOUT_SECONDS)
+
+    def snapshot(self) -> dict:
+        return {"state": _STATE_NAMES[self.state], "calls": len(self.calls), "error_rate": round(self.error_rate(), 3),
+                "hedge_delay": round(self.hedge_delay(), 3)}
+
+
+class ProviderRoute:
+    """
+    Calls an ordered list of providers for one kind of data (e.g. stock quotes):
+
+    - the first provider whose circuit breaker admits calls goes first;
+    - if it fails, the next one is called right away (fallback);
+    - if it is still running after its latency percentile, the next one is
+      started alongside it (hedge) and the first successful result wins;
+    - the whole call is bounded by PROVIDER_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._health = {}
+
+    def health(self, provider: str) -> ProviderHealth:
+        with self._lock:
+            return self._health_unlocked(provider)
+
+    def _order(self, providers: Sequence[Tuple[str, Any]]) -> Tuple[List[Tuple[str, Any]], bool]:
+        """(providers to try, whether their breakers still have to admit each call when it starts)."""
+        allowed = []
+        with self._lock:
+            for name, fn in providers:
+                if self._health_unlocked(name).available():
+                    allowed.append((name, fn))
+                else:
+                    PROVIDER_DECISIONS.labels(self.name, name, "skip").inc()
+        # Every breaker open: still try them in order rather than fail without asking anyone.
+        return (allowed, True) if allowed else (list(providers), False)
+
+    def _health_unlocked(self, provider: str) -> ProviderHealth:
+        if provider not in self._health:
+            self._health[provider] = ProviderHealth(self.name, provider)
+        return self._health[provider]
+
+    def _record(self, provider: str, ok: bool, seconds: float):
+        PROVIDER_CALLS.labels(self.name, provider, "success" if ok else "error").inc()
+        PROVIDER_LATENCY.labels(self.name, provider).observe(seconds)
+        with self._lock:
+            self._health_unlocked(provider).record(ok, seconds)
+
+    def _start(self, provider: str, gated: bool) -> Optional[str]:
+        """
+        Claims the call when it actually runs, so providers that were ordered but
+        never launched keep their probe slot; None if another caller got there first.
+        Ungated calls (every breaker was open) run without claiming.
+        """
+        if not gated:
+            return "call"
+        with self._lock:
+            claim = self._health_unlocked(provider).claim()
+        if claim is None:
+            PROVIDER_DECISIONS.labels(self.name, provider, "skip").inc()
+        return claim
+
+    def _timed(self, provider: str, fn: Callable[[], Any], is_success: Callable[[Any], bool], gated: bool = True):
+        if self._start(provider, gated) is None:
+            return False, None
+        start = time.perf_counter()
+        try:
+            value = fn()
+            ok = is_success(value)
+        except Exception:
+            value, ok = None, False
+        self._record(provider, ok, time.perf_counter() - start)
+        return ok, value
+
+    async def _atimed(self, provider: str, fn: Callable[[], Awaitable[Any]], is_success: Callable[[Any], bool], gated: bool = True):
+        claim = self._start(provider, gated)
+        if claim is None:
+            return False, None
+        start = time.perf_counter()
+        try:
+            value = await fn()
+            ok = is_success(value)
+        except asyncio.CancelledError:
+            # A cancelled loser neither failed nor succeeded; only a cancelled probe gives back its slot.
+            if claim == "probe":
+                with self._lock:
+                    self._health_unlocked(provider).probing = False
+            raise
+        except Exception:
+            value, ok = None, False
+        self._record(provider, ok, time.perf_counter() - start)
+        return ok, value
+
+    def _next_wait(self, provider: str, remaining: float, can_hedge: bool) -> float:
+        if not can_hedge:
+            return remaining
+        with self._lock:
+            return min(self._health_unlocked(provider).hedge_delay(), remaining)
+
+    def call(self, providers: Sequence[Tuple[str, Callable[[], Any]]], is_success: Callable[[Any], bool] = bool, default: Any = None) -> Any:
+        """Sync routing; `providers` is [(name, zero-arg callable)] in preference order."""
+        order, gated = self._order(providers)
+        deadline = time.monotonic() + config.PROVIDER_TIMEOUT_SECONDS
+        pending = {}
+        result = default
+        index = 0
+
+        def launch(decision: str = None):
+            nonlocal index
+            name, fn = order[index]
+            index += 1
+            if decision:
+                PROVIDER_DECISIONS.labels(self.name, name, decision).inc()
+            pending[_get_executor().submit(self._timed, name, fn, is_success, gated)] = name
+
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            last_launched = order[index - 1][0]
+            done, _ = wait(pending, timeout=self._next_wait(last_launched, remaining, index < len(order)), return_when=FIRST_COMPLETED)
+            if not done:
+                if index < len(order):
+                    launch("hedge")
+                continue
+            for future in done:
+                name = pending.pop(future)
+                ok, value = future.result()
+                if ok:
+                    PROVIDER_DECISIONS.labels(self.name, name, "win").inc()
+                    return value
+                if value is not None:
+                    result = value
+            if not pending and index < len(order):
+                launch("fallback")
+        # Slow losers keep running in the background; their outcome still feeds the health stats.
+        return result
+
+    async def acall(self, providers: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]], is_success: Callable[[Any], bool] = bool, default: Any = None) -> Any:
+        """Async routing; `providers` is [(name, zero-arg coroutine function)]. Losing calls are cancelled."""
+        order, gated = self._order(providers)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.PROVIDER_TIMEOUT_SECONDS
+        pending = {}
+        result = default
+        index = 0
+
+        def launch(decision: str = None):
+            nonlocal index
+            name, fn = order[index]
+            index += 1
+            if decision:
+                PROVIDER_DECISIONS.labels(self.name, name, decision).inc()
+            pending[asyncio.ensure_future(self._atimed(name, fn, is_success, gated))] = name
+
+        launch()
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                last_launched = order[index - 1][0]
+                done, _ = await asyncio.wait(pending, timeout=self._next_wait(last_launched, remaining, index < len(order)),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if index < len(order):
+                        launch("hedge")
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    ok, value = task.result()
+                    if ok:
+                        PROVIDER_DECISIONS.labels(self.name, name, "win").inc()
+                        return value
+                    if value is not None:
+                        result = value
+                if not pending and index < len(order):
+                    launch("fallback")
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: health.snapshot() for name, health in self._health.items()}
+
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def get_route(name: str) -> ProviderRoute:
+    """The process-wide route for `name` (health is shared by every tool instance using it)."""
+    with _routes_lock:
+        if name not in _routes:
+            _routes[name] = ProviderRoute(name)
+        return _routes[name]
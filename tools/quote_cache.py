@@ -0,0 +1,195 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Hashable
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from metrics import CACHE_REQUESTS
+from tools.async_utils import get_executor
+
+
+def is_cacheable_quote(value: Any) -> bool:
+    """Empty results and tool error payloads are returned to the caller but never cached."""
+    return bool(value) and not (isinstance(value, dict) and "error" in value)
+
+
+class QuoteCache:
+    """
+    Shared in-process cache for latest quotes, keyed by symbol.
+
+    - Fresh entries (younger than `fresh_seconds`) are served directly.
+    - Stale entries (up to `stale_seconds` older) are served immediately while a
+      single background refresh runs.
+    - Concurrent misses for the same key wait on one in-flight fetch instead of
+      each calling the provider (single-flight). Sync and async callers share the
+      same in-flight future.
+    - Size is bounded with LRU eviction.
+    """
+
+    def __init__(self, name: str, fresh_seconds: float, stale_seconds: float, max_entries: int = None):
+        self.name = name
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries or config.QUOTE_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._inflight = {}  # key -> concurrent.futures.Future
+        self._background = set()  # Running async refresh tasks (kept referenced until done)
+        self.counts = {"hit": 0, "stale_hit": 0, "miss": 0, "coalesced": 0}
+
+    def _lookup(self, key: Hashable):
+        """Returns (value, state) with state in {"hit", "stale_hit", None}. Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, None
+        value, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if age <= self.fresh_seconds:
+            self._entries.move_to_end(key)
+            return value, "hit"
+        if age <= self.fresh_seconds + self.stale_seconds:
+            self._entries.move_to_end(key)
+            return value, "stale_hit"
+        del self._entries[key]
+        return None, None
+
+    def _store(self, key: Hashable, value: Any):
+        if not is_cacheable_quote(value):
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _claim(self, key: Hashable):
+        """Returns (future, leader): the in-flight future for `key`, creating it if this caller leads. Caller holds the lock."""
+        future = self._inflight.get(key)
+        if future is not None:
+            return future, False
+        future = Future()
+        self._inflight[key] = future
+        return future, True
+
+    def _settle(self, key: Hashable, future: Future, value: Any = None, error: BaseException = None):
+        if error is None:
+            self._store(key, value)
+        with self._lock:
+            self._inflight.pop(key, None)
+        if future.done():
+            return
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def _fetch_as_leader(self, key: Hashable, future: Future, fetch: Callable[[], Any]):
+        try:
+            value = fetch()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    async def _afetch_as_leader(self, key: Hashable, future: Future, afetch: Callable[[], Awaitable[Any]]):
+        try:
+            value = await afetch()
+        except BaseException as e:
+            # Includes CancelledError: waiters see it instead of an in-flight entry that never completes.
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, value)
+        return value
+
+    def _begin(self, key: Hashable):
+        """Classifies a lookup as hit, stale_hit, miss (this caller fetches) or coalesced (joins a fetch)."""
+        future = leader = None
+        with self._lock:
+            value, result = self._lookup(key)
+            if result != "hit":
+                future, leader = self._claim(key)
+                result = result or ("miss" if leader else "coalesced")
+            self.counts[result] += 1
+        CACHE_REQUESTS.labels(self.name, result).inc()
+        return value, result, future, leader
+
+    # --- Public API ---
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Returns the quote for `key`, calling `fetch()` only when no usable value or in-flight fetch exists."""
+        value, result, future, leader = self._begin(key)
+        if result == "hit":
+            return value
+        if result == "stale_hit":
+            if leader:
+                get_executor().submit(self._fetch_as_leader_quietly, key, future, fetch)
+            return value
+        if result == "coalesced":
+            return future.result(timeout=config.QUOTE_CACHE_WAIT_SECONDS)
+        return self._fetch_as_leader(key, future, fetch)
+
+    async def aget(self, key: Hashable, afetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of `get`; `afetch` is a coroutine function."""
+        value, result, future, leader = self._begin(key)
+        if result == "hit":
+            return value
+        if result == "stale_hit":
+            if leader:
+                task = asyncio.create_task(self._afetch_as_leader_quietly(key, future, afetch))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            return value
+        if result == "coalesced":
+            # Shielded: a waiter that times out or is cancelled must not cancel the shared fetch.
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), config.QUOTE_CACHE_WAIT_SECONDS)
+        return await self._afetch_as_leader(key, future, afetch)
+
+    def peek(self, key: Hashable) -> Any:
+        """Returns the fresh value for `key` or None, without fetching (for callers that batch their own misses)."""
+        with self._lock:
+            value, result = self._lookup(key)
+            result = "hit" if result == "hit" else "miss"
+            self.counts[result] += 1
+        CACHE_REQUESTS.labels(self.name, result).inc()
+        return value if result == "hit" else None
+
+    def put(self, key: Hashable, value: Any):
+        """Stores a value fetched outside `get`/`aget` (e.g. one entry of a bulk response)."""
+        self._store(key, value)
+
+    def _fetch_as_leader_quietly(self, key, future, fetch):
+        # Background refresh: a failure keeps serving the stale value until it expires.
+        try:
+            self._fetch_as_leader(key, future, fetch)
+        except Exception:
+            pass
+
+    async def _afetch_as_leader_quietly(self, key, future, afetch):
+        try:
+            await self._afetch_as_leader(key, future, afetch)
+        except Exception:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = sum(self.counts.values())
+            return {
+                "entries": len(self._entries),
+                **self.counts,
+                "hit_ratio": (self.counts["hit"] + self.counts["stale_hit"]) / lookups if lookups else 0.0,
+            }
+
+
+stock_quote_cache = QuoteCache("stock_quote", config.STOCK_QUOTE_FRESH_SECONDS, config.STOCK_QUOTE_STALE_SECONDS)
+crypto_quote_cache = QuoteCache("crypto_quote", config.CRYPTO_QUOTE_FRESH_SECONDS, config.CRYPTO_QUOTE_STALE_SECONDS)
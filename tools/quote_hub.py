@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from logger import get_logger
+from metrics import CACHE_REQUESTS
+
+logger = get_logger("quote_hub")
+
+# Columns of the quote table.
+TICK_FIELDS = ("price", "bid", "ask", "high", "low", "volume", "ts", "received_at")
+PRICE, BID, ASK, HIGH, LOW, VOLUME, TS, RECEIVED_AT = range(len(TICK_FIELDS))
+
+
+class QuoteTable:
+    """Latest tick per symbol in one growable float64 array (one row per symbol)."""
+
+    def __init__(self, capacity: int = 64):
+        self._lock = threading.Lock()
+        self._rows = {}  # symbol -> row index
+        self._data = np.full((capacity, len(TICK_FIELDS)), np.nan)
+
+    def update(self, symbol: str, values: Dict[str, float]):
+        with self._lock:
+            row = self._rows.get(symbol)
+            if row is None:
+                row = len(self._rows)
+                if row == self._data.shape[0]:
+                    grown = np.full((row * 2, len(TICK_FIELDS)), np.nan)
+                    grown[:row] = self._data
+                    self._data = grown
+                self._rows[symbol] = row
+            # A tick replaces the whole row; fields it lacks are unknown, not carried over.
+            self._data[row] = np.nan
+            for field, value in values.items():
+                self._data[row, TICK_FIELDS.index(field)] = np.nan if value is None else value
+
+    def get(self, symbol: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(symbol)
+            return None if row is None else self._data[row].copy()
+
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return list(self._rows)
+
+
+def tick_to_quote(symbol: str, row: np.ndarray) -> Dict[str, object]:
+    """Quote dict in the shape the price tools return."""
+    def value(index, digits=2):
+        return None if np.isnan(row[index]) else round(float(row[index]), digits)
+
+    ts = row[TS] if not np.isnan(row[TS]) else row[RECEIVED_AT]
+    return {
+        "symbol": symbol,
+        "latest_price": value(PRICE, 4),
+        "bid": value(BID, 4),
+        "ask": value(ASK, 4),
+        "high": value(HIGH),
+        "low": value(LOW),
+        "volume": value(VOLUME),
+        "timestamp": datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+        "source": "quote_hub",
+    }
+
+
+# --- Sources ---
+class QuoteSource(ABC):
+    """A streaming feed of ticks. `run` publishes into the hub until cancelled."""
+
+    @abstractmethod
+    async def run(self, hub: "QuoteHub"):
+        """Publishes ticks through `hub.publish` until cancelled."""
+
+
+class CcxtWebSocketSource(QuoteSource):
+    """Exchange websocket feed through ccxt.pro `watch_tickers`; follows the hub's watched symbols."""
+
+    def __init__(self, exchange_id: str = None):
+        self.exchange_id = exchange_id or config.CRYPTO_EXCHANGE
+
+    async def run(self, hub: "QuoteHub"):
+        import ccxt.pro as ccxtpro
+
+        exchange = getattr(ccxtpro, self.exchange_id)({"enableRateLimit": True})
+        backoff = 1.0
+        try:
+            while True:
+                symbols = hub.watched_symbols()
+                if not symbols:
+                    await hub.wait_for_symbols()
+                    continue
+                try:
+                    tickers = await exchange.watch_tickers(symbols)
+                    backoff = 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Quote stream error", extra={"exchange": self.exchange_id, "error": str(e)})
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30.0)
+                    continue
+                for symbol, ticker in tickers.items():
+                    hub.publish(symbol, price=ticker.get("last"), bid=ticker.get("bid"), ask=ticker.get("ask"),
+                                high=ticker.get("high"), low=ticker.get("low"), volume=ticker.get("quoteVolume"),
+                                ts=(ticker.get("timestamp") or time.time() * 1000) / 1000)
+        finally:
+            await exchange.close()
+
+
+class ReplaySource(QuoteSource):
+    """
+    Replays recorded ticks from a JSON-lines file ({"symbol", "price", ...,
+    "ts"} per line), keeping the recorded spacing divided by `speed`.
+    Intended for local runs and tests.
+    """
+
+    def __init__(self, path: str = None, speed: float = None, loop: bool = True):
+        self.path = path or config.QUOTE_HUB_REPLAY_PATH
+        self.speed = speed or config.QUOTE_HUB_REPLAY_SPEED
+        self.loop = loop
+
+    def _read(self) -> List[dict]:
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    async def run(self, hub: "QuoteHub"):
+        ticks = self._read()
+        while ticks:
+            previous_ts = None
+            for tick in ticks:
+                ts = tick.get("ts")
+                if previous_ts is not None and ts is not None and ts > previous_ts:
+                    await asyncio.sleep((ts - previous_ts) / self.speed)
+                previous_ts = ts
+                # Replayed ticks are stamped as live so tools treat them as fresh.
+                hub.publish(tick["symbol"], **{key: tick.get(key) for key in ("price", "bid", "ask", "high", "low", "volume")})
+            if not self.loop:
+                break
+            await asyncio.sleep(0)
+
+
+def build_source(name: str = None) -> Optional[QuoteSource]:
+    name = (name or config.QUOTE_HUB_SOURCE).lower()
+    if name == "ccxt":
+        return CcxtWebSocketSource()
+    if name == "replay":
+        return ReplaySource()
+    return None
+
+
+# --- Hub ---
+class _Subscriber:
+    """Coalescing mailbox: only the newest tick per symbol is kept until the reader drains it."""
+
+    def __init__(self, symbols: Iterable[str]):
+        self.symbols = set(symbols)
+        self.pending = {}
+        self.event = asyncio.Event()
+
+    def offer(self, symbol: str, quote: dict):
+        self.pending[symbol] = quote
+        self.event.set()
+
+    async def drain(self) -> List[dict]:
+        await self.event.wait()
+        self.event.clear()
+        quotes, self.pending = list(self.pending.values()), {}
+        return quotes
+
+
+class QuoteHub:
+    """
+    Long-lived, in-process store of the latest tick per symbol, fed by a
+    streaming source. Tools read it without network I/O; SSE clients subscribe
+    to symbols and receive each update (coalesced per symbol if they fall behind).
+    Runs on the API's event loop, started and stopped by the lifespan.
+    """
+
+    def __init__(self, source: QuoteSource = None):
+        self.source = source
+        self.table = QuoteTable()
+        self._loop = None
+        self._task = None
+        self._subscribers = set()
+        self._base_symbols = {s.strip().upper() for s in config.QUOTE_HUB_SYMBOLS.split(",") if s.strip()}
+        self._symbols_changed = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, source: QuoteSource = None):
+        self.source = source or self.source or build_source()
+        if self.source is None or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._symbols_changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run_source())
+        logger.info("Quote hub started", extra={"source": type(self.source).__name__, "symbols": sorted(self._base_symbols)})
+
+    async def _run_source(self):
+        try:
+            await self.source.run(self)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Quote source stopped")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    # --- Symbols ---
+    def watched_symbols(self) -> List[str]:
+        symbols = set(self._base_symbols)
+        for subscriber in self._subscribers:
+            symbols |= subscriber.symbols
+        return sorted(symbols)
+
+    async def wait_for_symbols(self):
+        self._symbols_changed.clear()
+        await self._symbols_changed.wait()
+
+    # --- Feed side (hub loop) ---
+    def publish(self, symbol: str, ts: float = None, **values):
+        """Records a tick and notifies subscribers of `symbol`. Must be called on the hub's loop."""
+        symbol = symbol.upper()
+        values = {key: value for key, value in values.items() if key in TICK_FIELDS}
+        values["received_at"] = time.time()
+        values["ts"] = ts if ts is not None else values["received_at"]
+        self.table.update(symbol, values)
+        if self._subscribers:
+            quote = tick_to_quote(symbol, self.table.get(symbol))
+            for subscriber in self._subscribers:
+                if symbol in subscriber.symbols:
+                    subscriber.offer(symbol, quote)
+
+    # --- Read side ---
+    def latest(self, symbol: str, max_age: float = None) -> Optional[dict]:
+        """Latest quote if the hub has received one within `max_age` seconds (any thread)."""
+        if not self.running:
+            return None
+        row = self.table.get(symbol.strip().upper())
+        max_age = config.QUOTE_HUB_MAX_AGE_SECONDS if max_age is None else max_age
+        if row is None or np.isnan(row[PRICE]) or time.time() - row[RECEIVED_AT] > max_age:
+            CACHE_REQUESTS.labels("quote_hub", "miss").inc()
+            return None
+        CACHE_REQUESTS.labels("quote_hub", "hit").inc()
+        return tick_to_quote(symbol.strip().upper(), row)
+
+    async def subscribe(self, symbols: Iterable[str]):
+        """Async generator of quote batches for `symbols`, starting with the current snapshot."""
+        subscriber = _Subscriber(s.strip().upper() for s in symbols if s.strip())
+        self._subscribers.add(subscriber)
+        if self._symbols_changed is not None:
+            self._symbols_changed.set()
+        try:
+            snapshot = [tick_to_quote(s, row) for s in subscriber.symbols
+                        if (row := self.table.get(s)) is not None and not np.isnan(row[PRICE])]
+            if snapshot:
+                yield snapshot
+            while True:
+                yield await subscriber.drain()
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        return {"running": self.running, "symbols": len(self.table.symbols()), "subscribers": len(self._subscribers)}
+
+
+quote_hub = QuoteHub()
@@ -0,0 +1,374 @@
+from pydantic import BaseModel, Field
+from langchain_core.tools import BaseTool
+from typing import Type, Any, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import os
+import re
+import sys
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
+from tools.async_utils import run_blocking
+from tools.price_store import CLOSE, DATE, HIGH, LOW, VOLUME, FIELDS, from_day, price_store
+from tools.stock_market_tool import HistoricalStockMarketTool
+from tools import indicators
+
+UNIVERSE_DIR = os.path.join(BASE_DIR, "data", "universes")
+
+# --- Predicate language ---
+# condition := or_expr
+# or_expr   := and_expr ("or" and_expr)*
+# and_expr  := not_expr ("and" not_expr)*
+# not_expr  := "not" not_expr | "(" or_expr ")" | operand [op operand]
+# operand   := number | metric name (see METRIC_HELP)
+_TOKEN = re.compile(r"\s*(?:(?P<number>-?\d+(?:\.\d+)?)|(?P<op><=|>=|==|!=|<|>)|(?P<paren>[()])|(?P<name>[A-Za-z_][A-Za-z0-9_]*))")
+_COMPARE = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal}
+
+METRIC_HELP = (
+    "close, change_pct, volume, rsi (14) or rsi_N, sma_N, ema_N, macd, macd_signal, macd_hist, "
+    "macd_cross_up, macd_cross_down, bb_upper, bb_lower, atr"
+)
+
+
+class ScreenerSyntaxError(ValueError):
+    pass
+
+
+def _tokenize(text: str) -> List[tuple]:
+    tokens, position = [], 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise ScreenerSyntaxError(f"Unexpected input at: {text[position:position + 20]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "name" and value.lower() in ("and", "or", "not"):
+            kind, value = value.lower(), value.lower()
+        elif kind == "name":
+            value = value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser producing a small tuple AST; never evaluates Python code."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.names = set()
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None):
+        token = self._peek()
+        if token[0] is None or (kind and token[0] != kind):
+            raise ScreenerSyntaxError(f"Expected {kind or 'a term'} but found {token[1]!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        node = self._or()
+        if self._peek()[0] is not None:
+            raise ScreenerSyntaxError(f"Unexpected {self._peek()[1]!r}")
+        return node
+
+    def _or(self):
+        node = self._and()
+        while self._peek()[0] == "or":
+            self._take()
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek()[0] == "and":
+            self._take()
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        kind, value = self._peek()
+        if kind == "not":
+            self._take()
+            return ("not", self._not())
+        if kind == "paren" and value == "(":
+            self._take()
+            node = self._or()
+            if self._take("paren")[1] != ")":
+                raise ScreenerSyntaxError("Expected ')'")
+            return node
+        left = self._operand()
+        if self._peek()[0] == "op":
+            op = self._take()[1]
+            return ("cmp", op, left, self._operand())
+        return ("truthy", left)
+
+    def _operand(self):
+        kind, value = self._take()
+        if kind == "number":
+            return ("number", float(value))
+        if kind == "name":
+            self.names.add(value)
+            return ("metric", value)
+        raise ScreenerSyntaxError(f"Expected a metric or number but found {value!r}")
+
+
+def parse_condition(text: str):
+    """Returns (ast, metric names used)."""
+    parser = _Parser(text)
+    return parser.parse(), parser.names
+
+
+def _evaluate(node, metrics: Dict[str, np.ndarray]) -> np.ndarray:
+    kind = node[0]
+    if kind == "number":
+        return np.float64(node[1])
+    if kind == "metric":
+        return metrics[node[1]]
+    if kind == "cmp":
+        with np.errstate(invalid="ignore"):
+            return _COMPARE[node[1]](_evaluate(node[2], metrics), _evaluate(node[3], metrics))
+    if kind == "truthy":
+        value = _evaluate(node[1], metrics)
+        return np.nan_to_num(value, nan=0.0) != 0
+    if kind == "not":
+        return ~_evaluate(node[1], metrics)
+    left, right = _evaluate(node[1], metrics), _evaluate(node[2], metrics)
+    return left & right if kind == "and" else left | right
+
+
+# --- Metrics over a (ticker x time) block ---
+def _last(values: np.ndarray) -> np.ndarray:
+    return values[:, -1]
+
+
+def required_bars(name: str) -> int:
+    """Bars of history a metric needs before its latest value is meaningful."""
+    number = re.search(r"_(\d+)$", name)
+    if name in ("close", "price", "volume"):
+        return 1
+    if name == "change_pct":
+        return 2
+    if name == "rsi" or re.fullmatch(r"rsi_\d+", name):
+        return (int(number.group(1)) if number else 14) + 1
+    if re.fullmatch(r"(sma|ema)_\d+", name):
+        return int(number.group(1))
+    if name == "macd":
+        return 26
+    if name in ("macd_signal", "macd_hist"):
+        return 26 + 9 - 1
+    if name in ("macd_cross_up", "macd_cross_down"):
+        return 26 + 9
+    if name in ("bb_upper", "bb_lower"):
+        return 20
+    if name == "atr":
+        return 14
+    raise ScreenerSyntaxError(f"Unknown metric {name!r}. Available: {METRIC_HELP}")
+
+
+def bar_counts(block: np.ndarray) -> np.ndarray:
+    """Bars per ticker in a date-aligned block (leading NaN marks days before a ticker's history starts)."""
+    valid = ~np.isnan(block[CLOSE])
+    first = np.where(valid.any(axis=1), valid.argmax(axis=1), block.shape[2])
+    return block.shape[2] - first
+
+
+def compute_metrics(block: np.ndarray, names) -> Dict[str, np.ndarray]:
+    """
+    Computes each requested metric for every ticker at once. `block` has shape
+    (len(FIELDS), tickers, time) on a shared date axis, NaN before a ticker's
+    first bar; returns one value per ticker (the latest bar). Tickers starting
+    on the same date are computed together on their NaN-free tail, and a metric
+    is NaN (False for crossovers) for tickers with fewer bars than it needs.
+    """
+    required = {name: required_bars(name) for name in names}
+    counts = bar_counts(block)
+    metrics = {}
+    for start in np.unique(block.shape[2] - counts):
+        if start >= block.shape[2]:
+            continue
+        rows = np.flatnonzero(block.shape[2] - counts == start)
+        for name, values in _block_metrics(block[:, rows, start:], names).items():
+            if name not in metrics:
+                metrics[name] = np.zeros(block.shape[1], dtype=bool) if values.dtype == bool else np.full(block.shape[1], np.nan)
+            metrics[name][rows] = values
+    for name in names:
+        metrics.setdefault(name, np.full(block.shape[1], np.nan))
+        short = counts < required[name]
+        metrics[name][short] = False if metrics[name].dtype == bool else np.nan
+    return metrics
+
+
+def _block_metrics(block: np.ndarray, names) -> Dict[str, np.ndarray]:
+    close, high, low = block[CLOSE], block[HIGH], block[LOW]
+    metrics, cache = {}, {}
+
+    def cached(key, compute: Callable):
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    macd = lambda: cached("macd", lambda: indicators.macd(close))
+    for name in names:
+        if name in ("close", "price"):
+            metrics[name] = _last(close)
+        elif name == "volume":
+            metrics[name] = _last(block[VOLUME])
+        elif name == "change_pct":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                metrics[name] = (close[:, -1] / close[:, -2] - 1.0) * 100.0 if close.shape[1] > 1 else np.full(close.shape[0], np.nan)
+        elif name == "rsi" or re.fullmatch(r"rsi_\d+", name):
+            period = int(name[4:]) if name != "rsi" else 14
+            metrics[name] = _last(indicators.rsi(close, period))
+        elif re.fullmatch(r"sma_\d+", name):
+            window = int(name[4:])
+            metrics[name] = _last(indicators.sma(close, window)[window])
+        elif re.fullmatch(r"ema_\d+", name):
+            window = int(name[4:])
+            metrics[name] = _last(indicators.ema(close, window)[window])
+        elif name in ("macd", "macd_signal", "macd_hist"):
+            key = {"macd": "macd_line", "macd_signal": "signal_line", "macd_hist": "histogram"}[name]
+            metrics[name] = _last(macd()[key])
+        elif name in ("macd_cross_up", "macd_cross_down"):
+            histogram = macd()["histogram"]
+            if histogram.shape[1] < 2:
+                metrics[name] = np.zeros(close.shape[0], dtype=bool)
+            elif name == "macd_cross_up":
+                metrics[name] = (histogram[:, -2] <= 0) & (histogram[:, -1] > 0)
+            else:
+                metrics[name] = (histogram[:, -2] >= 0) & (histogram[:, -1] < 0)
+        elif name in ("bb_upper", "bb_lower"):
+            bands = cached("bollinger", lambda: indicators.bollinger(close, 20))
+            metrics[name] = _last(bands["upper" if name == "bb_upper" else "lower"])
+        elif name == "atr":
+            metrics[name] = _last(indicators.atr(high, low, close, 14))
+        else:
+            raise ScreenerSyntaxError(f"Unknown metric {name!r}. Available: {METRIC_HELP}")
+    return metrics
+
+
+def load_universe(name: str) -> List[str]:
+    """Tickers listed one per line in data/universes/<name>.txt ('#' starts a comment)."""
+    path = os.path.join(UNIVERSE_DIR, f"{re.sub(r'[^a-z0-9_]', '', name.lower())}.txt")
+    with open(path) as f:
+        return [line.split("#")[0].strip().upper() for line in f if line.split("#")[0].strip()]
+
+
+def available_universes() -> List[str]:
+    try:
+        return sorted(name[:-4] for name in os.listdir(UNIVERSE_DIR) if name.endswith(".txt"))
+    except FileNotFoundError:
+        return []
+
+
+class ScreenerInput(BaseModel):
+    condition: str = Field(description=f"Filter such as 'rsi < 30 and macd_cross_up'. Metrics: {METRIC_HELP}. Operators: < <= > >= == != and or not ().")
+    universe: str = Field(default="dow30", description=f"Named ticker universe to scan: {', '.join(available_universes())}.")
+    tickers: Optional[List[str]] = Field(default=None, description="Explicit tickers to scan instead of a named universe.")
+
+
+class ScreenerTool(BaseTool):
+    name: str = "stock_screener"
+    description: str = (
+        "Screens a universe of stocks with one condition over technical indicators "
+        "(e.g., 'rsi < 30 and macd_cross_up') and returns only the matching tickers."
+    )
+    args_schema: Type[BaseModel] = ScreenerInput
+
+    def _load_block(self, tickers: List[str]):
+        """
+        Reads each ticker's recent bars from the price store (fetching only what
+        is missing, in parallel) and places them on the union of their dates in
+        a (field x ticker x time) block. Days before a ticker's first bar stay
+        NaN; days it lacks after that carry its previous close forward.
+        """
+        end = date.today()
+        start = end - timedelta(days=config.SCREENER_LOOKBACK_DAYS)
+        fetch = HistoricalStockMarketTool()._fetch_range
+
+        def load(ticker):
+            return price_store.get_range(ticker, start, end, fetch, refresh_today=False)
+
+        # A dedicated pool: this already runs on the shared tool executor, which must not wait on itself.
+        with ThreadPoolExecutor(max_workers=config.SCREENER_FETCH_WORKERS, thread_name_prefix="screener") as pool:
+            series_list = list(pool.map(load, tickers))
+        usable = [(ticker, series) for ticker, series in zip(tickers, series_list) if series.shape[1]]
+        missing = [ticker for ticker, series in zip(tickers, series_list) if not series.shape[1]]
+        if not usable:
+            return [], np.empty((len(FIELDS), 0, 0)), missing
+
+        days = np.unique(np.concatenate([series[DATE] for _, series in usable]))
+        block = np.full((len(FIELDS), len(usable), len(days)), np.nan)
+        for row, (_, series) in enumerate(usable):
+            block[:, row, np.searchsorted(days, series[DATE])] = series
+        block[DATE] = days
+
+        # Forward-fill gaps after each ticker's first bar: a day without a bar is flat at the last close.
+        present = ~np.isnan(block[CLOSE])
+        last_seen = np.maximum.accumulate(np.where(present, np.arange(len(days)), -1), axis=1)
+        started = last_seen >= 0
+        gap = started & ~present
+        filled_close = np.take_along_axis(block[CLOSE], np.maximum(last_seen, 0), axis=1)
+        for field in (FIELDS.index("open"), HIGH, LOW, CLOSE):
+            block[field][gap] = filled_close[gap]
+        block[VOLUME][gap] = 0.0
+        return [ticker for ticker, _ in usable], block, missing
+
+    def _run(self, condition: str, universe: str = "dow30", tickers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Synchronous method to screen a ticker universe."""
+        try:
+            tree, names = parse_condition(condition)
+        except ScreenerSyntaxError as e:
+            return {"error": f"Invalid condition: {e}", "metrics": METRIC_HELP}
+        if tickers:
+            universe_tickers = list(dict.fromkeys(t.strip().upper() for t in tickers if t.strip()))
+        else:
+            try:
+                universe_tickers = load_universe(universe)
+            except FileNotFoundError:
+                return {"error": f"Unknown universe {universe!r}.", "available_universes": available_universes()}
+        universe_tickers = universe_tickers[:config.SCREENER_MAX_TICKERS]
+
+        symbols, block, missing = self._load_block(universe_tickers)
+        if not symbols:
+            return {"condition": condition, "scanned": 0, "matches": [], "missing": missing}
+        try:
+            metrics = compute_metrics(block, names)
+        except ScreenerSyntaxError as e:
+            return {"error": str(e)}
+        mask = np.broadcast_to(_evaluate(tree, metrics), (len(symbols),))
+
+        counts = bar_counts(block)
+        insufficient = {}
+        for name in sorted(names):
+            short = [symbols[i] for i in np.flatnonzero(counts < required_bars(name))]
+            if short:
+                insufficient[name] = short
+
+        shown = sorted(name for name in names if metrics[name].dtype != bool)
+        matches = [
+            {"ticker": symbols[i], "close": round(float(block[CLOSE][i, -1]), 4),
+             **{name: round(float(metrics[name][i]), 4) for name in shown if name not in ("close", "price")}}
+            for i in np.flatnonzero(mask)
+        ]
+        return {
+            "condition": condition,
+            "as_of": from_day(block[DATE][0, -1]).isoformat(),
+            "scanned": len(symbols),
+            "match_count": len(matches),
+            "matches": matches[:config.SCREENER_MAX_RESULTS],
+            "missing": missing,
+            **({"insufficient_history": insufficient} if insufficient else {}),
+        }
+
+    async def _arun(self, condition: str, universe: str = "dow30", tickers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Asynchronous method to screen a ticker universe."""
+        return await run_blocking(self._run, condition, universe, tickers)
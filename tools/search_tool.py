@@ -1,4 +1,3 @@
-import requests
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Dict, Any
@@ -9,6 +8,7 @@ import sys
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 import config
+from tools import http_client
 
 class SearchInput(BaseModel):
     query: str = Field(description="Search query string.")
@@ -20,23 +20,40 @@ class SearchTool(BaseTool):
     api_key: str = config.SERPER_API_KEY
     base_url: str = "https://google.serper.dev/search"
     
-    def _perform_search(self, query: str, num_results: int) -> Dict[str, Any]:
-        """Fetches search results from SerperAPI."""
+    def _build_request(self, query: str, num_results: int):
+        """Builds the SerperAPI headers and payload."""
         headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
         payload = {"q": query, "num": num_results}
+        return headers, payload
+
+    def _parse_results(self, query: str, data: Dict[str, Any], num_results: int) -> Dict[str, Any]:
+        """Converts a SerperAPI response into the tool's result format."""
+        if "organic" in data:
+            results = [
+                {"title": entry["title"], "link": entry["link"], "snippet": entry.get("snippet", "")}
+                for entry in data["organic"][:num_results]
+            ]
+            return {"query": query, "results": results}
+        else:
+            return {"error": "No results found"}
+    
+    def _perform_search(self, query: str, num_results: int) -> Dict[str, Any]:
+        """Fetches search results from SerperAPI."""
+        headers, payload = self._build_request(query, num_results)
         
         try:
-            response = requests.post(self.base_url, json=payload, headers=headers)
-            data = response.json()
-            
-            if "organic" in data:
-                results = [
-                    {"title": entry["title"], "link": entry["link"], "snippet": entry.get("snippet", "")}
-                    for entry in data["organic"][:num_results]
-                ]
-                return {"query": query, "results": results}
-            else:
-                return {"error": "No results found"}
+            response = http_client.post(self.base_url, "search_tool", json=payload, headers=headers)
+            return self._parse_results(query, response.json(), num_results)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _aperform_search(self, query: str, num_results: int) -> Dict[str, Any]:
+        """Fetches search results from SerperAPI without blocking the event loop."""
+        headers, payload = self._build_request(query, num_results)
+
+        try:
+            response = await http_client.apost(self.base_url, "search_tool", json=payload, headers=headers)
+            return self._parse_results(query, response.json(), num_results)
         except Exception as e:
             return {"error": str(e)}
     
@@ -44,7 +61,7 @@ class SearchTool(BaseTool):
         return self._perform_search(query, num_results)
     
     async def _arun(self, query: str, num_results: int = 5) -> Dict[str, Any]:
-        return self._perform_search(query, num_results)
+        return await self._aperform_search(query, num_results)
 
 
 
@@ -1,7 +1,7 @@
-from transformers import pipeline
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Type, Any, Dict
+from tools.async_utils import run_blocking
 
 class SentimentAnalysisInput(BaseModel):
     text: str = Field(description="Financial news headline or tweet for sentiment analysis.")
@@ -12,6 +12,7 @@ class SentimentAnalysisTool(BaseTool):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        from transformers import pipeline  # Pulls in torch; only loaded when the tool is built
         object.__setattr__(self, "model", pipeline("text-classification", model="ProsusAI/finbert"))
     
     def _analyze_sentiment(self, text: str) -> Dict[str, Any]:
@@ -32,7 +33,8 @@ class SentimentAnalysisTool(BaseTool):
     
     async def _arun(self, text: str) -> Dict[str, Any]:
         """Asynchronous sentiment analysis."""
-        return self._analyze_sentiment(text)
+        # FinBERT inference is CPU-bound, keep it off the event loop.
+        return await run_blocking(self._analyze_sentiment, text)
     
 
 
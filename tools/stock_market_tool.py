@@ -1,11 +1,9 @@
-import aiohttp
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
-from typing import Type, Any, Dict
-import requests
+from typing import Type, Any, Dict, List, Optional
 import json
-import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
 import os
 import sys
 
@@ -13,10 +11,21 @@ import sys
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 import config
+from tools import http_client
+from tools.async_utils import run_blocking
+from tools.quote_cache import stock_quote_cache
+from tools.quote_hub import quote_hub
+from tools.provider_router import get_route
+from tools.price_store import FIELDS, empty_series, expects_bars, price_store, series_to_records, to_day
+
+BATCH_QUOTE_COLUMNS = ["ticker", "price", "change_pct", "high", "low", "volume"]
 
 class StockPriceInput(BaseModel):
     ticker: str = Field(description="Stock ticker symbol (e.g., AAPL for Apple).")
 
+class BatchStockQuoteInput(BaseModel):
+    tickers: List[str] = Field(description="Stock ticker symbols to quote together (e.g., [\"AAPL\", \"MSFT\", \"NVDA\"]).")
+
 class HistoricalStockInput(BaseModel):
     ticker: str = Field(description="Stock ticker symbol (e.g., AAPL for Apple).")
     days: int = Field(default=30, description="Number of past days for historical data.")
@@ -29,6 +38,7 @@ class StockMarketTool(BaseTool):
     def _fetch_yahoo_finance_price(self, ticker: str) -> Dict[str, Any]:
         """Fetch stock price using Yahoo Finance."""
         try:
+            import yfinance as yf
             stock = yf.Ticker(ticker)
             data = stock.history(period="1d")
             if not data.empty:
@@ -43,88 +53,261 @@ class StockMarketTool(BaseTool):
         except Exception as e:
             return {}
     
+    def _parse_fmp_price(self, ticker: str, data: Any) -> Dict[str, Any]:
+        """Converts an FMP quote response into the tool's price format."""
+        if data:
+            return {
+                "ticker": ticker,
+                "latest_price": round(data[0]['price'], 2),
+                "high": round(data[0]['dayHigh'], 2),
+                "low": round(data[0]['dayLow'], 2),
+                "volume": int(data[0]['volume']),
+                "timestamp": str(datetime.now()),
+            }
+        return {}
+    
     def _fetch_fmp_price(self, ticker: str) -> Dict[str, Any]:
         """Fetch stock price using Financial Modeling Prep API."""
         try:
             url = f"https://financialmodelingprep.com/api/v3/quote/{ticker}?apikey={self.api_key}"
-            response = requests.get(url)
+            response = http_client.get(url, "stock_market_tool")
             if response.status_code == 200:
-                data = response.json()
-                if data:
-                    return {
-                        "ticker": ticker,
-                        "latest_price": round(data[0]['price'], 2),
-                        "high": round(data[0]['dayHigh'], 2),
-                        "low": round(data[0]['dayLow'], 2),
-                        "volume": int(data[0]['volume']),
-                        "timestamp": str(datetime.now()),
-                    }
+                return self._parse_fmp_price(ticker, response.json())
         except Exception as e:
             return {}
     
+    async def _afetch_fmp_price(self, ticker: str) -> Dict[str, Any]:
+        """Fetch stock price using Financial Modeling Prep API without blocking the event loop."""
+        try:
+            url = f"https://financialmodelingprep.com/api/v3/quote/{ticker}?apikey={self.api_key}"
+            response = await http_client.aget(url, "stock_market_tool")
+            if response.status_code == 200:
+                return self._parse_fmp_price(ticker, response.json())
+        except Exception as e:
+            return {}
+    
+    def _fetch_price(self, ticker: str) -> Dict[str, Any]:
+        return get_route("stock_quote").call([
+            ("yahoo", lambda: self._fetch_yahoo_finance_price(ticker)),
+            ("fmp", lambda: self._fetch_fmp_price(ticker)),
+        ], default={})
+
+    async def _afetch_price(self, ticker: str) -> Dict[str, Any]:
+        # yfinance has no async API, so it runs on the shared tool executor.
+        return await get_route("stock_quote").acall([
+            ("yahoo", lambda: run_blocking(self._fetch_yahoo_finance_price, ticker)),
+            ("fmp", lambda: self._afetch_fmp_price(ticker)),
+        ], default={})
+
+    def _hub_quote(self, ticker: str) -> Dict[str, Any]:
+        """Latest streamed tick from the quote hub, in the tool's format, or {}."""
+        quote = quote_hub.latest(ticker)
+        if not quote:
+            return {}
+        quote["ticker"] = quote.pop("symbol")
+        return quote
+
     def _run(self, ticker: str) -> Dict[str, Any]:
         """Synchronous method to fetch stock price."""
-        result = self._fetch_yahoo_finance_price(ticker)
-        return result if result else self._fetch_fmp_price(ticker)
+        ticker = ticker.strip().upper()
+        return self._hub_quote(ticker) or stock_quote_cache.get(ticker, lambda: self._fetch_price(ticker))
     
     async def _arun(self, ticker: str) -> Dict[str, Any]:
         """Asynchronous method to fetch stock price."""
-        result = self._fetch_yahoo_finance_price(ticker)
-        return result if result else self._fetch_fmp_price(ticker)
+        ticker = ticker.strip().upper()
+        return self._hub_quote(ticker) or await stock_quote_cache.aget(ticker, lambda: self._afetch_price(ticker))
+
+class BatchStockQuoteTool(BaseTool):
+    name: str = "batch_stock_quote"
+    description: str = (
+        "Fetches latest quotes for several stock tickers in one request and returns a compact table. "
+        "Use this instead of repeated stock_market calls when comparing or listing multiple tickers."
+    )
+    args_schema: Type[BaseModel] = BatchStockQuoteInput
+    api_key: str = config.FMP_API_KEY
+
+    def _normalize_tickers(self, tickers: List[str]) -> List[str]:
+        """Uppercases, drops blanks and duplicates (keeping order) and caps the list size."""
+        seen = []
+        for ticker in tickers:
+            ticker = ticker.strip().upper()
+            if ticker and ticker not in seen:
+                seen.append(ticker)
+        return seen[:config.BATCH_QUOTE_MAX_TICKERS]
+
+    def _fetch_yahoo_finance_quotes(self, tickers: List[str]) -> Dict[str, list]:
+        """Fetch quotes for all tickers with one threaded yf.download call; returns ticker -> row."""
+        try:
+            import yfinance as yf
+            # Two sessions are enough for the change against the previous close; 5d covers weekends and holidays.
+            data = yf.download(tickers, period="5d", interval="1d", group_by="column",
+                               auto_adjust=False, threads=True, progress=False)
+            if data.empty:
+                return {}
+            rows = {}
+            for ticker in tickers:
+                try:
+                    closes = data["Close"][ticker].dropna()
+                except KeyError:
+                    continue
+                if closes.empty:
+                    continue
+                last = closes.index[-1]
+                price = float(closes.iloc[-1])
+                change_pct = round((price / float(closes.iloc[-2]) - 1) * 100, 2) if len(closes) > 1 else None
+                rows[ticker] = [
+                    ticker, round(price, 2), change_pct,
+                    round(float(data["High"][ticker].loc[last]), 2),
+                    round(float(data["Low"][ticker].loc[last]), 2),
+                    int(data["Volume"][ticker].loc[last]),
+                ]
+            return rows
+        except Exception as e:
+            return {}
+
+    def _parse_fmp_quotes(self, data: Any) -> Dict[str, list]:
+        """Converts an FMP multi-symbol quote response into ticker -> row."""
+        rows = {}
+        for quote in data or []:
+            if quote.get("price") is None:
+                continue
+            change_pct = quote.get("changesPercentage")
+            rows[quote["symbol"].upper()] = [
+                quote["symbol"].upper(),
+                round(quote["price"], 2),
+                round(change_pct, 2) if change_pct is not None else None,
+                round(quote.get("dayHigh") or 0, 2),
+                round(quote.get("dayLow") or 0, 2),
+                int(quote.get("volume") or 0),
+            ]
+        return rows
+
+    def _fmp_quotes_url(self, tickers: List[str]) -> str:
+        # FMP's quote endpoint accepts a comma-separated symbol list, so one request covers every ticker.
+        return f"https://financialmodelingprep.com/api/v3/quote/{','.join(tickers)}?apikey={self.api_key}"
+
+    def _fetch_fmp_quotes(self, tickers: List[str]) -> Dict[str, list]:
+        """Fetch quotes for all tickers with one Financial Modeling Prep request."""
+        try:
+            response = http_client.get(self._fmp_quotes_url(tickers), "stock_market_tool")
+            if response.status_code == 200:
+                return self._parse_fmp_quotes(response.json())
+        except Exception as e:
+            pass
+        return {}
+
+    async def _afetch_fmp_quotes(self, tickers: List[str]) -> Dict[str, list]:
+        """Fetch quotes for all tickers with one Financial Modeling Prep request without blocking the event loop."""
+        try:
+            response = await http_client.aget(self._fmp_quotes_url(tickers), "stock_market_tool")
+            if response.status_code == 200:
+                return self._parse_fmp_quotes(response.json())
+        except Exception as e:
+            pass
+        return {}
+
+    def _build_table(self, tickers: List[str], rows: Dict[str, list]) -> Dict[str, Any]:
+        table = {
+            "columns": BATCH_QUOTE_COLUMNS,
+            "rows": [rows[ticker] for ticker in tickers if ticker in rows],
+            "timestamp": str(datetime.now()),
+        }
+        missing = [ticker for ticker in tickers if ticker not in rows]
+        if missing:
+            table["missing"] = missing
+        if not table["rows"]:
+            return {"error": f"No quotes found for {', '.join(tickers)}"}
+        return table
+
+    def _run(self, tickers: List[str]) -> Dict[str, Any]:
+        """Synchronous method to fetch quotes for several tickers."""
+        tickers = self._normalize_tickers(tickers)
+        if not tickers:
+            return {"error": "No tickers given"}
+        rows = self._fetch_yahoo_finance_quotes(tickers)
+        missing = [ticker for ticker in tickers if ticker not in rows]
+        if missing:
+            rows.update(self._fetch_fmp_quotes(missing))
+        return self._build_table(tickers, rows)
+
+    async def _arun(self, tickers: List[str]) -> Dict[str, Any]:
+        """Asynchronous method to fetch quotes for several tickers."""
+        tickers = self._normalize_tickers(tickers)
+        if not tickers:
+            return {"error": "No tickers given"}
+        rows = await run_blocking(self._fetch_yahoo_finance_quotes, tickers)
+        missing = [ticker for ticker in tickers if ticker not in rows]
+        if missing:
+            rows.update(await self._afetch_fmp_quotes(missing))
+        return self._build_table(tickers, rows)
 
 class HistoricalStockMarketTool(BaseTool):
     name: str = "historical_stock_market"
     description: str = "Fetches historical stock market data."
     api_key: str = config.FMP_API_KEY
     
-    def _fetch_yahoo_finance_historical(self, ticker: str, days: int) -> Dict[str, Any]:
-        """Fetch historical stock data using Yahoo Finance."""
+    def _fetch_yahoo_finance_range(self, ticker: str, start: date, end: date) -> Optional[np.ndarray]:
+        """Fetch daily bars for [start, end] using Yahoo Finance, in the price store's layout."""
         try:
-            end_date = datetime.today().strftime("%Y-%m-%d")
-            start_date = (datetime.today() - timedelta(days=days)).strftime("%Y-%m-%d")
-            stock = yf.Ticker(ticker)
-            data = stock.history(start=start_date, end=end_date)
-            if not data.empty:
-                return {
-                    "ticker": ticker,
-                    "historical_data": data[["Open", "High", "Low", "Close", "Volume"]].to_dict(orient="records"),
-                }
+            import yfinance as yf
+            # yfinance treats `end` as exclusive.
+            data = yf.Ticker(ticker).history(start=start.isoformat(), end=(end + timedelta(days=1)).isoformat())
+            if data is None:
+                return None
+            if data.empty:
+                # yfinance reports errors and unknown tickers as an empty frame, not an exception.
+                return None if expects_bars(start, end) else empty_series()
+            days = [to_day(timestamp.date()) for timestamp in data.index]
+            return np.vstack([days, *(data[column].to_numpy(dtype=np.float64) for column in ("Open", "High", "Low", "Close", "Volume"))])
         except Exception as e:
-            return {}
+            return None
     
-    def _fetch_fmp_historical(self, ticker: str, days: int) -> Dict[str, Any]:
-        """Fetch historical stock data using Financial Modeling Prep API."""
+    def _parse_fmp_historical(self, data: Any) -> Optional[np.ndarray]:
+        """Converts an FMP historical-price-full response into the price store's layout."""
+        if not isinstance(data, dict):
+            return None
+        records = data.get("historical", [])
+        return np.array(
+            [[to_day(date.fromisoformat(record["date"][:10])), record["open"], record["high"], record["low"], record["close"], record["volume"]]
+             for record in records],
+            dtype=np.float64,
+        ).reshape(-1, len(FIELDS)).T
+    
+    def _fetch_fmp_range(self, ticker: str, start: date, end: date) -> Optional[np.ndarray]:
+        """Fetch daily bars for [start, end] using Financial Modeling Prep API."""
         try:
-            url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?timeseries={days}&apikey={self.api_key}"
-            response = requests.get(url)
+            url = f"https://financialmodelingprep.com/api/v3/historical-price-full/{ticker}?from={start.isoformat()}&to={end.isoformat()}&apikey={self.api_key}"
+            response = http_client.get(url, "stock_market_tool")
             if response.status_code == 200:
-                data = response.json()
-                if "historical" in data:
-                    return {
-                        "ticker": ticker,
-                        "historical_data": [
-                            {
-                                "date": record["date"],
-                                "open": record["open"],
-                                "high": record["high"],
-                                "low": record["low"],
-                                "close": record["close"],
-                                "volume": record["volume"]
-                            } for record in data["historical"]
-                        ],
-                    }
+                bars = self._parse_fmp_historical(response.json())
+                if bars is not None and bars.shape[1] == 0 and expects_bars(start, end):
+                    return None
+                return bars
         except Exception as e:
-            return {}
+            return None
+    
+    def _fetch_range(self, ticker: str, start: date, end: date) -> Optional[np.ndarray]:
+        return get_route("stock_history").call([
+            ("yahoo", lambda: self._fetch_yahoo_finance_range(ticker, start, end)),
+            ("fmp", lambda: self._fetch_fmp_range(ticker, start, end)),
+        ], is_success=lambda bars: bars is not None)
+    
+    def _load_series(self, ticker: str, days: int) -> np.ndarray:
+        """Daily bars for the last `days` calendar days, read from the local price store (fetching only missing days)."""
+        end = date.today()
+        return price_store.get_range(ticker.upper(), end - timedelta(days=days), end, self._fetch_range)
     
     def _run(self, ticker: str, days: int = 30) -> Dict[str, Any]:
         """Synchronous method to fetch historical stock data."""
-        result = self._fetch_yahoo_finance_historical(ticker, days)
-        return result if result else self._fetch_fmp_historical(ticker, days)
+        series = self._load_series(ticker, days)
+        if series.shape[1] == 0:
+            return {}
+        return {"ticker": ticker, "historical_data": series_to_records(series)}
     
     async def _arun(self, ticker: str, days: int = 30) -> Dict[str, Any]:
         """Asynchronous method to fetch historical stock data."""
-        result = self._fetch_yahoo_finance_historical(ticker, days)
-        return result if result else self._fetch_fmp_historical(ticker, days)
+        # Store reads, file locks and the provider fallback are all blocking.
+        return await run_blocking(self._run, ticker, days)
 
 
 
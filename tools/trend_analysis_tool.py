@@ -1,76 +1,106 @@
-import numpy as np
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Type, Any, Dict, List
+from datetime import date, timedelta
+import os
+import sys
+import numpy as np
+
+# Get the absolute path of the finance_agents directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+import config
 from tools.stock_market_tool import HistoricalStockMarketTool
+from tools.price_store import CLOSE, DATE, HIGH, LOW, from_day, price_store, to_day
+from tools.indicator_state import indicator_states
+from tools.async_utils import run_blocking
+from tools import indicators
 
 class TrendAnalysisInput(BaseModel):
     ticker: str = Field(description="Stock ticker symbol (e.g., AAPL for Apple).")
     days: int = Field(default=90, description="Number of past days for trend analysis.")
-    indicators: List[str] = Field(default=["SMA", "EMA", "RSI", "MACD"], description="List of indicators to compute.")
+    indicators: List[str] = Field(default=["SMA", "EMA", "RSI", "MACD"], description="List of indicators to compute: SMA, EMA, RSI, MACD, BOLLINGER, ATR.")
+    windows: List[int] = Field(default=[20], description="Windows for SMA and EMA (e.g., [20, 50, 200]).")
+    latest_only: bool = Field(default=False, description="Return only the latest SMA/EMA/RSI/MACD values (fast path).")
 
 class TrendAnalysisTool(BaseTool):
     name: str = "trend_analysis"
-    description: str = "Analyzes financial trends using SMA, EMA, RSI, and MACD."
-    
-    def _fetch_stock_data(self, ticker: str, days: int) -> List[Dict[str, Any]]:
-        """Fetch historical stock data using HistoricalStockMarketTool."""
-        result = HistoricalStockMarketTool()._run(ticker, days)  # Fetch data
-        return result.get("historical_data", [])  # Return list of historical data
-    
-    def _calculate_sma(self, data: List[Dict[str, Any]], period: int = 20) -> List[float]:
-        """Computes Simple Moving Average (SMA)."""
-        close_prices = [entry["close"] for entry in data]
-        sma_values = np.convolve(close_prices, np.ones(period)/period, mode='valid')
-        return sma_values.tolist()
-    
-    def _calculate_ema(self, data: List[Dict[str, Any]], period: int = 20) -> List[float]:
-        """Computes Exponential Moving Average (EMA)."""
-        close_prices = np.array([entry["close"] for entry in data])
-        ema_values = np.zeros_like(close_prices)
-        multiplier = 2 / (period + 1)
-        ema_values[0] = close_prices[0]  # First value is same as the close price
-        for i in range(1, len(close_prices)):
-            ema_values[i] = (close_prices[i] - ema_values[i - 1]) * multiplier + ema_values[i - 1]
-        return ema_values.tolist()
-    
-    def _calculate_rsi(self, data: List[Dict[str, Any]], period: int = 14) -> List[float]:
-        """Computes Relative Strength Index (RSI)."""
-        close_prices = np.array([entry["close"] for entry in data])
-        delta = np.diff(close_prices)
-        gain = np.where(delta > 0, delta, 0)
-        loss = np.where(delta < 0, -delta, 0)
-        avg_gain = np.convolve(gain, np.ones(period)/period, mode='valid')
-        avg_loss = np.convolve(loss, np.ones(period)/period, mode='valid')
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.tolist()
-    
-    def _calculate_macd(self, data: List[Dict[str, Any]], short_period: int = 12, long_period: int = 26, signal_period: int = 9) -> Dict[str, List[float]]:
-        """Computes Moving Average Convergence Divergence (MACD)."""
-        close_prices = np.array([entry["close"] for entry in data])
-        short_ema = self._calculate_ema(data, period=short_period)
-        long_ema = self._calculate_ema(data, period=long_period)
-        macd_line = np.array(short_ema) - np.array(long_ema)
-        signal_line = np.convolve(macd_line, np.ones(signal_period)/signal_period, mode='valid')
-        return {"macd_line": macd_line.tolist(), "signal_line": signal_line.tolist()}
-    
-    def _run(self, ticker: str, days: int = 90, indicators: List[str] = ["SMA", "EMA", "RSI", "MACD"]) -> Dict[str, Any]:
+    description: str = "Analyzes financial trends using SMA, EMA, RSI, MACD, Bollinger bands and ATR."
+    args_schema: Type[BaseModel] = TrendAnalysisInput
+
+    def _fetch_stock_data(self, ticker: str, days: int) -> np.ndarray:
+        """Daily bars from the local price store, as a (field x time) array."""
+        return HistoricalStockMarketTool()._load_series(ticker, days)
+
+    def _compute(self, series: np.ndarray, indicator_names: List[str], windows: List[int]) -> Dict[str, Any]:
+        """Computes the requested indicators on the columns of `series` in vectorised passes."""
+        close = indicators.as_series(series[CLOSE])
+        names = {name.upper() for name in indicator_names}
+        result = {}
+
+        if "SMA" in names:
+            for window, values in indicators.sma(close, windows).items():
+                result[f"SMA_{window}"] = indicators.valid_tail(values)
+        if "EMA" in names:
+            for window, values in indicators.ema(close, windows).items():
+                result[f"EMA_{window}"] = indicators.valid_tail(values)
+        if "RSI" in names:
+            result["RSI_14"] = indicators.valid_tail(indicators.rsi(close, 14))
+        if "MACD" in names:
+            result["MACD"] = {key: indicators.valid_tail(values) for key, values in indicators.macd(close).items()}
+        if "BOLLINGER" in names:
+            result["BOLLINGER_20"] = {key: indicators.valid_tail(values) for key, values in indicators.bollinger(close, 20).items()}
+        if "ATR" in names:
+            result["ATR_14"] = indicators.valid_tail(indicators.atr(series[HIGH], series[LOW], close, 14))
+
+        return result
+
+    def _latest(self, ticker: str, windows: List[int]) -> Dict[str, Any]:
+        """
+        Latest values from the ticker's persistent indicator state. Only bars
+        after the state's last applied day are read; completed bars are applied
+        permanently, today's (still changing) bar only to a copy.
+        """
+        ticker = ticker.upper()
+        today = date.today()
+        with indicator_states.lock(ticker):
+            state = indicator_states.get(ticker, windows)
+            if state.last_day is None:
+                start = today - timedelta(days=config.INDICATOR_STATE_WARMUP_DAYS)
+            else:
+                start = from_day(state.last_day + 1)
+            series = price_store.get_range(ticker, start, today, HistoricalStockMarketTool()._fetch_range)
+            completed = series[DATE] < to_day(today)
+            if state.update_many(series[DATE][completed], series[CLOSE][completed]):
+                indicator_states.save(ticker)
+            current = state
+            if not completed.all():
+                current = state.copy()
+                current.update_many(series[DATE][~completed], series[CLOSE][~completed])
+        if current.last_day is None:
+            return {}
+        latest = {"as_of": from_day(current.last_day).isoformat()}
+        latest.update(current.snapshot())
+        return latest
+
+    def _run(self, ticker: str, days: int = 90, indicators: List[str] = ["SMA", "EMA", "RSI", "MACD"], windows: List[int] = [20], latest_only: bool = False) -> Dict[str, Any]:
         """Synchronous method to analyze stock trends."""
-        data = self._fetch_stock_data(ticker, days)
         result = {"ticker": ticker}
-        
-        if "SMA" in indicators:
-            result["SMA_20"] = self._calculate_sma(data, period=20)
-        if "EMA" in indicators:
-            result["EMA_20"] = self._calculate_ema(data, period=20)
-        if "RSI" in indicators:
-            result["RSI_14"] = self._calculate_rsi(data, period=14)
-        if "MACD" in indicators:
-            result["MACD"] = self._calculate_macd(data)
-        
+        if latest_only:
+            # Fast path: served from the incremental indicator state, no window recomputation.
+            latest = self._latest(ticker, windows)
+            if latest:
+                result["latest"] = latest
+            else:
+                result["error"] = "No historical data available."
+            return result
+        series = self._fetch_stock_data(ticker, days)
+        if series.shape[1] == 0:
+            result["error"] = "No historical data available."
+            return result
+        result.update(self._compute(series, indicators, windows))
         return result
-    
-    async def _arun(self, ticker: str, days: int = 90, indicators: List[str] = ["SMA", "EMA", "RSI", "MACD"]) -> Dict[str, Any]:
+
+    async def _arun(self, ticker: str, days: int = 90, indicators: List[str] = ["SMA", "EMA", "RSI", "MACD"], windows: List[int] = [20], latest_only: bool = False) -> Dict[str, Any]:
         """Asynchronous method to analyze stock trends."""
-        return self._run(ticker, days, indicators)
+        return await run_blocking(self._run, ticker, days, indicators, windows, latest_only)
@@ -1,4 +1,3 @@
-import pint # this module is used for unit conversion
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Dict, Any
@@ -14,6 +13,7 @@ class UnitConversionTool(BaseTool):
     
     def __init__(self):
         super().__init__()
+        import pint # this module is used for unit conversion
         object.__setattr__(self, "ureg", pint.UnitRegistry())
     
     def _convert_unit(self, value: float, from_unit: str, to_unit: str) -> Dict[str, Any]:
@@ -1,6 +1,5 @@
 import os
 import sys
-import requests
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Dict, Any, Optional
@@ -10,6 +9,7 @@ from datetime import datetime, timezone
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
 import config
+from tools import http_client
 
 class WeatherInput(BaseModel):
     location: str = Field(description="City name, optionally with country code (e.g., 'London, UK', 'Paris, FR').")
@@ -23,37 +23,54 @@ class WeatherTool(BaseTool):
     api_key: str = config.OPEN_WEATHER_API_KEY
     base_url: str = "https://api.openweathermap.org/data/2.5/weather"
     
-    def _fetch_weather(self, location: str, lat: Optional[float], lon: Optional[float], unit: str) -> Dict[str, Any]:
-        """Fetches weather data from OpenWeather API with improved location handling."""
+    def _build_params(self, location: str, lat: Optional[float], lon: Optional[float], unit: str) -> Dict[str, Any]:
+        """Builds the OpenWeather query parameters, preferring coordinates when given."""
         params = {"appid": self.api_key, "units": unit}
         
         if lat is not None and lon is not None:
             params.update({"lat": lat, "lon": lon})
         else:
             params.update({"q": location})
+        return params
+
+    def _parse_weather(self, status_code: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Converts an OpenWeather response into the tool's weather format."""
+        if status_code == 200:
+            sunrise = datetime.fromtimestamp(data["sys"].get("sunrise"), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            sunset = datetime.fromtimestamp(data["sys"].get("sunset"), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+            return {
+                "location": f"{data.get('name')}, {data.get('sys', {}).get('country', '')}",
+                "temperature": data["main"].get("temp"),
+                "feels_like": data["main"].get("feels_like"),
+                "humidity": data["main"].get("humidity"),
+                "pressure": data["main"].get("pressure"),
+                "weather": data["weather"][0].get("description"),
+                "wind_speed": data["wind"].get("speed"),
+                "visibility": data.get("visibility", "N/A"),
+                "sunrise": sunrise,
+                "sunset": sunset
+            }
+        elif status_code == 404:
+            return {"error": "Location not found. Please specify a country code or use latitude/longitude."}
+        return {"error": data.get("message", "Failed to fetch weather data.")}
+    
+    def _fetch_weather(self, location: str, lat: Optional[float], lon: Optional[float], unit: str) -> Dict[str, Any]:
+        """Fetches weather data from OpenWeather API with improved location handling."""
+        params = self._build_params(location, lat, lon, unit)
         
         try:
-            response = requests.get(self.base_url, params=params)
-            data = response.json()
-            
-            if response.status_code == 200:
-                sunrise = datetime.fromtimestamp(data["sys"].get("sunrise"), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-                sunset = datetime.fromtimestamp(data["sys"].get("sunset"), timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
-                return {
-                    "location": f"{data.get('name')}, {data.get('sys', {}).get('country', '')}",
-                    "temperature": data["main"].get("temp"),
-                    "feels_like": data["main"].get("feels_like"),
-                    "humidity": data["main"].get("humidity"),
-                    "pressure": data["main"].get("pressure"),
-                    "weather": data["weather"][0].get("description"),
-                    "wind_speed": data["wind"].get("speed"),
-                    "visibility": data.get("visibility", "N/A"),
-                    "sunrise": sunrise,
-                    "sunset": sunset
-                }
-            elif response.status_code == 404:
-                return {"error": "Location not found. Please specify a country code or use latitude/longitude."}
-            return {"error": data.get("message", "Failed to fetch weather data.")}
+            response = http_client.get(self.base_url, "weather_tool", params=params)
+            return self._parse_weather(response.status_code, response.json())
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def _afetch_weather(self, location: str, lat: Optional[float], lon: Optional[float], unit: str) -> Dict[str, Any]:
+        """Fetches weather data from OpenWeather API without blocking the event loop."""
+        params = self._build_params(location, lat, lon, unit)
+
+        try:
+            response = await http_client.aget(self.base_url, "weather_tool", params=params)
+            return self._parse_weather(response.status_code, response.json())
         except Exception as e:
             return {"error": str(e)}
     
@@ -61,7 +78,7 @@ class WeatherTool(BaseTool):
         return self._fetch_weather(location, lat, lon, unit)
     
     async def _arun(self, location: str, lat: Optional[float] = None, lon: Optional[float] = None, unit: str = "metric") -> Dict[str, Any]:
-        return self._fetch_weather(location, lat, lon, unit)
+        return await self._afetch_weather(location, lat, lon, unit)
 
 
 
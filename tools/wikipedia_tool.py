@@ -1,7 +1,7 @@
-import wikipedia
 from pydantic import BaseModel, Field
 from langchain_core.tools import BaseTool
 from typing import Dict, Any
+from tools.async_utils import run_blocking
 
 class WikipediaInput(BaseModel):
     query: str = Field(description="Search query for Wikipedia.")
@@ -13,6 +13,7 @@ class WikipediaTool(BaseTool):
     
     def _fetch_wikipedia_summary(self, query: str, sentences: int) -> Dict[str, Any]:
         """Fetches a Wikipedia summary for a given query."""
+        import wikipedia
         try:
             summary = wikipedia.summary(query, sentences=sentences)
             return {"query": query, "summary": summary}
@@ -27,7 +28,7 @@ class WikipediaTool(BaseTool):
         return self._fetch_wikipedia_summary(query, sentences)
     
     async def _arun(self, query: str, sentences: int = 2) -> Dict[str, Any]:
-        return self._fetch_wikipedia_summary(query, sentences)
+        return await run_blocking(self._fetch_wikipedia_summary, query, sentences)
 
 
 # wikipedia_tool = WikipediaTool()